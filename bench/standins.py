@@ -0,0 +1,269 @@
+import asyncio
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+from zoneinfo import ZoneInfo
+
+from telegram.request import BaseRequest
+
+IST = ZoneInfo("Asia/Kolkata")
+
+
+# ============================================================
+# ⏱️ LATENCY MODEL
+# ============================================================
+class Latency:
+    """
+    Log-normal service time around `median_ms` (`sigma` = 0 for a constant),
+    which gives the long right tail real APIs have.
+    """
+
+    def __init__(self, median_ms: float, sigma: float = 0.3, seed: int | None = None):
+        self.median = median_ms / 1000
+        self.sigma = sigma
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()  # sampled from the event loop and worker threads
+
+    def sample(self) -> float:
+        if self.median <= 0:
+            return 0.0
+        if self.sigma <= 0:
+            return self.median
+        with self._lock:
+            return self.median * self._random.lognormvariate(0, self.sigma)
+
+
+# ============================================================
+# 🤖 TELEGRAM BOT API
+# ============================================================
+BOT_USER = {"id": 100000001, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+
+
+class FakeTelegramRequest(BaseRequest):
+    """
+    python-telegram-bot transport that answers Bot API calls locally after
+    a simulated network delay. Every sent message gets a real-looking
+    Message back, so handlers that store message ids keep working.
+    """
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.calls = Counter()
+        self.sent: list[dict] = []  # messages the bot sent, in order
+        self._message_ids = itertools.count(1_000_000)
+
+    @property
+    def read_timeout(self) -> float | None:
+        return 10.0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _message(self, params: dict) -> dict:
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+            "from": BOT_USER,
+            "text": params.get("text", ""),
+        }
+        if params.get("reply_markup"):
+            markup = params["reply_markup"]
+            message["reply_markup"] = json.loads(markup) if isinstance(markup, str) else markup
+        self.sent.append(message)
+        return message
+
+    def _result(self, method: str, params: dict):
+        if method == "getMe":
+            return BOT_USER
+        if method in ("sendMessage", "sendDocument"):
+            return self._message(params)
+        if method in ("editMessageText", "editMessageReplyMarkup"):
+            return {**self._message(params), "message_id": int(params.get("message_id", 0))}
+        if method == "getWebhookInfo":
+            return {"url": "", "has_custom_certificate": False, "pending_update_count": 0}
+        if method == "getUpdates":
+            return []
+        return True
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        api_method = url.rsplit("/", 1)[-1]
+        self.calls[api_method] += 1
+        await asyncio.sleep(self.latency.sample())
+        params = request_data.parameters if request_data else {}
+        return 200, json.dumps({"ok": True, "result": self._result(api_method, params)}).encode()
+
+
+# ============================================================
+# ✨ GEMINI
+# ============================================================
+class FakeGemini:
+    """
+    Stand-in for `google.genai.Client`: blocks the calling thread like the
+    real SDK, answers meeting-extraction prompts with JSON (a random hour
+    tomorrow, so some slots collide) and everything else with text.
+    """
+
+    def __init__(self, latency: Latency, seed: int | None = None):
+        self.latency = latency
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.models = self
+
+    def list(self):
+        self.calls["list"] += 1
+        return []
+
+    def generate_content(self, model: str, contents: str, config=None):
+        time.sleep(self.latency.sample())
+        if "meeting extraction assistant" in contents:
+            self.calls["parse"] += 1
+            with self._lock:
+                hour, minute = self._random.randint(9, 18), self._random.choice((0, 30))
+            day = (datetime.now(IST) + timedelta(days=1)).strftime("%Y-%m-%d")
+            return SimpleNamespace(text=json.dumps({
+                "title": "Bench sync", "date": day, "time": f"{hour:02d}:{minute:02d}", "attendees": [],
+            }))
+        self.calls["reply"] += 1
+        return SimpleNamespace(text="Sure — here is a short answer from the stand-in model.")
+
+
+# ============================================================
+# 📅 GOOGLE CALENDAR (httplib2 transport)
+# ============================================================
+class _Response(dict):
+    """httplib2.Response look-alike: a header dict with .status / .reason."""
+
+    def __init__(self, status: int):
+        super().__init__({"status": str(status), "content-type": "application/json"})
+        self.status = status
+        self.reason = "OK" if status < 400 else "Error"
+
+
+class FakeCalendarHttp:
+    """
+    httplib2.Http replacement serving the Calendar v3 calls this app makes
+    (events insert/get/patch/delete/list/watch, freeBusy, channels.stop)
+    from one shared in-memory calendar, after a simulated delay.
+
+    Like Google, it pushes to every open events().watch channel: a "sync"
+    handshake when the channel opens and an "exists" notification after
+    each change, as X-Goog-* headers handed to `notify(headers)`.
+    """
+
+    _EVENT = re.compile(r"/calendar/v3/calendars/[^/]+/events/([^/]+)$")
+
+    def __init__(self, latency: Latency, notify=None):
+        self.latency = latency
+        self.notify = notify
+        self.calls = Counter()
+        self.events: dict[str, dict] = {}
+        self.channels: dict[str, dict] = {}  # channel id -> watch body + message counter
+        self.timeout = None
+        self.redirect_codes = frozenset()
+        self.connections = {}
+        self._lock = threading.Lock()
+        self._outbox: list[dict] = []
+
+    def close(self):
+        pass
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        time.sleep(self.latency.sample())
+        url = urlparse(uri)
+        payload = json.loads(body) if body else {}
+        status, result = self._route(method, url.path, parse_qs(url.query), payload)
+        self._flush_notifications()
+        return _Response(status), json.dumps(result).encode() if result is not None else b""
+
+    def _queue_notifications(self, state: str, channels=None):
+        """Called under the lock; delivery happens after the API response is built."""
+        for channel in channels or self.channels.values():
+            self._outbox.append({
+                "X-Goog-Channel-ID": channel["id"],
+                "X-Goog-Channel-Token": channel.get("token", ""),
+                "X-Goog-Resource-ID": "bench-resource",
+                "X-Goog-Resource-State": state,
+                "X-Goog-Message-Number": str(next(channel["numbers"])),
+            })
+
+    def _flush_notifications(self):
+        with self._lock:
+            outbox, self._outbox = self._outbox, []
+        if self.notify:
+            for headers in outbox:
+                self.calls["push"] += 1
+                self.notify(headers)
+
+    def _route(self, method: str, path: str, query: dict, body: dict):
+        with self._lock:
+            if path.endswith("/freeBusy"):
+                self.calls["freebusy.query"] += 1
+                busy = [{"start": e["start"]["dateTime"], "end": e["end"]["dateTime"]} for e in self.events.values()]
+                calendars = {item["id"]: {"busy": busy} for item in body.get("items", [])}
+                return 200, {"calendars": calendars}
+            if path.endswith("/channels/stop"):
+                self.calls["channels.stop"] += 1
+                self.channels.pop(body.get("id"), None)
+                return 204, None
+            if path.endswith("/events/watch"):
+                self.calls["events.watch"] += 1
+                channel = self.channels[body["id"]] = {**body, "numbers": itertools.count(1)}
+                self._queue_notifications("sync", [channel])
+                expiration = int((time.time() + 7 * 86400) * 1000)
+                return 200, {"id": body.get("id"), "resourceId": "bench-resource", "expiration": str(expiration)}
+            if path.endswith("/events"):
+                if method == "POST":
+                    self.calls["events.insert"] += 1
+                    event_id = body.get("id") or uuid.uuid4().hex
+                    if event_id in self.events:
+                        return 409, {"error": {"code": 409, "message": "The requested identifier already exists."}}
+                    event = {**body, "id": event_id, "status": "confirmed",
+                             "htmlLink": f"https://calendar.example/{event_id}", "updated": _rfc3339_now()}
+                    self.events[event_id] = event
+                    self._queue_notifications("exists")
+                    return 200, event
+                self.calls["events.list"] += 1
+                items = [] if query.get("syncToken") else list(self.events.values())
+                return 200, {"items": items, "nextSyncToken": uuid.uuid4().hex}
+
+            match = self._EVENT.search(path)
+            event = self.events.get(match.group(1)) if match else None
+            if event is None:
+                return 404, {"error": {"code": 404, "message": "Not Found"}}
+            if method == "GET":
+                self.calls["events.get"] += 1
+                return 200, event
+            if method == "PATCH":
+                self.calls["events.patch"] += 1
+                for key, value in body.items():
+                    event[key] = {**event.get(key, {}), **value} if isinstance(value, dict) else value
+                for key in ("start", "end"):
+                    if key in event and event[key].get("date") is None:
+                        event[key].pop("date", None)  # the app sends date=None to clear all-day
+                event["updated"] = _rfc3339_now()
+                self._queue_notifications("exists")
+                return 200, event
+            if method == "DELETE":
+                self.calls["events.delete"] += 1
+                del self.events[event["id"]]
+                self._queue_notifications("exists")
+                return 204, None
+            return 405, {"error": {"code": 405, "message": "Method not allowed"}}
+
+
+def _rfc3339_now() -> str:
+    return datetime.now(IST).isoformat()
@@ -0,0 +1,478 @@
+"""
+End-to-end load test for the Telegram /webhook route.
+
+Replays a stream of Update JSON (synthetic, or recorded with --replay)
+against the real FastAPI app in-process through httpx's ASGI transport.
+The Telegram Bot API, Gemini and Google Calendar are local stand-ins
+with configurable latencies (bench/standins.py); everything else
+(update queue, per-chat ordering, rate limiter, persistence, DB, mirror,
+write-behind queue, reminders) is the production code. The Calendar
+stand-in also posts X-Goog-* push notifications to /calendar/notify for
+every change, like a real events().watch channel.
+
+For each concurrency level (closed loop: N updates in flight) it reports
+- throughput: updates fully handled per second
+- ack: webhook HTTP response time (what Telegram waits for)
+- e2e: webhook receipt -> handler finished (before any debounced
+  write-behind confirmation)
+- event-loop lag: how late a 10ms timer fires while under load
+
+Results are written to bench/results/ as JSON; --compare checks a run
+against an earlier result and exits 1 on a regression.
+
+    python -m bench.webhook_load --levels 1,8,32 --updates 200
+    python -m bench.webhook_load --save-stream bench/results/stream.jsonl
+    python -m bench.webhook_load --replay bench/results/stream.jsonl --compare bench/results/baseline.json
+"""
+import argparse
+import asyncio
+import copy
+import functools
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Share of each kind of update in a synthetic stream
+MIX = {
+    "schedule": 0.30,    # /schedule → Gemini parse, free/busy, insert, card
+    "chat": 0.25,        # plain text → Gemini reply
+    "button": 0.20,      # +1h on a meeting card → one Calendar PATCH
+    "reply_title": 0.15, # reply "change title to …" → write-behind queue
+    "reply_move": 0.10,  # reply "reschedule …" → Gemini parse + write-behind
+}
+CHAT_TEXTS = ["what's a good agenda for a retro?", "summarize OKRs in one line", "hello!", "tips for a standup"]
+
+
+# ============================================================
+# 📜 UPDATE STREAMS
+# ============================================================
+def _user(chat_id: int) -> dict:
+    return {"id": chat_id, "is_bot": False, "first_name": f"User{chat_id}"}
+
+
+def _message(chat_id: int, text: str, message_id: int = 1) -> dict:
+    message = {
+        "message_id": message_id,
+        "date": 0,
+        "chat": {"id": chat_id, "type": "private"},
+        "from": _user(chat_id),
+        "text": text,
+    }
+    if text.startswith("/"):
+        command = text.split()[0]
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+    return message
+
+
+def synthetic_stream(count: int, chats: int, seed: int) -> list[dict]:
+    """
+    `count` updates spread over `chats` private chats. Replies and button
+    presses point at message_id 0, meaning "the latest meeting card in
+    this chat", resolved when the update is sent.
+    """
+    rng = random.Random(seed)
+    kinds, weights = zip(*MIX.items())
+    stream = []
+    for i in range(count):
+        chat_id = 10_000 + rng.randrange(chats)
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "schedule":
+            update = {"message": _message(chat_id, f"/schedule sync #{i} tomorrow at 4pm")}
+        elif kind == "chat":
+            update = {"message": _message(chat_id, rng.choice(CHAT_TEXTS))}
+        elif kind == "button":
+            update = {"callback_query": {
+                "id": str(i), "from": _user(chat_id), "chat_instance": str(chat_id), "data": "m:h",
+                "message": _message(chat_id, "card", message_id=0),
+            }}
+        else:
+            text = f"change title to Sync {i}" if kind == "reply_title" else "reschedule to tomorrow 11am"
+            update = {"message": {**_message(chat_id, text), "reply_to_message": _message(chat_id, "card", 0)}}
+        stream.append(update)
+    return stream
+
+
+def load_stream(path: Path) -> list[dict]:
+    """One Update JSON object per line (as recorded from Telegram or written by --save-stream)."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_stream(stream: list[dict], path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        for update in stream:
+            f.write(json.dumps(update) + "\n")
+
+
+def kind_of(update: dict) -> str:
+    if "callback_query" in update:
+        return "button"
+    message = update.get("message") or {}
+    text = message.get("text", "")
+    if message.get("reply_to_message"):
+        return "reply_title" if "title" in text.lower() else "reply_move"
+    return "schedule" if text.startswith("/schedule") else "chat"
+
+
+def _chat_of(update: dict) -> int | None:
+    holder = update.get("callback_query", {}).get("message") or update.get("message") or {}
+    return holder.get("chat", {}).get("id")
+
+
+# ============================================================
+# 📈 STATS
+# ============================================================
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def pick(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 2)
+
+    return {"p50": pick(50), "p95": pick(95), "p99": pick(99), "max": round(ordered[-1], 2)}
+
+
+class LoopLagMonitor:
+    """Schedules a timer every `interval` and records how late it fires (ms)."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, (loop.time() - started - self.interval) * 1000))
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> list[float]:
+        self._task.cancel()
+        return self.samples
+
+
+# ============================================================
+# 🚀 HARNESS
+# ============================================================
+def _prepare_env(args):
+    """Settings main.py reads at import time: local DB, webhook mode, quiet logs."""
+    db_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='bench-')}/bench.db"
+    os.environ.update({
+        "DATABASE_URL": db_url,
+        "GEMINI_API_KEY": "bench",
+        "TELEGRAM_TOKEN": "100000001:bench",
+        "RENDER": "true",
+        "RENDER_EXTERNAL_URL": "https://bench.invalid",
+        "LOG_LEVEL": args.log_level,
+        "LOG_FORMAT": "text",
+    })
+    return db_url
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.update_ids = itertools.count(1)
+        self.waiters: dict[int, asyncio.Future] = {}
+        self.cards: dict[int, list[int]] = defaultdict(list)  # chat_id -> meeting card message ids
+        self._seen_sends = 0
+        self.pushes = Counter()  # /calendar/notify response status -> count
+
+    async def __aenter__(self):
+        from bench import standins
+
+        _prepare_env(self.args)
+        import database
+        import models  # noqa: F401  (registers every table on Base.metadata)
+        import gemini_chat
+        import google_calendar
+        import main
+        from google.oauth2.credentials import Credentials
+        from telegram_bot.setup import setup_telegram_bot
+
+        database.Base.metadata.create_all(database.engine)
+
+        seed = self.args.seed
+        self.telegram = standins.FakeTelegramRequest(standins.Latency(self.args.telegram_ms, self.args.jitter, seed))
+        self.gemini = standins.FakeGemini(standins.Latency(self.args.gemini_ms, self.args.jitter, seed), seed)
+        self.calendar = standins.FakeCalendarHttp(
+            standins.Latency(self.args.calendar_ms, self.args.jitter, seed), notify=self._push_notification
+        )
+
+        main.setup_telegram_bot = functools.partial(setup_telegram_bot, request=self.telegram)
+        gemini_chat._client = self.gemini
+        google_calendar._new_http = lambda: self.calendar
+        google_calendar._credentials[None] = Credentials(
+            token="bench", expiry=datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(days=1)
+        )
+
+        import httpx
+        from telegram_bot import update_queue
+
+        # Created before startup: the watch channel opened during startup pushes through it
+        headers = {"X-Telegram-Bot-Api-Secret-Token": update_queue.WEBHOOK_SECRET} if update_queue.WEBHOOK_SECRET else {}
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=main.app), base_url="http://bench", headers=headers, timeout=60
+        )
+
+        self.main = main
+        self._loop = asyncio.get_running_loop()
+        self._lifespan = main.app.router.lifespan_context(main.app)
+        await self._lifespan.__aenter__()
+        self._track_completion(main.telegram_app.update_processor)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        await self._lifespan.__aexit__(*exc)
+
+    def _push_notification(self, headers: dict):
+        """Deliver a stand-in Calendar push to /calendar/notify (called from Calendar worker threads)."""
+        async def post():
+            response = await self.client.post("/calendar/notify", headers=headers)
+            self.pushes[response.status_code] += 1
+
+        asyncio.run_coroutine_threadsafe(post(), self._loop)
+
+    def _track_completion(self, processor):
+        """Resolve the waiter for an update once its handlers have finished."""
+        process = processor.do_process_update
+
+        async def tracked(update, coroutine):
+            try:
+                await process(update, coroutine)
+            finally:
+                waiter = self.waiters.pop(update.update_id, None)
+                if waiter and not waiter.done():
+                    waiter.set_result(time.perf_counter())
+
+        processor.do_process_update = tracked
+
+    def _collect_cards(self):
+        sent = self.telegram.sent
+        for message in sent[self._seen_sends:]:
+            if "Meeting Scheduled" in message.get("text", ""):
+                self.cards[message["chat"]["id"]].append(message["message_id"])
+        self._seen_sends = len(sent)
+
+    def _materialize(self, template: dict) -> dict:
+        """Fresh update_id and date; message_id 0 → latest card in the chat (or /schedule if none yet)."""
+        update = copy.deepcopy(template)
+        update["update_id"] = next(self.update_ids)
+        self._collect_cards()
+        chat_id = _chat_of(update)
+        target = None
+        if "callback_query" in update:
+            target = update["callback_query"]["message"]
+        elif (update.get("message") or {}).get("reply_to_message"):
+            target = update["message"]["reply_to_message"]
+        if target is not None and target.get("message_id") == 0:
+            if not self.cards.get(chat_id):
+                return {"update_id": update["update_id"], "message": _message(chat_id, "/schedule warmup tomorrow 5pm")}
+            target["message_id"] = self.cards[chat_id][-1]
+        now = int(time.time())
+        for holder in (update.get("message"), update.get("callback_query", {}).get("message")):
+            if holder:
+                holder["date"] = now
+        return update
+
+    async def _send(self, template: dict, result: dict):
+        update = self._materialize(template)
+        kind = kind_of(update)
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters[update["update_id"]] = waiter
+
+        started = time.perf_counter()
+        response = await self.client.post("/webhook", json=update)
+        result["ack"].append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            self.waiters.pop(update["update_id"], None)
+            result["rejected"] += 1
+            return
+        try:
+            finished = await asyncio.wait_for(waiter, timeout=self.args.timeout)
+        except asyncio.TimeoutError:
+            self.waiters.pop(update["update_id"], None)
+            result["timeouts"] += 1
+            return
+        e2e = (finished - started) * 1000
+        result["e2e"].append(e2e)
+        result["by_kind"][kind].append(e2e)
+
+    async def run_level(self, stream: list[dict], concurrency: int, count: int) -> dict:
+        result = {"ack": [], "e2e": [], "by_kind": defaultdict(list), "rejected": 0, "timeouts": 0}
+        source = itertools.cycle(stream)
+        remaining = itertools.islice(source, count)
+        before = self._call_counts()
+        pushes_before = Counter(self.pushes)
+
+        async def worker():
+            for template in remaining:  # shared iterator: each update is sent once
+                await self._send(template, result)
+
+        monitor = LoopLagMonitor()
+        monitor.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        lag = monitor.stop()
+
+        after = self._call_counts()
+        return {
+            "concurrency": concurrency,
+            "updates": count,
+            "completed": len(result["e2e"]),
+            "rejected": result["rejected"],
+            "timeouts": result["timeouts"],
+            "elapsed_s": round(elapsed, 3),
+            "throughput_ups": round(len(result["e2e"]) / elapsed, 2) if elapsed else 0.0,
+            "ack_ms": percentiles(result["ack"]),
+            "e2e_ms": percentiles(result["e2e"]),
+            "loop_lag_ms": percentiles(lag),
+            "e2e_p95_by_kind_ms": {k: percentiles(v)["p95"] for k, v in sorted(result["by_kind"].items())},
+            "calls": {name: after[name] - before.get(name, 0) for name in after},
+            "calendar_pushes": {str(status): n for status, n in sorted((self.pushes - pushes_before).items())},
+        }
+
+    def _call_counts(self) -> dict:
+        counts = {}
+        for prefix, source in (("telegram", self.telegram), ("gemini", self.gemini), ("calendar", self.calendar)):
+            counts[prefix] = sum(source.calls.values())
+        return counts
+
+
+# ============================================================
+# 🧾 REPORTING
+# ============================================================
+def print_level(level: dict):
+    e2e, ack, lag = level["e2e_ms"], level["ack_ms"], level["loop_lag_ms"]
+    print(
+        f"c={level['concurrency']:<4} {level['throughput_ups']:>8.1f} upd/s | "
+        f"e2e p50/p95/p99 {e2e['p50']}/{e2e['p95']}/{e2e['p99']} ms | "
+        f"ack p99 {ack['p99']} ms | loop lag p99/max {lag['p99']}/{lag['max']} ms | "
+        f"rejected {level['rejected']} timeouts {level['timeouts']}"
+    )
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def save_results(report: dict, path: Path | None) -> Path:
+    if path is None:
+        path = RESULTS_DIR / f"webhook-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2))
+    return path
+
+
+def compare(report: dict, baseline_path: Path, tolerance: float) -> bool:
+    """Print deltas against `baseline_path`; True if throughput or e2e p95 regressed beyond `tolerance`."""
+    baseline = {level["concurrency"]: level for level in json.loads(baseline_path.read_text())["levels"]}
+    regressed = False
+    print(f"\nvs {baseline_path.name} (tolerance {tolerance:.0%}):")
+    for level in report["levels"]:
+        old = baseline.get(level["concurrency"])
+        if not old:
+            continue
+        checks = (
+            ("throughput", old["throughput_ups"], level["throughput_ups"], True),
+            ("e2e p95", old["e2e_ms"]["p95"], level["e2e_ms"]["p95"], False),
+        )
+        parts = []
+        for name, before, now, higher_is_better in checks:
+            if not before or now is None:
+                continue
+            change = (now - before) / before
+            worse = -change if higher_is_better else change
+            flag = " ❌" if worse > tolerance else ""
+            regressed |= worse > tolerance
+            parts.append(f"{name} {before} → {now} ({change:+.1%}){flag}")
+        print(f"c={level['concurrency']:<4} " + " | ".join(parts))
+    return regressed
+
+
+# ============================================================
+# ▶️ MAIN
+# ============================================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--levels", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--updates", type=int, default=200, help="updates sent per level")
+    parser.add_argument("--chats", type=int, default=50, help="distinct chats in a synthetic stream")
+    parser.add_argument("--replay", type=Path, help="JSONL file of Update objects to replay")
+    parser.add_argument("--save-stream", type=Path, help="write the synthetic stream here (JSONL) and continue")
+    parser.add_argument("--telegram-ms", type=float, default=40, help="median Bot API latency")
+    parser.add_argument("--gemini-ms", type=float, default=400, help="median Gemini latency")
+    parser.add_argument("--calendar-ms", type=float, default=150, help="median Calendar API latency")
+    parser.add_argument("--jitter", type=float, default=0.3, help="log-normal sigma of all latencies (0 = constant)")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for one update to be handled")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite file")
+    parser.add_argument("--log-level", default="ERROR")
+    parser.add_argument("--output", type=Path, help="result file (default bench/results/webhook-<time>.json)")
+    parser.add_argument("--compare", type=Path, help="earlier result file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative regression for --compare")
+    return parser.parse_args(argv)
+
+
+async def run(args) -> dict:
+    levels = [int(c) for c in args.levels.split(",") if c.strip()]
+    if args.replay:
+        stream = load_stream(args.replay)
+    else:
+        stream = synthetic_stream(max(args.updates, 1), args.chats, args.seed)
+        if args.save_stream:
+            save_stream(stream, args.save_stream)
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "stream": str(args.replay) if args.replay else f"synthetic(chats={args.chats}, seed={args.seed})",
+        "latency_ms": {"telegram": args.telegram_ms, "gemini": args.gemini_ms, "calendar": args.calendar_ms,
+                       "jitter": args.jitter},
+        "levels": [],
+    }
+    async with Harness(args) as harness:
+        for concurrency in levels:
+            level = await harness.run_level(stream, concurrency, args.updates)
+            print_level(level)
+            report["levels"].append(level)
+    return report
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    path = save_results(report, args.output)
+    print(f"\nSaved {path}")
+    if args.compare and compare(report, args.compare, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
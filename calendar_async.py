@@ -0,0 +1,133 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import google_calendar
+import resilience
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# ⚙️ CONFIG
+# ============================================================
+# googleapiclient/httplib2 are blocking; every Calendar call runs on this
+# bounded pool so the event loop (and every other chat) keeps moving.
+CALENDAR_MAX_WORKERS = int(os.getenv("CALENDAR_MAX_WORKERS", "8"))
+CALENDAR_CALL_TIMEOUT = float(os.getenv("CALENDAR_CALL_TIMEOUT", "15"))
+# Reads still running after this get a duplicate request on another worker
+CALENDAR_HEDGE_AFTER = float(os.getenv("CALENDAR_HEDGE_AFTER", "1.5"))
+
+_executor = ThreadPoolExecutor(max_workers=CALENDAR_MAX_WORKERS, thread_name_prefix="calendar")
+
+
+def _submit(func, args, kwargs, timeout: float) -> asyncio.Future:
+    """Start `func` on the calendar pool with a `timeout`-second deadline in its context."""
+    with resilience.deadline(timeout):
+        ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return asyncio.get_running_loop().run_in_executor(_executor, call)
+
+
+async def run_calendar(func, *args, timeout: float | None = None, **kwargs):
+    """
+    Run a blocking google_calendar call on the calendar pool.
+
+    Raises asyncio.TimeoutError after `timeout` seconds (default
+    CALENDAR_CALL_TIMEOUT). The caller is released immediately; the worker
+    thread carries the same deadline, so it sends no further API requests
+    once it has passed.
+    """
+    timeout = timeout or CALENDAR_CALL_TIMEOUT
+    return await asyncio.wait_for(_submit(func, args, kwargs, timeout), timeout=timeout)
+
+
+async def run_calendar_write(func, *args, timeout: float | None = None, **kwargs):
+    """
+    Like run_calendar, for calls that change the calendar. The worker still
+    refuses to *start* a request once the deadline has passed, but a request
+    already sent is waited for: abandoning it would not stop it, and the
+    user would be told a write failed that in fact went through. Each
+    request stays bounded by the socket timeout (CALENDAR_REQUEST_TIMEOUT).
+    """
+    return await _submit(func, args, kwargs, timeout or CALENDAR_CALL_TIMEOUT)
+
+
+def shutdown():
+    """Stop accepting work; called on FastAPI shutdown."""
+    _executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ============================================================
+# 📅 ASYNC FACADE
+# ============================================================
+async def create_event(title: str, date: str, time: str, attendees: list[str] | None = None, user_id: int | None = None):
+    return await run_calendar_write(google_calendar.create_event, title, date, time, attendees=attendees, user_id=user_id)
+
+
+async def check_availability(date: str, time: str, user_id: int | None = None):
+    return await resilience.hedged_async(
+        resilience.calendar_breaker, CALENDAR_HEDGE_AFTER,
+        lambda: run_calendar(google_calendar.check_availability, date, time, user_id=user_id),
+    )
+
+
+def _fetch_event(event_id: str | None, user_id: int | None = None):
+    owner = google_calendar.resolve_owner(user_id)
+    return google_calendar.get_event(google_calendar.get_calendar_service(owner), event_id, owner)
+
+
+async def fetch_event(event_id: str | None, user_id: int | None = None):
+    """Load an event (mirror first, then events().get) — also warms the mirror for a following update."""
+    return await resilience.hedged_async(
+        resilience.calendar_breaker, CALENDAR_HEDGE_AFTER, lambda: run_calendar(_fetch_event, event_id, user_id)
+    )
+
+
+async def update_event(
+    event_id: str | None,
+    title: str | None = None,
+    new_date: str | None = None,
+    new_time: str | None = None,
+    user_id: int | None = None,
+):
+    return await run_calendar_write(google_calendar.update_event, event_id, title, new_date, new_time, user_id)
+
+
+async def update_event_title(event_id: str | None, new_title: str, user_id: int | None = None):
+    return await run_calendar_write(google_calendar.update_event_title, event_id, new_title, user_id)
+
+
+async def update_event_time(event_id: str | None, new_time: str, user_id: int | None = None):
+    return await run_calendar_write(google_calendar.update_event_time, event_id, new_time, user_id)
+
+
+async def update_event_date(event_id: str | None, new_date: str, new_time: str | None = None, user_id: int | None = None):
+    return await run_calendar_write(google_calendar.update_event_date, event_id, new_date, new_time, user_id)
+
+
+async def reschedule_event(event_id: str | None, new_date: str, new_time: str, user_id: int | None = None):
+    return await run_calendar_write(google_calendar.reschedule_event, event_id, new_date, new_time, user_id)
+
+
+async def delete_event(event_id: str, user_id: int | None = None):
+    return await run_calendar_write(google_calendar.delete_event, event_id, user_id)
+
+
+async def suggest_slots(event_id: str, count: int = 4, user_id: int | None = None):
+    return await resilience.hedged_async(
+        resilience.calendar_breaker, CALENDAR_HEDGE_AFTER,
+        lambda: run_calendar(google_calendar.suggest_slots, event_id, count, user_id),
+    )
+
+
+async def refresh_credentials_loop(interval: float = 60):
+    """Background task: refresh tokens shortly before they expire, off the request path."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_calendar(google_calendar.refresh_expiring_credentials, timeout=max(interval, CALENDAR_CALL_TIMEOUT))
+        except Exception as e:
+            logger.warning("⚠️ Background credential refresh failed: %s", e)
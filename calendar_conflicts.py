@@ -0,0 +1,207 @@
+import logging
+import os
+import threading
+import time as _time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from googleapiclient.errors import HttpError
+
+import calendar_store
+
+logger = logging.getLogger(__name__)
+
+IST = ZoneInfo("Asia/Kolkata")
+
+# How long fetched free/busy data is trusted before it is fetched again.
+FREEBUSY_TTL = int(os.getenv("FREEBUSY_TTL", "120"))
+SLOT_STEP = timedelta(minutes=30)
+
+
+# ============================================================
+# 🌲 INTERVAL INDEX
+# ============================================================
+class IntervalSet:
+    """
+    Disjoint, sorted [start, end) intervals.
+
+    Overlapping/adjacent inserts are merged, so an overlap query is two
+    bisects over the start/end arrays: O(log n) lookups, O(n) inserts
+    (n stays tiny: one calendar's busy blocks for a few days).
+    """
+
+    def __init__(self):
+        self.starts: list[datetime] = []
+        self.ends: list[datetime] = []
+
+    def add(self, start: datetime, end: datetime):
+        if end <= start:
+            return
+        # First interval whose end >= start, last whose start <= end → all merge with the new one
+        lo = bisect_left(self.ends, start)
+        hi = bisect_right(self.starts, end)
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+
+    def overlapping(self, start: datetime, end: datetime) -> list[tuple[datetime, datetime]]:
+        lo = bisect_right(self.ends, start)
+        hi = bisect_left(self.starts, end)
+        return list(zip(self.starts[lo:hi], self.ends[lo:hi]))
+
+    def covers(self, start: datetime, end: datetime) -> bool:
+        i = bisect_right(self.starts, start) - 1
+        return i >= 0 and self.ends[i] >= end
+
+
+class _CalendarCache:
+    """Busy blocks plus the windows we have already asked Google about."""
+
+    def __init__(self):
+        self.busy = IntervalSet()
+        self.covered = IntervalSet()
+        self.fetched_at = _time.monotonic()
+
+
+_caches: dict[str, _CalendarCache] = {}
+_lock = threading.Lock()
+# Calendars whose token was refused freebusy.query (granted before the
+# read scope was requested): they go straight to the mirror until reconnected.
+_no_freebusy: set[str] = set()
+
+
+def _cache(key: str) -> _CalendarCache:
+    cache = _caches.get(key)
+    if not cache or _time.monotonic() - cache.fetched_at > FREEBUSY_TTL:
+        cache = _caches[key] = _CalendarCache()
+    return cache
+
+
+def record_busy(start: datetime, end: datetime, calendar_id: str = "primary", user_id: int | None = None):
+    """Add a block we just booked so the next check sees it without a fetch."""
+    with _lock:
+        _cache(calendar_store.mirror_key(calendar_id, user_id)).busy.add(start.astimezone(IST), end.astimezone(IST))
+
+
+def invalidate(calendar_id: str = "primary", user_id: int | None = None):
+    """Forget cached free/busy data (e.g. after moving an event or reconnecting the account)."""
+    key = calendar_store.mirror_key(calendar_id, user_id)
+    with _lock:
+        _caches.pop(key, None)
+        _no_freebusy.discard(key)
+
+
+# ============================================================
+# 📡 FREE/BUSY FETCH
+# ============================================================
+def _busy_from_mirror(service, calendar_id: str, start: datetime, end: datetime, user_id: int | None) -> list[tuple[datetime, datetime]]:
+    calendar_store.ensure_fresh(service, calendar_id, user_id=user_id)
+    blocks = []
+    for event in calendar_store.get_events_between(start, end, calendar_id, user_id=user_id):
+        if event.get("transparency") == "transparent":
+            continue
+        ev_start, ev_end = calendar_store.event_bounds(event)
+        if ev_start and ev_end:
+            blocks.append((ev_start, ev_end))
+    return blocks
+
+
+def _fetch_busy(service, calendar_id: str, start: datetime, end: datetime, user_id: int | None = None) -> list[tuple[datetime, datetime]]:
+    """
+    Busy blocks from the FreeBusy API. Tokens granted before the read scope
+    was added get a 403; those calendars are answered from the local event
+    mirror from then on, without asking FreeBusy again.
+    """
+    key = calendar_store.mirror_key(calendar_id, user_id)
+    if key in _no_freebusy:
+        return _busy_from_mirror(service, calendar_id, start, end, user_id)
+    try:
+        result = service.freebusy().query(
+            body={
+                "timeMin": start.isoformat(),
+                "timeMax": end.isoformat(),
+                "timeZone": "Asia/Kolkata",
+                "items": [{"id": calendar_id}],
+            }
+        ).execute()
+        busy = result.get("calendars", {}).get(calendar_id, {}).get("busy", [])
+        return [
+            (
+                datetime.fromisoformat(b["start"]).astimezone(IST),
+                datetime.fromisoformat(b["end"]).astimezone(IST),
+            )
+            for b in busy
+        ]
+    except HttpError as e:
+        if e.resp.status != 403:
+            raise
+        logger.warning("⚠️ FreeBusy not permitted for %s (token predates the read scope), using local mirror", key)
+        with _lock:
+            _no_freebusy.add(key)
+        return _busy_from_mirror(service, calendar_id, start, end, user_id)
+
+
+def _ensure_window(service, calendar_id: str, start: datetime, end: datetime, user_id: int | None = None) -> _CalendarCache:
+    """Make sure [start, end) is covered by cached data, fetching whole days at a time."""
+    key = calendar_store.mirror_key(calendar_id, user_id)
+    with _lock:
+        cache = _cache(key)
+        if cache.covered.covers(start, end):
+            return cache
+
+    # Fetch full local days so nearby-slot suggestions need no further calls
+    day_start = start.astimezone(IST).replace(hour=0, minute=0, second=0, microsecond=0)
+    day_end = end.astimezone(IST).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    blocks = _fetch_busy(service, calendar_id, day_start, day_end, user_id)
+
+    with _lock:
+        cache = _cache(key)
+        for b_start, b_end in blocks:
+            cache.busy.add(b_start, b_end)
+        cache.covered.add(day_start, day_end)
+        return cache
+
+
+# ============================================================
+# ⚔️ CONFLICTS + SUGGESTIONS
+# ============================================================
+def find_conflicts(service, start: datetime, end: datetime, calendar_id: str = "primary", user_id: int | None = None):
+    """Return busy blocks overlapping [start, end)."""
+    cache = _ensure_window(service, calendar_id, start, end, user_id)
+    with _lock:
+        return cache.busy.overlapping(start, end)
+
+
+def suggest_free_slots(
+    service,
+    start: datetime,
+    duration: timedelta = timedelta(hours=1),
+    count: int = 3,
+    calendar_id: str = "primary",
+    search: timedelta = timedelta(hours=12),
+    user_id: int | None = None,
+) -> list[datetime]:
+    """
+    Nearest free start times to `start` (searching ±`search` in SLOT_STEP
+    steps, never in the past), closest first.
+    """
+    now = datetime.now(IST)
+    cache = _ensure_window(service, calendar_id, start - search, start + search + duration, user_id)
+
+    candidates = []
+    steps = int(search / SLOT_STEP)
+    for i in range(1, steps + 1):
+        for sign in (1, -1):
+            slot = start + sign * i * SLOT_STEP
+            if slot < now:
+                continue
+            with _lock:
+                free = not cache.busy.overlapping(slot, slot + duration)
+            if free:
+                candidates.append(slot)
+        if len(candidates) >= count:
+            break
+    return candidates[:count]
@@ -0,0 +1,328 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from googleapiclient.errors import HttpError
+
+import database
+import resilience
+from models import CalendarEvent, CalendarSyncState
+
+logger = logging.getLogger(__name__)
+
+IST = ZoneInfo("Asia/Kolkata")
+
+# How long a mirror is trusted before find_latest_event triggers an incremental sync.
+MIRROR_MAX_AGE = timedelta(seconds=int(os.getenv("CALENDAR_MIRROR_MAX_AGE", "60")))
+# With a live push channel every change triggers a sync, so the mirror can be trusted much longer.
+WATCHED_MAX_AGE = timedelta(seconds=int(os.getenv("CALENDAR_WATCHED_MAX_AGE", "3600")))
+
+# Calendars that currently have an active events().watch channel
+_watched: set[str] = set()
+
+# One sync at a time per mirror: push notifications, ensure_fresh and
+# hedged reads can all ask for the same calendar at once.
+_sync_locks: dict[str, threading.Lock] = {}
+_sync_locks_guard = threading.Lock()
+
+# Called with the events each sync applied (see add_sync_listener)
+_sync_listeners: list = []
+
+
+# ============================================================
+# 🕒 TIME HELPERS
+# ============================================================
+def _to_utc_naive(dt: datetime) -> datetime:
+    """Normalise an aware datetime to naive UTC (the storage format of the mirror)."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=IST)
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def mirror_key(calendar_id: str = "primary", user_id: int | None = None) -> str:
+    """Mirror rows are keyed per account: 'primary' for the shared one, '<user>:primary' per user."""
+    return calendar_id if user_id is None else f"{user_id}:{calendar_id}"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _parse_event_time(value: dict | None) -> datetime | None:
+    """Parse a Google `start`/`end` object (dateTime or all-day date) into naive UTC."""
+    if not value:
+        return None
+    if value.get("dateTime"):
+        return _to_utc_naive(datetime.fromisoformat(value["dateTime"]))
+    if value.get("date"):
+        tz = ZoneInfo(value["timeZone"]) if value.get("timeZone") else IST
+        day = datetime.strptime(value["date"], "%Y-%m-%d").replace(tzinfo=tz)
+        return _to_utc_naive(day)
+    return None
+
+
+def event_bounds(event: dict) -> tuple[datetime | None, datetime | None]:
+    """(start, end) of a Google event as aware IST datetimes."""
+    bounds = []
+    for key in ("start", "end"):
+        value = _parse_event_time(event.get(key))
+        bounds.append(value.replace(tzinfo=timezone.utc).astimezone(IST) if value else None)
+    return bounds[0], bounds[1]
+
+
+# ============================================================
+# 💾 MIRROR WRITES
+# ============================================================
+def _apply_event(db, calendar_id: str, event: dict):
+    """Insert, update or (for cancelled events) delete one event row."""
+    row = (
+        db.query(CalendarEvent)
+        .filter(CalendarEvent.calendar_id == calendar_id, CalendarEvent.event_id == event["id"])
+        .first()
+    )
+
+    if event.get("status") == "cancelled":
+        if row:
+            db.delete(row)
+        return
+
+    if not row:
+        row = CalendarEvent(calendar_id=calendar_id, event_id=event["id"])
+        db.add(row)
+
+    row.summary = event.get("summary")
+    row.status = event.get("status")
+    row.start_time = _parse_event_time(event.get("start"))
+    row.end_time = _parse_event_time(event.get("end"))
+    row.html_link = event.get("htmlLink")
+    row.raw = json.dumps(event)
+
+
+def upsert_event(event: dict, calendar_id: str = "primary", user_id: int | None = None):
+    """
+    Write an event we just created/changed straight into the mirror,
+    so it is visible locally before the next incremental sync.
+    """
+    db = database.SessionLocal()
+    try:
+        _apply_event(db, mirror_key(calendar_id, user_id), event)
+        db.commit()
+    finally:
+        db.close()
+
+
+def remove_event(event_id: str, calendar_id: str = "primary", user_id: int | None = None):
+    """Drop an event from the mirror."""
+    db = database.SessionLocal()
+    try:
+        db.query(CalendarEvent).filter(
+            CalendarEvent.calendar_id == mirror_key(calendar_id, user_id), CalendarEvent.event_id == event_id
+        ).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+# ============================================================
+# 🔄 SYNC (full + incremental via syncToken)
+# ============================================================
+def _list_all(service, calendar_id: str, sync_token: str | None) -> tuple[list[dict], str | None]:
+    """Page through events().list and return (events, nextSyncToken)."""
+    items = []
+    page_token = None
+    while True:
+        params = {"calendarId": calendar_id, "singleEvents": True, "maxResults": 250}
+        if sync_token:
+            params["syncToken"] = sync_token
+        else:
+            # Full sync: skip the past, nobody edits last year's meetings from Telegram
+            params["timeMin"] = (datetime.now(IST) - timedelta(days=1)).isoformat()
+        if page_token:
+            params["pageToken"] = page_token
+
+        result = service.events().list(**params).execute()
+        items.extend(result.get("items", []))
+        page_token = result.get("nextPageToken")
+        if not page_token:
+            return items, result.get("nextSyncToken")
+
+
+def _sync_lock(key: str) -> threading.Lock:
+    with _sync_locks_guard:
+        return _sync_locks.setdefault(key, threading.Lock())
+
+
+def add_sync_listener(listener):
+    """
+    Register `listener(events)` to see every change a sync pulls from Google
+    (edits made outside the bot included; cancelled events have status
+    "cancelled"). It runs on the syncing thread after the mirror commit.
+    """
+    _sync_listeners.append(listener)
+
+
+def _notify_listeners(items: list[dict]):
+    for listener in _sync_listeners:
+        try:
+            listener(items)
+        except Exception as e:
+            logger.exception("Calendar sync listener error: %s", e)
+
+
+def sync_events(service, calendar_id: str = "primary", user_id: int | None = None) -> int:
+    """
+    Bring the local mirror up to date.
+
+    Uses the stored syncToken for an incremental fetch. Only when Google
+    rejects the token (410 Gone) is the mirror wiped and fully re-synced.
+    Returns the number of changed events applied.
+    """
+    with _sync_lock(mirror_key(calendar_id, user_id)):
+        return _sync_events(service, calendar_id, user_id)
+
+
+def _sync_events(service, calendar_id: str, user_id: int | None) -> int:
+    key = mirror_key(calendar_id, user_id)
+    db = database.SessionLocal()
+    try:
+        state = db.get(CalendarSyncState, key)
+        if not state:
+            state = CalendarSyncState(calendar_id=key)
+            db.add(state)
+
+        full = not state.sync_token
+        try:
+            items, next_token = _list_all(service, calendar_id, state.sync_token)
+        except HttpError as e:
+            if e.resp.status != 410:
+                raise
+            logger.warning("⚠️ Calendar sync token expired, running full resync")
+            full = True
+            items, next_token = _list_all(service, calendar_id, None)
+
+        if full:
+            db.query(CalendarEvent).filter(CalendarEvent.calendar_id == key).delete()
+
+        for event in items:
+            _apply_event(db, key, event)
+
+        state.sync_token = next_token
+        state.last_synced_at = _utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+    if items:
+        _notify_listeners(items)
+    return len(items)
+
+
+def set_watched(calendar_id: str, watched: bool):
+    """Record whether push notifications keep this calendar's mirror current."""
+    if watched:
+        _watched.add(calendar_id)
+    else:
+        _watched.discard(calendar_id)
+
+
+def is_fresh(calendar_id: str = "primary", max_age: timedelta | None = None, user_id: int | None = None) -> bool:
+    """True if the mirror was synced within `max_age` (longer for watched calendars)."""
+    if max_age is None:
+        max_age = WATCHED_MAX_AGE if mirror_key(calendar_id, user_id) in _watched else MIRROR_MAX_AGE
+    db = database.SessionLocal()
+    try:
+        state = db.get(CalendarSyncState, mirror_key(calendar_id, user_id))
+        return bool(
+            state
+            and state.sync_token
+            and state.last_synced_at
+            and _utcnow() - state.last_synced_at < max_age
+        )
+    finally:
+        db.close()
+
+
+def ensure_fresh(service, calendar_id: str = "primary", max_age: timedelta | None = None, user_id: int | None = None):
+    """
+    Run an incremental sync only if the mirror is older than `max_age`.
+    The hedged copy of a read never waits for a sync already in progress
+    (the original call is doing it) and answers from the mirror as it is.
+    """
+    if is_fresh(calendar_id, max_age, user_id):
+        return
+    lock = _sync_lock(mirror_key(calendar_id, user_id))
+    if not lock.acquire(blocking=not resilience.is_hedge_copy()):
+        return
+    try:
+        # Whoever held the lock may just have synced it for us
+        if not is_fresh(calendar_id, max_age, user_id):
+            _sync_events(service, calendar_id, user_id)
+    finally:
+        lock.release()
+
+
+def mark_stale(calendar_id: str = "primary", user_id: int | None = None):
+    """Force the next ensure_fresh() to sync (keeps the syncToken)."""
+    db = database.SessionLocal()
+    try:
+        state = db.get(CalendarSyncState, mirror_key(calendar_id, user_id))
+        if state:
+            state.last_synced_at = None
+            db.commit()
+    finally:
+        db.close()
+
+
+# ============================================================
+# 🔍 LOCAL QUERIES
+# ============================================================
+def get_event(event_id: str, calendar_id: str = "primary", user_id: int | None = None) -> dict | None:
+    """Look up an event by id in the mirror."""
+    db = database.SessionLocal()
+    try:
+        row = (
+            db.query(CalendarEvent)
+            .filter(CalendarEvent.calendar_id == mirror_key(calendar_id, user_id), CalendarEvent.event_id == event_id)
+            .first()
+        )
+        return json.loads(row.raw) if row else None
+    finally:
+        db.close()
+
+
+def get_next_event(calendar_id: str = "primary", now: datetime | None = None, user_id: int | None = None) -> dict | None:
+    """Return the soonest event that has not ended by `now` (an ongoing meeting counts)."""
+    now_utc = _to_utc_naive(now or datetime.now(IST))
+    db = database.SessionLocal()
+    try:
+        row = (
+            db.query(CalendarEvent)
+            .filter(CalendarEvent.calendar_id == mirror_key(calendar_id, user_id), CalendarEvent.end_time > now_utc)
+            .order_by(CalendarEvent.start_time)
+            .first()
+        )
+        return json.loads(row.raw) if row else None
+    finally:
+        db.close()
+
+
+def get_events_between(start: datetime, end: datetime, calendar_id: str = "primary", user_id: int | None = None) -> list[dict]:
+    """Return events overlapping [start, end), ordered by start time."""
+    db = database.SessionLocal()
+    try:
+        rows = (
+            db.query(CalendarEvent)
+            .filter(
+                CalendarEvent.calendar_id == mirror_key(calendar_id, user_id),
+                CalendarEvent.start_time < _to_utc_naive(end),
+                CalendarEvent.end_time > _to_utc_naive(start),
+            )
+            .order_by(CalendarEvent.start_time)
+            .all()
+        )
+        return [json.loads(r.raw) for r in rows]
+    finally:
+        db.close()
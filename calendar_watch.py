@@ -0,0 +1,227 @@
+import asyncio
+import hmac
+import logging
+import os
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import calendar_async
+import calendar_conflicts
+import calendar_store
+import database
+import tracing
+from google_calendar import get_calendar_service
+from models import CalendarChannel
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# ⚙️ CONFIG
+# ============================================================
+# Google only delivers to public HTTPS URLs, e.g. https://<app>.onrender.com/calendar/notify
+CHANNEL_TTL = int(os.getenv("CALENDAR_CHANNEL_TTL", str(7 * 24 * 3600)))
+RENEW_BEFORE = timedelta(hours=int(os.getenv("CALENDAR_CHANNEL_RENEW_HOURS", "24")))
+RENEW_CHECK_INTERVAL = int(os.getenv("CALENDAR_CHANNEL_CHECK_SECONDS", "3600"))
+NOTIFY_DEBOUNCE = float(os.getenv("CALENDAR_NOTIFY_DEBOUNCE", "2"))
+
+# channel_id -> (calendar_id, token, resource_id); avoids a DB read per notification
+_channels: dict[str, tuple[str, str, str | None]] = {}
+# calendar_id -> pending debounced sync task
+_pending: dict[str, asyncio.Task] = {}
+# calendars that got another notification while their sync was running
+_dirty: set[str] = set()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# ============================================================
+# 📡 CHANNEL REGISTRATION / RENEWAL (blocking; run via calendar_async)
+# ============================================================
+def register_channel(address: str, calendar_id: str = "primary") -> CalendarChannel:
+    """Open an events().watch channel for `calendar_id` that posts to `address`."""
+    service = get_calendar_service()
+    channel_id = str(uuid.uuid4())
+    token = secrets.token_urlsafe(32)
+
+    # Google sends the "sync" handshake right away, possibly before watch() returns
+    _channels[channel_id] = (calendar_id, token, None)
+    try:
+        result = service.events().watch(
+            calendarId=calendar_id,
+            body={
+                "id": channel_id,
+                "type": "web_hook",
+                "address": address,
+                "token": token,
+                "params": {"ttl": str(CHANNEL_TTL)},
+            },
+        ).execute()
+    except Exception:
+        _channels.pop(channel_id, None)
+        raise
+
+    expiration = None
+    if result.get("expiration"):
+        expiration = datetime.fromtimestamp(int(result["expiration"]) / 1000, tz=timezone.utc).replace(tzinfo=None)
+
+    db = database.SessionLocal()
+    try:
+        channel = CalendarChannel(
+            channel_id=channel_id,
+            calendar_id=calendar_id,
+            resource_id=result.get("resourceId"),
+            token=token,
+            expiration=expiration,
+        )
+        db.add(channel)
+        db.commit()
+        db.refresh(channel)
+    finally:
+        db.close()
+
+    _channels[channel_id] = (calendar_id, token, channel.resource_id)
+    calendar_store.set_watched(calendar_id, True)
+    logger.info("📡 Calendar watch channel %s registered (expires %s)", channel_id, expiration)
+    return channel
+
+
+def stop_channel(channel_id: str, resource_id: str | None):
+    """Stop a channel at Google (best effort) and forget it locally."""
+    if resource_id:
+        try:
+            get_calendar_service().channels().stop(body={"id": channel_id, "resourceId": resource_id}).execute()
+        except Exception as e:
+            logger.warning("⚠️ Failed to stop calendar channel: %s", e)
+
+    _channels.pop(channel_id, None)
+    db = database.SessionLocal()
+    try:
+        db.query(CalendarChannel).filter(CalendarChannel.channel_id == channel_id).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def renew_channels(address: str, calendar_id: str = "primary"):
+    """
+    Make sure `calendar_id` has a channel that will not expire within
+    RENEW_BEFORE; replace (then stop) any that are about to lapse.
+    """
+    db = database.SessionLocal()
+    try:
+        channels = db.query(CalendarChannel).filter(CalendarChannel.calendar_id == calendar_id).all()
+        channels = [(c.channel_id, c.resource_id, c.token, c.expiration) for c in channels]
+    finally:
+        db.close()
+
+    cutoff = _utcnow() + RENEW_BEFORE
+    live = [c for c in channels if c[3] is None or c[3] > cutoff]
+    expiring = [c for c in channels if c not in live]
+
+    for channel_id, resource_id, token, _ in live:
+        _channels[channel_id] = (calendar_id, token, resource_id)
+
+    if not live:
+        register_channel(address, calendar_id)
+        # Changes may have happened while we had no channel
+        calendar_store.mark_stale(calendar_id)
+    else:
+        calendar_store.set_watched(calendar_id, True)
+
+    for channel_id, resource_id, _, _ in expiring:
+        stop_channel(channel_id, resource_id)
+
+
+def _lookup_channel(channel_id: str) -> tuple[str, str, str | None] | None:
+    """Channel opened by another worker (or before a restart): read it from the DB and remember it."""
+    db = database.SessionLocal()
+    try:
+        channel = db.get(CalendarChannel, channel_id)
+        if not channel:
+            return None
+        known = _channels[channel_id] = (channel.calendar_id, channel.token, channel.resource_id)
+        return known
+    finally:
+        db.close()
+
+
+# ============================================================
+# 🔔 NOTIFICATIONS
+# ============================================================
+def _is_channel_id(value: str) -> bool:
+    try:
+        return str(uuid.UUID(value)) == value
+    except ValueError:
+        return False
+
+
+async def validate_notification(channel_id: str | None, token: str | None, resource_id: str | None) -> str | None:
+    """Return the channel's calendar id if the headers match a channel we opened, else None."""
+    if not channel_id or not token:
+        return None
+    known = _channels.get(channel_id)
+    if not known:
+        # Anyone can POST here: only ids shaped like ours cost a DB read, and never on the event loop
+        if not _is_channel_id(channel_id):
+            return None
+        known = await asyncio.to_thread(_lookup_channel, channel_id)
+    if not known:
+        return None
+    calendar_id, expected_token, expected_resource = known
+    if not hmac.compare_digest(token, expected_token):
+        return None
+    if expected_resource and resource_id and resource_id != expected_resource:
+        return None
+    return calendar_id
+
+
+def _sync(calendar_id: str) -> int:
+    changed = calendar_store.sync_events(get_calendar_service(), calendar_id)
+    if changed:
+        calendar_conflicts.invalidate(calendar_id)
+    return changed
+
+
+async def _debounced_sync(calendar_id: str):
+    try:
+        while True:
+            await asyncio.sleep(NOTIFY_DEBOUNCE)
+            _dirty.discard(calendar_id)
+            try:
+                changed = await calendar_async.run_calendar(_sync, calendar_id)
+                logger.info("🔄 Calendar %s synced after push (%s changes)", calendar_id, changed)
+            except Exception as e:
+                logger.warning("⚠️ Push-triggered calendar sync failed: %s", e)
+                calendar_store.mark_stale(calendar_id)
+            if calendar_id not in _dirty:
+                return
+    finally:
+        _pending.pop(calendar_id, None)
+
+
+def schedule_sync(calendar_id: str):
+    """
+    Queue an incremental sync for `calendar_id`. Notifications arriving
+    within NOTIFY_DEBOUNCE (or during the sync) collapse into one fetch.
+    """
+    if calendar_id in _pending:
+        _dirty.add(calendar_id)
+        return
+    _pending[calendar_id] = asyncio.create_task(_debounced_sync(calendar_id), context=tracing.detached())
+
+
+# ============================================================
+# ♻️ BACKGROUND RENEWAL
+# ============================================================
+async def run_renewal_loop(address: str, calendar_id: str = "primary"):
+    """Keep a live channel open for the lifetime of the app."""
+    while True:
+        try:
+            await calendar_async.run_calendar(renew_channels, address, calendar_id)
+        except Exception as e:
+            logger.warning("⚠️ Calendar channel renewal failed: %s", e)
+            calendar_store.set_watched(calendar_id, False)
+        await asyncio.sleep(RENEW_CHECK_INTERVAL)
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import os
+
+import calendar_async
+import google_calendar
+import tracing
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# ⚙️ CONFIG
+# ============================================================
+# Edits to the same event arriving within this window are merged into one PATCH.
+WRITE_DEBOUNCE = float(os.getenv("CALENDAR_WRITE_DEBOUNCE", "1.5"))
+
+
+# ============================================================
+# ✍️ WRITE-BEHIND QUEUE
+# ============================================================
+class CalendarWriteQueue:
+    """
+    Write-behind queue for calendar edits, keyed by event id.
+
+    - submit() returns immediately; changes for the same event are merged
+      (later values win) until WRITE_DEBOUNCE passes without a new edit.
+    - One worker task per event: batches for an event are written strictly
+      in order, edits arriving mid-write go into the next batch.
+    - When a batch lands, each submitter's newest `on_done(event, error)`
+      runs with the merged result: everyone who contributed an edit gets
+      one confirmation describing the final state.
+    """
+
+    def __init__(self, debounce: float = WRITE_DEBOUNCE):
+        self.debounce = debounce
+        self._pending: dict[str, dict] = {}          # event_id -> {"changes": {}, "on_done": {submitter: cb}, "user_id": id}
+        self._workers: dict[str, asyncio.Task] = {}  # event_id -> running worker
+        self._wakeups: dict[str, asyncio.Event] = {}
+
+    def submit(self, event_id: str, changes: dict, on_done=None, user_id: int | None = None, submitter=None):
+        """
+        Queue `changes` (keys: title, new_date, new_time) for `event_id`
+        in `user_id`'s calendar. `on_done` is an async callable
+        (updated_event | None, error | None); callbacks sharing a
+        `submitter` key (e.g. the same chat and user) are collapsed into the
+        newest one.
+        """
+        batch = self._pending.setdefault(event_id, {"changes": {}, "on_done": {}, "user_id": user_id})
+        batch["changes"].update({k: v for k, v in changes.items() if v})
+        if on_done:
+            key = submitter if submitter is not None else on_done
+            batch["on_done"].pop(key, None)  # re-insert so callbacks run in order of each submitter's last edit
+            batch["on_done"][key] = on_done
+
+        if event_id in self._workers:
+            self._wakeups[event_id].set()  # restart the debounce window
+        else:
+            self._wakeups[event_id] = asyncio.Event()
+            # The worker outlives the handler that submitted the edit: trace it on its own
+            self._workers[event_id] = asyncio.create_task(self._run(event_id), context=tracing.detached())
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def _wait_quiet(self, event_id: str):
+        """Sleep until no new edit for `event_id` arrived for a full debounce window."""
+        wakeup = self._wakeups[event_id]
+        while True:
+            wakeup.clear()
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=self.debounce)
+            except asyncio.TimeoutError:
+                return
+
+    async def _run(self, event_id: str):
+        try:
+            while event_id in self._pending:
+                await self._wait_quiet(event_id)
+                batch = self._pending.pop(event_id)
+
+                updated, error = None, None
+                try:
+                    updated = await calendar_async.run_calendar_write(
+                        google_calendar.update_event, event_id, user_id=batch["user_id"], **batch["changes"]
+                    )
+                except Exception as e:
+                    logger.exception("Calendar write-behind error: %s", e)
+                    error = e
+
+                for on_done in batch["on_done"].values():
+                    try:
+                        await on_done(updated, error)
+                    except Exception as e:
+                        logger.exception("Calendar write confirmation error: %s", e)
+        finally:
+            self._workers.pop(event_id, None)
+            self._wakeups.pop(event_id, None)
+
+    async def drain(self):
+        """Flush everything still pending (used on shutdown)."""
+        self.debounce = 0
+        for wakeup in list(self._wakeups.values()):
+            wakeup.set()
+        if self._workers:
+            await asyncio.gather(*self._workers.values(), return_exceptions=True)
+
+
+write_queue = CalendarWriteQueue()
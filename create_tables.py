@@ -1,6 +1,6 @@
 # create_tables.py
 from database import engine, Base
-from models import Book, Author,UserList
+from models import Book, Author,UserList, CalendarEvent, CalendarSyncState, CalendarChannel, UserCalendarCredential, EventMessageLink, ProcessedUpdate, LeaderLease, BotState, MeetingReminder
 
 Base.metadata.create_all(bind=engine)
 print("Tables created successfully!")
\ No newline at end of file
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+from cryptography.fernet import Fernet, InvalidToken
+from dotenv import load_dotenv
+
+import database
+from models import UserCalendarCredential
+
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+
+load_dotenv()
+
+# ============================================================
+# 🔐 ENCRYPTION
+# ============================================================
+# Generate once with: python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"
+ENCRYPTION_KEY = os.getenv("GOOGLE_TOKEN_ENCRYPTION_KEY")
+
+_fernet_instance = None
+
+
+def _fernet() -> Fernet:
+    global _fernet_instance
+    if _fernet_instance is None:
+        if not ENCRYPTION_KEY:
+            raise ValueError("❌ Missing GOOGLE_TOKEN_ENCRYPTION_KEY in environment variables!")
+        _fernet_instance = Fernet(ENCRYPTION_KEY.encode())
+    return _fernet_instance
+
+
+def sign_state(user_id: int, code_verifier: str) -> str:
+    """
+    OAuth `state` for a Telegram user: encrypted+authenticated, expires via
+    ttl on verify. It also carries the PKCE code verifier, so the callback
+    (possibly on another worker) can redeem the code without server-side state.
+    """
+    payload = json.dumps({"user_id": user_id, "code_verifier": code_verifier})
+    return _fernet().encrypt(payload.encode()).decode()
+
+
+def verify_state(state: str, max_age: int = 900) -> tuple[int, str] | None:
+    """Return (Telegram user id, PKCE code verifier) from a state created by sign_state(), or None."""
+    try:
+        payload = json.loads(_fernet().decrypt(state.encode(), ttl=max_age).decode())
+        return int(payload["user_id"]), payload["code_verifier"]
+    except (InvalidToken, ValueError, KeyError, TypeError):
+        return None
+
+
+# ============================================================
+# 💾 STORE
+# ============================================================
+def save_credentials(user_id: int, creds: Credentials):
+    """Encrypt and upsert a user's OAuth token."""
+    token = _fernet().encrypt(creds.to_json().encode()).decode()
+    db = database.SessionLocal()
+    try:
+        row = db.get(UserCalendarCredential, user_id)
+        if not row:
+            row = UserCalendarCredential(telegram_user_id=user_id)
+            db.add(row)
+        row.token_encrypted = token
+        row.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        db.commit()
+    finally:
+        db.close()
+
+
+def load_credentials(user_id: int) -> Credentials | None:
+    """
+    Decrypt a user's stored OAuth token, or None if they never connected.
+    "Not connected" is deliberately not cached: a /connect finished on
+    another worker must take effect on the very next call (a primary-key
+    read is cheap; connected users are cached in google_calendar).
+    """
+    db = database.SessionLocal()
+    try:
+        row = db.get(UserCalendarCredential, user_id)
+        token = row.token_encrypted if row else None
+    finally:
+        db.close()
+
+    if not token:
+        return None
+    from google.oauth2.credentials import Credentials
+
+    info = json.loads(_fernet().decrypt(token.encode()).decode())
+    return Credentials.from_authorized_user_info(info)
+
+
+def delete_credentials(user_id: int):
+    """Forget a user's token (e.g. after the grant was revoked)."""
+    db = database.SessionLocal()
+    try:
+        db.query(UserCalendarCredential).filter(UserCalendarCredential.telegram_user_id == user_id).delete()
+        db.commit()
+    finally:
+        db.close()
@@ -4,13 +4,15 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+import metrics
+
 load_dotenv()
 # Database URL
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL") 
-print(SQLALCHEMY_DATABASE_URL,'======================>==================')
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
 # SQLAlchemy engine
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
+metrics.instrument_engine(engine)
 
 # Session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
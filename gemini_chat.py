@@ -1,13 +1,19 @@
 from datetime import datetime, timedelta
+import logging
 import os
 import re
 import json
+import threading
 from dotenv import load_dotenv
-from google import genai
 from zoneinfo import ZoneInfo
 
+import metrics
+import resilience
+import tracing
+
 # Import your Google Calendar event creator
-from google_calendar import create_event
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -18,9 +24,62 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     raise ValueError("❌ Missing GEMINI_API_KEY in environment variables!")
 
-client = genai.Client(api_key=GEMINI_API_KEY)
 IST = ZoneInfo("Asia/Kolkata")
 
+# Per-request network timeout; a shorter caller deadline (resilience.deadline) wins
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "20"))
+# Meeting parsing is a pure read, so a second copy is sent if the first is this slow
+GEMINI_HEDGE_AFTER = float(os.getenv("GEMINI_HEDGE_AFTER", "3"))
+
+_client = None
+_client_lock = threading.Lock()
+
+GEMINI_SECONDS = metrics.registry.histogram("gemini_request_duration_seconds", "Gemini API call latency", ("call",))
+GEMINI_ERRORS = metrics.registry.counter("gemini_errors_total", "Gemini API calls that raised", ("call",))
+
+
+def get_client():
+    """The Gemini client, created on first use (importing google.genai alone takes ~0.8s)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from google import genai
+
+                _client = genai.Client(api_key=GEMINI_API_KEY)
+    return _client
+
+
+def _generate_once(call: str, contents: str):
+    from google.genai import types
+
+    resilience.check_deadline(f"gemini.{call}")
+    left = resilience.remaining()
+    timeout = GEMINI_TIMEOUT if left is None else min(GEMINI_TIMEOUT, left)
+    with tracing.span(f"gemini.{call}"), GEMINI_SECONDS.time(call=call):
+        try:
+            return get_client().models.generate_content(
+                model="gemini-2.0-flash",
+                contents=contents,
+                config=types.GenerateContentConfig(http_options=types.HttpOptions(timeout=max(1, int(timeout * 1000)))),
+            )
+        except Exception:
+            GEMINI_ERRORS.inc(call=call)
+            raise
+
+
+def _generate(call: str, contents: str, hedge: bool = False):
+    """
+    generate_content on gemini-2.0-flash, timed under `call` (reply / parse).
+    Fails fast with CircuitOpenError while Gemini is down; `hedge` sends a
+    duplicate request if the first one is slow (idempotent prompts only).
+    """
+    with resilience.gemini_breaker.guard():
+        if hedge:
+            return resilience.hedged(resilience.gemini_breaker, GEMINI_HEDGE_AFTER, _generate_once, call, contents)
+        return _generate_once(call, contents)
+
+
 # =====================================================
 # HELPERS
 # =====================================================
@@ -42,14 +101,13 @@ def get_gemini_reply(prompt: str) -> str:
             f"You are a helpful assistant. Respond naturally.\n\nUser query: {prompt}"
         )
 
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=full_prompt
-        )
+        response = _generate("reply", full_prompt)
 
         return response.text.strip() if response.text else "🤔 I’m not sure how to respond."
+    except resilience.CircuitOpenError:
+        return "🛠 My AI brain is taking a short break. Meeting commands like /schedule still work — try again in a minute."
     except Exception as e:
-        print("Gemini error:", e)
+        logger.exception("Gemini error: %s", e)
         return "⚠️ Sorry, I couldn’t process that request right now."
 
 
@@ -60,6 +118,7 @@ def parse_meeting_message(message: str) -> dict:
     """
     Extract meeting details (title, date, time, attendees) from a natural sentence using Gemini.
     Adjusts if the meeting is in the past (bumps to next day).
+    Falls back to quick_parse_meeting() when Gemini fails or its breaker is open.
     """
     prompt = f"""
 You are a meeting extraction assistant.
@@ -92,67 +151,114 @@ Now extract details from this message:
             f"{prompt}"
         )
 
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=full_prompt
-        )
+        response = _generate("parse", full_prompt, hedge=True)
         text = response.text.strip()
 
         # Extract JSON safely
         match = re.search(r"\{.*\}", text, re.DOTALL)
         parsed = json.loads(match.group(0)) if match else {}
 
-        title = parsed.get("title", "Untitled Meeting")
-        date_str = parsed.get("date")
-        time_str = parsed.get("time")
-        attendees = parsed.get("attendees", []) or []
-
-        # Normalize attendees (strip + remove blanks)
-        attendees = [a.strip() for a in attendees if isinstance(a, str) and a.strip()]
-
-        # Validate and adjust for past
-        past = False
-        if date_str and time_str:
-            try:
-                meeting_dt = datetime.strptime(
-                    f"{date_str} {time_str}", "%Y-%m-%d %H:%M"
-                ).replace(tzinfo=IST)
-                now_ist = get_ist_time()
-                if meeting_dt < now_ist:
-                    past = True
-                    meeting_dt += timedelta(days=1)
-                    date_str = meeting_dt.strftime("%Y-%m-%d")
-                    time_str = meeting_dt.strftime("%H:%M")
-                    print("⚠️ Adjusted meeting to future date/time")
-            except ValueError:
-                pass
-
-        return {
-            "title": title,
-            "date": date_str,
-            "time": time_str,
-            "attendees": attendees,
-            "past": past,
-        }
+        return _meeting_details(
+            parsed.get("title", "Untitled Meeting"),
+            parsed.get("date"),
+            parsed.get("time"),
+            parsed.get("attendees", []) or [],
+        )
 
     except Exception as e:
-        print("Gemini parse error:", e)
-        return {
-            "title": "Untitled",
-            "date": None,
-            "time": None,
-            "attendees": [],
-            "past": False,
-        }
+        if resilience.is_unavailable(e):
+            logger.warning("⚠️ Gemini unavailable, using the quick parser: %s", e)
+        else:
+            logger.exception("Gemini parse error: %s", e)
+        return quick_parse_meeting(message)
+
+
+def _meeting_details(title, date_str, time_str, attendees) -> dict:
+    """Normalize parsed fields; a time already past today is moved to tomorrow (`past` = True)."""
+    # Normalize attendees (strip + remove blanks)
+    attendees = [a.strip() for a in attendees if isinstance(a, str) and a.strip()]
+
+    # Validate and adjust for past
+    past = False
+    if date_str and time_str:
+        try:
+            meeting_dt = datetime.strptime(
+                f"{date_str} {time_str}", "%Y-%m-%d %H:%M"
+            ).replace(tzinfo=IST)
+            now_ist = get_ist_time()
+            if meeting_dt < now_ist:
+                past = True
+                meeting_dt += timedelta(days=1)
+                date_str = meeting_dt.strftime("%Y-%m-%d")
+                time_str = meeting_dt.strftime("%H:%M")
+                logger.info("⚠️ Adjusted meeting to future date/time")
+        except ValueError:
+            pass
+
+    return {
+        "title": title,
+        "date": date_str,
+        "time": time_str,
+        "attendees": attendees,
+        "past": past,
+    }
+
+
+# =====================================================
+# QUICK PARSER (fallback while Gemini is unavailable)
+# =====================================================
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_DATE_RE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+_TIME_RE = re.compile(r"\b(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm)\b|\b(\d{1,2}):(\d{2})\b", re.IGNORECASE)
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+
+
+def quick_parse_meeting(message: str) -> dict:
+    """
+    Rule-based fallback for the common phrasings ("tomorrow at 3pm",
+    "friday 10:30", "2025-11-02 9am"). Fields it cannot find stay None,
+    so callers ask the user to be more specific, as with Gemini.
+    """
+    text = message.lower()
+    today = get_ist_time().date()
+
+    date = None
+    if match := _DATE_RE.search(text):
+        date = match.group(1)
+    elif "tomorrow" in text:
+        date = (today + timedelta(days=1)).isoformat()
+    elif "today" in text or "tonight" in text:
+        date = today.isoformat()
+    else:
+        for i, day in enumerate(_WEEKDAYS):
+            if re.search(rf"\b{day}\b", text):
+                date = (today + timedelta(days=(i - today.weekday() - 1) % 7 + 1)).isoformat()
+                break
+
+    time = None
+    if match := _TIME_RE.search(text):
+        if match.group(3):
+            hour, minute = int(match.group(1)) % 12, int(match.group(2) or 0)
+            hour += 12 if match.group(3).lower() == "pm" else 0
+        else:
+            hour, minute = int(match.group(4)), int(match.group(5))
+        if hour < 24 and minute < 60:
+            time = f"{hour:02d}:{minute:02d}"
+
+    if time and not date:
+        date = today.isoformat()  # "at 5pm" means today (bumped to tomorrow if already past)
+
+    return _meeting_details("Meeting", date, time, _EMAIL_RE.findall(message))
 
 
 # =====================================================
 # INTERPRETER FUNCTION
 # =====================================================
-def interpret_command(command: str) -> str:
+def interpret_command(command: str) -> str | dict:
     """
-    Interpret a natural language command.  
-    If it's a meeting request → create a Google Calendar event.  
+    Interpret a natural language command.
+    If it's a meeting request → {"action": "create_meeting", **meeting details}
+    (the bot books it in the sender's calendar).
     Otherwise → use Gemini to reply conversationally.
     """
     command_lower = command.lower()
@@ -162,19 +268,7 @@ def interpret_command(command: str) -> str:
         details = parse_meeting_message(command)
         if not details.get("date") or not details.get("time"):
             return "⚠️ Couldn’t detect meeting date/time. Please specify clearly."
-
-        try:
-            created = create_event(
-                title=details["title"],
-                date=details["date"],
-                time=details["time"],
-                attendees=details["attendees"]
-            )
-            link = created.get("htmlLink", "(no link)")
-            return f"✅ Meeting '{details['title']}' scheduled on {details['date']} at {details['time']}.\n🔗 {link}"
-        except Exception as e:
-            print("Calendar error:", e)
-            return f"⚠️ Failed to schedule event: {e}"
+        return {"action": "create_meeting", **details}
 
     # Default fallback → Gemini response
     return get_gemini_reply(command)
@@ -183,15 +277,19 @@ def interpret_command(command: str) -> str:
 # =====================================================
 # GEMINI SETUP
 # =====================================================
-def setup_gemini():
+def setup_gemini() -> bool:
     """
     Initializes Gemini client to ensure the API key is loaded properly.
-    Called once from main.py during FastAPI startup.
+    Called once from main.py during FastAPI startup (in a worker thread).
+    Returns True if the API key works.
     """
     try:
         if not GEMINI_API_KEY:
             raise ValueError("❌ Missing GEMINI_API_KEY in environment variables!")
-        _ = client.models.list()  # Light check to confirm API key works
-        print("✅ Gemini API initialized successfully!")
+        with GEMINI_SECONDS.time(call="list_models"):
+            _ = get_client().models.list()  # Light check to confirm API key works
+        logger.info("✅ Gemini API initialized successfully!")
+        return True
     except Exception as e:
-        print("⚠️ Gemini setup failed:", e)
+        logger.warning("⚠️ Gemini setup failed: %s", e)
+        return False
@@ -1,14 +1,25 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-import os, base64, json
+from cachetools import LRUCache
+import logging
+import os, base64, json, secrets, threading, uuid
 from dotenv import load_dotenv
 
+import calendar_conflicts
+import metrics
+import resilience
+import tracing
+import calendar_store
+import credential_store
+
+logger = logging.getLogger(__name__)
+
 load_dotenv()
-SCOPES = ["https://www.googleapis.com/auth/calendar.events"]
+# calendar.readonly is what lets freebusy.query through (calendar.events alone does not)
+SCOPES = [
+    "https://www.googleapis.com/auth/calendar.events",
+    "https://www.googleapis.com/auth/calendar.readonly",
+]
 IST = ZoneInfo("Asia/Kolkata")
 
 
@@ -32,38 +43,278 @@ def ensure_google_files_exist():
             f.write(base64.b64decode(token_b64).decode("utf-8"))
 
 
-def get_calendar_service():
-    """
-    Return an authenticated Google Calendar API client.
-    Works for both local (interactive) and Render-hosted environments.
-    """
+# The Google client libraries take ~0.5s to import, so they are imported
+# inside the functions that need them instead of at module load.
+
+# Per-owner credentials and per-(owner, thread) API clients. httplib2 clients
+# are not thread-safe, so each calendar worker thread gets its own client,
+# while the Credentials object (and its refresh) is shared per owner.
+CLIENT_CACHE_SIZE = int(os.getenv("CALENDAR_CLIENT_CACHE_SIZE", "256"))
+REFRESH_AHEAD = timedelta(minutes=5)
+# Socket timeout for each API request (httplib2's default is 60s)
+CALENDAR_REQUEST_TIMEOUT = float(os.getenv("CALENDAR_REQUEST_TIMEOUT", "10"))
+
+_credentials = LRUCache(maxsize=CLIENT_CACHE_SIZE)      # owner -> Credentials
+_services = LRUCache(maxsize=CLIENT_CACHE_SIZE * 4)      # (owner, thread id) -> (creds, service)
+_refresh_locks: dict = {}
+_cache_lock = threading.Lock()
+
+CALENDAR_SECONDS = metrics.registry.histogram(
+    "calendar_api_duration_seconds", "Google Calendar API request latency", ("method",)
+)
+CALENDAR_ERRORS = metrics.registry.counter(
+    "calendar_api_errors_total", "Google Calendar API requests that failed", ("method", "status")
+)
+TOKEN_REFRESH_SECONDS = metrics.registry.histogram(
+    "calendar_token_refresh_duration_seconds", "OAuth token refresh latency"
+)
+_request_class = None
+
+
+def _load_default_credentials():
+    """The shared token.json account (used when a user has not connected their own)."""
+    from google.oauth2.credentials import Credentials
+
     ensure_google_files_exist()
 
     creds = None
     if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
+        # Keep the scopes the token was granted: refreshing with a scope that
+        # was never consented to fails with invalid_scope.
+        creds = Credentials.from_authorized_user_file("token.json")
+
+    if not creds or (not creds.valid and not (creds.expired and creds.refresh_token)):
+        # Local interactive auth only
+        if not os.path.exists("credentials.json"):
+            raise FileNotFoundError("credentials.json not found for local auth.")
+        from google_auth_oauthlib.flow import InstalledAppFlow
+
+        flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
+        creds = flow.run_local_server(port=0)
+        with open("token.json", "w") as token:
+            token.write(creds.to_json())
+
+    return creds
+
+
+def _refresh_lock(owner) -> threading.Lock:
+    with _cache_lock:
+        return _refresh_locks.setdefault(owner, threading.Lock())
+
+
+def _needs_refresh(creds) -> bool:
+    if not creds.valid:
+        return True
+    return bool(creds.expiry and creds.expiry - REFRESH_AHEAD < datetime.now(timezone.utc).replace(tzinfo=None))
+
 
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
+def _refresh(owner, creds):
+    """Refresh `creds` once, even if many threads notice the expiry together."""
+    from google.auth.transport.requests import Request
+
+    with _refresh_lock(owner):
+        if not _needs_refresh(creds):
+            return  # another thread got here first
+        with TOKEN_REFRESH_SECONDS.time():
             creds.refresh(Request())
+        if owner is None:
             with open("token.json", "w") as token:
                 token.write(creds.to_json())
         else:
-            # Local interactive auth only
-            if not os.path.exists("credentials.json"):
-                raise FileNotFoundError("credentials.json not found for local auth.")
-            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-            creds = flow.run_local_server(port=0)
-            with open("token.json", "w") as token:
-                token.write(creds.to_json())
+            credential_store.save_credentials(owner, creds)
+
+
+def _instrumented_request_class():
+    """
+    HttpRequest subclass that times every execute(), labelled by API method.
+    Requests are refused up front once the caller's deadline has passed or
+    while the calendar circuit breaker is open.
+    """
+    global _request_class
+    if _request_class is None:
+        from googleapiclient.http import HttpRequest
+
+        class InstrumentedHttpRequest(HttpRequest):
+            def execute(self, *args, **kwargs):
+                method = self.methodId or "unknown"
+                resilience.check_deadline(method)
+                with resilience.calendar_breaker.guard(), tracing.span(method), CALENDAR_SECONDS.time(method=method):
+                    try:
+                        return super().execute(*args, **kwargs)
+                    except Exception as e:
+                        status = getattr(getattr(e, "resp", None), "status", "error")
+                        CALENDAR_ERRORS.inc(method=method, status=status)
+                        raise
+
+        _request_class = InstrumentedHttpRequest
+    return _request_class
+
+
+def resolve_owner(user_id: int | None):
+    """`user_id` if that Telegram user connected their own calendar, else None (shared account)."""
+    if user_id is None:
+        return None
+    with _cache_lock:
+        if user_id in _credentials:
+            return user_id
+    creds = credential_store.load_credentials(user_id)
+    if not creds:
+        return None
+    with _cache_lock:
+        _credentials.setdefault(user_id, creds)
+    return user_id
+
 
-    return build("calendar", "v3", credentials=creds)
+def _get_credentials(owner):
+    with _cache_lock:
+        creds = _credentials.get(owner)
+    if creds is None:
+        creds = _load_default_credentials() if owner is None else credential_store.load_credentials(owner)
+        if creds is None:
+            raise LookupError(f"No Google credentials stored for user {owner}")
+        with _cache_lock:
+            creds = _credentials.setdefault(owner, creds)
+    if _needs_refresh(creds):
+        _refresh(owner, creds)
+    return creds
+
+
+def _new_http():
+    """Transport for one API client (bench/ swaps in a local Calendar stand-in)."""
+    import httplib2
+
+    return httplib2.Http(timeout=CALENDAR_REQUEST_TIMEOUT)
+
+
+@tracing.traced("calendar.get_service")
+def get_calendar_service(user_id: int | None = None):
+    """
+    Return an authenticated Google Calendar API client.
+    Works for both local (interactive) and Render-hosted environments.
+
+    With `user_id`, the Telegram user's own connected calendar is used
+    (falling back to the shared account if they have not connected one).
+    Clients are cached, so this does not re-read files or rebuild on each call.
+    """
+    owner = resolve_owner(user_id)
+    creds = _get_credentials(owner)
+
+    key = (owner, threading.get_ident())
+    with _cache_lock:
+        cached = _services.get(key)
+    if cached and cached[0] is creds:
+        return cached[1]
+
+    from google_auth_httplib2 import AuthorizedHttp
+    from googleapiclient.discovery import build
+
+    service = build(
+        "calendar", "v3", cache_discovery=False,
+        http=AuthorizedHttp(creds, http=_new_http()),
+        requestBuilder=_instrumented_request_class(),
+    )
+    with _cache_lock:
+        _services[key] = (creds, service)
+    return service
+
+
+def refresh_expiring_credentials():
+    """
+    Refresh every cached credential that is about to expire, so request
+    paths rarely pay for a token refresh. Run periodically in the background.
+    """
+    with _cache_lock:
+        owners = list(_credentials.items())
+    for owner, creds in owners:
+        if _needs_refresh(creds):
+            try:
+                _refresh(owner, creds)
+            except Exception as e:
+                logger.warning("⚠️ Token refresh failed for %s: %s", owner or 'default account', e)
+
+
+# ============================================================
+# 🔗 PER-USER CONNECT (OAuth web flow)
+# ============================================================
+def _flow(redirect_uri: str, code_verifier: str, state: str | None = None):
+    """
+    Web-flow helper with an explicit PKCE verifier: the Flow that builds the
+    consent URL is gone by the time Google calls back, so the same verifier
+    has to be handed to the Flow that exchanges the code.
+    """
+    from google_auth_oauthlib.flow import Flow
+
+    return Flow.from_client_config(
+        _client_config(), SCOPES, redirect_uri=redirect_uri, state=state,
+        code_verifier=code_verifier, autogenerate_code_verifier=False,
+    )
+
+
+def _client_config() -> dict:
+    ensure_google_files_exist()
+    with open("credentials.json") as f:
+        return json.load(f)
+
+
+def build_user_auth_url(user_id: int, redirect_uri: str) -> str:
+    """Google consent URL that will link the calendar to Telegram user `user_id`."""
+    code_verifier = secrets.token_urlsafe(64)  # 86 chars of [A-Za-z0-9_-], within RFC 7636's 43-128
+    flow = _flow(redirect_uri, code_verifier)
+    url, _ = flow.authorization_url(
+        access_type="offline",
+        prompt="consent",
+        state=credential_store.sign_state(user_id, code_verifier),
+    )
+    return url
+
+
+def complete_user_auth(code: str, state: str, redirect_uri: str) -> int | None:
+    """Exchange the OAuth `code` and store the token for the user encoded in `state`."""
+    verified = credential_store.verify_state(state)
+    if verified is None:
+        return None
+    user_id, code_verifier = verified
+    flow = _flow(redirect_uri, code_verifier, state)
+    flow.fetch_token(code=code)
+    credential_store.save_credentials(user_id, flow.credentials)
+    with _cache_lock:
+        _credentials[user_id] = flow.credentials
+    calendar_conflicts.invalidate(user_id=user_id)  # the new grant may allow FreeBusy
+    return user_id
 
 
 # ============================================================
 # 📅 CREATE EVENT
 # ============================================================
-def create_event(title: str, date: str, time: str, attendees: list[str] | None = None):
+def _insert_event(service, event: dict) -> dict:
+    """
+    events().insert with a client-chosen event id, so resending after a lost
+    response cannot book the meeting twice: if the first attempt did land,
+    Google answers 409 and the existing event is returned instead.
+    """
+    from googleapiclient.errors import HttpError
+
+    event["id"] = uuid.uuid4().hex  # base32hex-safe (0-9a-f)
+
+    def insert():
+        return service.events().insert(calendarId="primary", body=event, sendUpdates="all").execute()
+
+    try:
+        return insert()
+    except resilience.DeadlineExceeded:
+        raise  # refused before sending, nothing to resend
+    except (TimeoutError, ConnectionError) as e:
+        logger.warning("⚠️ No answer to insert of %s (%s), resending", event["id"], e)
+
+    try:
+        return insert()
+    except HttpError as e:
+        if e.resp.status != 409:
+            raise
+        return service.events().get(calendarId="primary", eventId=event["id"]).execute()
+
+
+def create_event(title: str, date: str, time: str, attendees: list[str] | None = None, user_id: int | None = None):
     """
     Create a Google Calendar event with optional attendees.
 
@@ -71,10 +322,12 @@ def create_event(title: str, date: str, time: str, attendees: list[str] | None =
     - date: ISO date 'YYYY-MM-DD'
     - time: 24-hour 'HH:MM'
     - attendees: optional list of email strings
+    - user_id: Telegram user whose connected calendar to use (shared account if None/not connected)
 
     Returns: dict (Google event object) or raises Exception on failure.
     """
-    service = get_calendar_service()
+    owner = resolve_owner(user_id)
+    service = get_calendar_service(owner)
 
     try:
         start_dt = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M").replace(tzinfo=IST)
@@ -92,75 +345,146 @@ def create_event(title: str, date: str, time: str, attendees: list[str] | None =
     if attendees:
         event["attendees"] = [{"email": email} for email in attendees]
 
-    created = service.events().insert(calendarId="primary", body=event, sendUpdates="all").execute()
+    created = _insert_event(service, event)
+    calendar_store.upsert_event(created, user_id=owner)
+    calendar_conflicts.record_busy(start_dt, end_dt, user_id=owner)
     return created
 
 
+# ============================================================
+# ⚔️ AVAILABILITY CHECK
+# ============================================================
+def check_availability(date: str, time: str, duration: timedelta = timedelta(hours=1), user_id: int | None = None):
+    """
+    Check whether 'date' 'time' (+duration) is free.
+
+    Returns (conflicts, suggestions): the busy (start, end) blocks that
+    overlap the slot, and — only when there are conflicts — the nearest
+    free start times.
+    """
+    owner = resolve_owner(user_id)
+    service = get_calendar_service(owner)
+    start_dt = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M").replace(tzinfo=IST)
+    conflicts = calendar_conflicts.find_conflicts(service, start_dt, start_dt + duration, user_id=owner)
+    if not conflicts:
+        return [], []
+    return conflicts, calendar_conflicts.suggest_free_slots(service, start_dt, duration, user_id=owner)
+
+
 # ============================================================
 # 🔍 FIND LATEST UPCOMING EVENT
 # ============================================================
-def find_latest_event(service):
+def find_latest_event(service, user_id: int | None = None):
     """
     Return the most recent upcoming event (soonest future event).
+    Answered from the local mirror; Google is only asked for changes
+    (incremental syncToken fetch) when the mirror has gone stale. While
+    Google is unreachable the stale mirror is used as is.
     """
-    now = datetime.now(IST).isoformat()
-    events_result = (
-        service.events()
-        .list(
-            calendarId="primary",
-            timeMin=now,
-            maxResults=1,
-            singleEvents=True,
-            orderBy="startTime",
-        )
-        .execute()
-    )
-    events = events_result.get("items", [])
-    return events[0] if events else None
+    try:
+        calendar_store.ensure_fresh(service, user_id=user_id)
+    except Exception as e:
+        if not resilience.is_unavailable(e):
+            raise
+        logger.warning("⚠️ Calendar unavailable, answering from the local mirror: %s", e)
+    return calendar_store.get_next_event(user_id=user_id)
 
 
 # ============================================================
-# ✏️ UPDATE EVENT TITLE
+# 🎯 EVENT LOOKUP + PATCH (id-addressed)
 # ============================================================
-def update_event_title(new_title: str):
+def get_event(service, event_id: str | None, user_id: int | None = None):
     """
-    Update the title of the most recent upcoming event.
+    Return the event with `event_id` (mirror first, then events().get).
+    With no id, fall back to the soonest upcoming event.
     """
-    service = get_calendar_service()
-    event = find_latest_event(service)
-    if not event:
-        print("⚠️ No upcoming events found.")
-        return None
+    if not event_id:
+        return find_latest_event(service, user_id)
+
+    event = calendar_store.get_event(event_id, user_id=user_id)
+    if event:
+        return event
+
+    event = service.events().get(calendarId="primary", eventId=event_id).execute()
+    calendar_store.upsert_event(event, user_id=user_id)
+    return event
+
 
-    event["summary"] = new_title
-    updated = service.events().update(
+def patch_event(service, event_id: str, fields: dict, user_id: int | None = None):
+    """
+    Send only the changed `fields` for one event (events().patch) and
+    write the result back into the local mirror.
+    """
+    updated = service.events().patch(
         calendarId="primary",
-        eventId=event["id"],
-        body=event,
+        eventId=event_id,
+        body=fields,
         sendUpdates="all",
     ).execute()
+    calendar_store.upsert_event(updated, user_id=user_id)
+    if "start" in fields or "end" in fields:
+        calendar_conflicts.invalidate(user_id=user_id)
+    return updated
+
+
+def _event_start_and_duration(event: dict) -> tuple[datetime, timedelta]:
+    """Current start (IST) and duration of an event; all-day events count as 1h."""
+    start = event.get("start", {})
+    end = event.get("end", {})
+    if start.get("dateTime"):
+        start_dt = datetime.fromisoformat(start["dateTime"]).astimezone(IST)
+        if end.get("dateTime"):
+            return start_dt, datetime.fromisoformat(end["dateTime"]) - datetime.fromisoformat(start["dateTime"])
+        return start_dt, timedelta(hours=1)
+    start_dt = datetime.strptime(start["date"], "%Y-%m-%d").replace(tzinfo=IST)
+    return start_dt, timedelta(hours=1)
+
+
+def _time_fields(new_start: datetime, duration: timedelta) -> dict:
+    """PATCH body for a new start/end (clears `date` in case the event was all-day)."""
+    return {
+        "start": {"dateTime": new_start.isoformat(), "timeZone": "Asia/Kolkata", "date": None},
+        "end": {"dateTime": (new_start + duration).isoformat(), "timeZone": "Asia/Kolkata", "date": None},
+    }
+
 
-    print(f"✅ Updated title to: {new_title}")
+# ============================================================
+# ✏️ UPDATE EVENT TITLE
+# ============================================================
+def update_event_title(event_id: str | None, new_title: str, user_id: int | None = None):
+    """
+    Update the title of event `event_id` (or the next upcoming event if None).
+    """
+    owner = resolve_owner(user_id)
+    service = get_calendar_service(owner)
+    event = get_event(service, event_id, owner)
+    if not event:
+        logger.warning("⚠️ No matching event found.")
+        return None
+
+    updated = patch_event(service, event["id"], {"summary": new_title}, owner)
+
+    logger.info("✅ Updated title to: %s", new_title)
     return updated
 
 
 # ============================================================
 # ⏰ UPDATE EVENT TIME
 # ============================================================
-def update_event_time(new_time: str):
+def update_event_time(event_id: str | None, new_time: str, user_id: int | None = None):
     """
-    Change only the time of the latest event, keeping the same date.
+    Change only the time of the event, keeping the same date and duration.
     Expects 'new_time' in 'HH:MM' 24-hour format.
     """
-    service = get_calendar_service()
-    event = find_latest_event(service)
+    owner = resolve_owner(user_id)
+    service = get_calendar_service(owner)
+    event = get_event(service, event_id, owner)
     if not event:
-        print("⚠️ No upcoming events found.")
+        logger.warning("⚠️ No matching event found.")
         return None
 
     try:
-        # Extract current event date
-        current_start = datetime.fromisoformat(event["start"]["dateTime"]).astimezone(IST)
+        current_start, duration = _event_start_and_duration(event)
         new_start = datetime.strptime(new_time, "%H:%M").replace(
             year=current_start.year,
             month=current_start.month,
@@ -168,61 +492,159 @@ def update_event_time(new_time: str):
             tzinfo=IST,
         )
     except ValueError:
-        print(f"❌ Invalid time format: {new_time}")
+        logger.warning("❌ Invalid time format: %s", new_time)
         return None
 
-    new_end = new_start + timedelta(hours=1)
-    event["start"]["dateTime"] = new_start.isoformat()
-    event["end"]["dateTime"] = new_end.isoformat()
+    updated = patch_event(service, event["id"], _time_fields(new_start, duration), owner)
 
-    updated = service.events().update(
-        calendarId="primary",
-        eventId=event["id"],
-        body=event,
-        sendUpdates="all",
-    ).execute()
-
-    print(f"✅ Event time updated to: {new_time}")
+    logger.info("✅ Event time updated to: %s", new_time)
     return updated
 
 
 # ============================================================
 # 📆 UPDATE EVENT DATE
 # ============================================================
-def update_event_date(new_date: str):
+def update_event_date(event_id: str | None, new_date: str, new_time: str | None = None, user_id: int | None = None):
     """
-    Change the date of the latest event while preserving time.
-    Expects 'new_date' in 'YYYY-MM-DD' format.
+    Change the date of the event while preserving time and duration.
+    Expects 'new_date' in 'YYYY-MM-DD' format. If 'new_time' ('HH:MM')
+    is given too, this is a full reschedule in a single PATCH.
     """
-    service = get_calendar_service()
-    event = find_latest_event(service)
+    if new_time:
+        return reschedule_event(event_id, new_date, new_time, user_id)
+
+    owner = resolve_owner(user_id)
+    service = get_calendar_service(owner)
+    event = get_event(service, event_id, owner)
     if not event:
-        print("⚠️ No upcoming events found.")
+        logger.warning("⚠️ No matching event found.")
         return None
 
     try:
-        start = datetime.fromisoformat(event["start"]["dateTime"]).astimezone(IST)
+        start, duration = _event_start_and_duration(event)
         new_date_obj = datetime.strptime(new_date, "%Y-%m-%d").date()
         new_start = datetime.combine(new_date_obj, start.time(), tzinfo=IST)
     except ValueError:
-        print(f"❌ Invalid date format: {new_date}")
+        logger.warning("❌ Invalid date format: %s", new_date)
         return None
 
-    new_end = new_start + timedelta(hours=1)
-    event["start"]["dateTime"] = new_start.isoformat()
-    event["end"]["dateTime"] = new_end.isoformat()
+    updated = patch_event(service, event["id"], _time_fields(new_start, duration), owner)
 
-    updated = service.events().update(
-        calendarId="primary",
-        eventId=event["id"],
-        body=event,
-        sendUpdates="all",
-    ).execute()
+    logger.info("✅ Event moved to new date: %s", new_date)
+    return updated
 
-    print(f"✅ Event moved to new date: {new_date}")
+
+# ============================================================
+# 🔁 RESCHEDULE (date + time together)
+# ============================================================
+def reschedule_event(event_id: str | None, new_date: str, new_time: str, user_id: int | None = None):
+    """
+    Move the event to 'new_date' ('YYYY-MM-DD') at 'new_time' ('HH:MM'),
+    keeping its duration. One PATCH instead of separate date and time edits.
+    """
+    try:
+        new_start = datetime.strptime(f"{new_date} {new_time}", "%Y-%m-%d %H:%M").replace(tzinfo=IST)
+    except ValueError:
+        logger.warning("❌ Invalid date/time format: %s %s", new_date, new_time)
+        return None
+
+    owner = resolve_owner(user_id)
+    service = get_calendar_service(owner)
+    event = get_event(service, event_id, owner)
+    if not event:
+        logger.warning("⚠️ No matching event found.")
+        return None
+
+    _, duration = _event_start_and_duration(event)
+    updated = patch_event(service, event["id"], _time_fields(new_start, duration), owner)
+
+    logger.info("✅ Event rescheduled to: %s %s", new_date, new_time)
+    return updated
+
+
+# ============================================================
+# 🧩 COMBINED UPDATE (title/date/time in one PATCH)
+# ============================================================
+def update_event(
+    event_id: str | None,
+    title: str | None = None,
+    new_date: str | None = None,
+    new_time: str | None = None,
+    user_id: int | None = None,
+):
+    """
+    Apply any mix of title / date ('YYYY-MM-DD') / time ('HH:MM') changes
+    to one event with a single PATCH. Missing date or time keeps the
+    event's current value; duration is preserved.
+    """
+    owner = resolve_owner(user_id)
+    service = get_calendar_service(owner)
+    event = get_event(service, event_id, owner)
+    if not event:
+        logger.warning("⚠️ No matching event found.")
+        return None
+
+    fields = {}
+    if title:
+        fields["summary"] = title
+
+    if new_date or new_time:
+        try:
+            current_start, duration = _event_start_and_duration(event)
+            day = datetime.strptime(new_date, "%Y-%m-%d").date() if new_date else current_start.date()
+            at = datetime.strptime(new_time, "%H:%M").time() if new_time else current_start.time()
+            new_start = datetime.combine(day, at, tzinfo=IST)
+        except ValueError:
+            logger.warning("❌ Invalid date/time format: %s %s", new_date, new_time)
+            return None
+        fields.update(_time_fields(new_start, duration))
+
+    if not fields:
+        return event
+
+    updated = patch_event(service, event["id"], fields, owner)
+
+    logger.info("✅ Event %s updated: %s", event['id'], ', '.join(fields))
     return updated
 
 
+# ============================================================
+# 🗑️ DELETE EVENT
+# ============================================================
+def delete_event(event_id: str, user_id: int | None = None) -> bool:
+    """
+    Delete event `event_id` (attendees are notified) and drop it from the
+    local mirror. An event that is already gone counts as deleted.
+    """
+    from googleapiclient.errors import HttpError
+
+    owner = resolve_owner(user_id)
+    service = get_calendar_service(owner)
+    try:
+        service.events().delete(calendarId="primary", eventId=event_id, sendUpdates="all").execute()
+    except HttpError as e:
+        if e.resp.status not in (404, 410):
+            raise
+    calendar_store.remove_event(event_id, user_id=owner)
+    calendar_conflicts.invalidate(user_id=owner)
+    logger.info("🗑️ Event %s deleted", event_id)
+    return True
+
+
+# ============================================================
+# 🕒 FREE SLOTS FOR AN EXISTING EVENT
+# ============================================================
+def suggest_slots(event_id: str, count: int = 4, user_id: int | None = None) -> list[datetime]:
+    """Nearest free start times (IST) the event could move to, keeping its duration."""
+    owner = resolve_owner(user_id)
+    service = get_calendar_service(owner)
+    event = get_event(service, event_id, owner)
+    if not event:
+        return []
+    start, duration = _event_start_and_duration(event)
+    return calendar_conflicts.suggest_free_slots(service, start, duration, count=count, user_id=owner)
+
+
 # ============================================================
 # 🧪 LOCAL TEST (for debugging)
 # ============================================================
@@ -235,11 +657,11 @@ if __name__ == "__main__":
     # created = create_event("Demo Meeting", "2025-10-29", "10:00", ["test@gmail.com"])
     # print("✅ Created:", created.get("htmlLink"))
 
-    updated = update_event_title("Daily Syncup (Test)")
+    updated = update_event_title(None, "Daily Syncup (Test)")
     if updated:
         print("✅ Event title updated:", updated.get("htmlLink"))
     else:
         print("⚠️ No upcoming events found.")
 
-    # update_event_time("22:00")
-    # update_event_date("2025-10-30")
+    # update_event_time(None, "22:00")
+    # update_event_date(None, "2025-10-30")
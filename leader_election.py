@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+import database
+from models import LeaderLease
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# ⚙️ CONFIG
+# ============================================================
+# With `uvicorn --workers N` (or several instances behind a load balancer)
+# only the lease holder polls Telegram, registers the webhook and renews
+# calendar watch channels. A crashed leader is replaced after LEADER_LEASE_TTL.
+LEASE_TTL = float(os.getenv("LEADER_LEASE_TTL", "30"))
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# ============================================================
+# 👑 LEASE
+# ============================================================
+class LeaderElection:
+    """
+    Lease row in `leader_leases`: whoever holds an unexpired lease is the
+    leader and renews it every ttl/3. Works on any SQL database (no
+    advisory-lock support needed).
+
+    run() calls `on_elected()` when this worker becomes leader and
+    `on_deposed()` when it loses the lease (or can no longer renew it).
+    """
+
+    def __init__(self, name: str, ttl: float = LEASE_TTL, holder: str = WORKER_ID):
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder
+        self.is_leader = False
+        self._renewed_at = 0.0
+
+    # --- blocking DB helpers (run in a thread) ---
+    def try_acquire(self) -> bool:
+        """Take or renew the lease; False if another live worker holds it."""
+        now = _utcnow()
+        expires = now + timedelta(seconds=self.ttl)
+        db = database.SessionLocal()
+        try:
+            renewed = (
+                db.query(LeaderLease)
+                .filter(
+                    LeaderLease.name == self.name,
+                    or_(LeaderLease.holder == self.holder, LeaderLease.expires_at < now),
+                )
+                .update({"holder": self.holder, "expires_at": expires}, synchronize_session=False)
+            )
+            if renewed:
+                db.commit()
+                return True
+            if db.get(LeaderLease, self.name) is not None:
+                db.rollback()
+                return False  # held by someone else
+            db.add(LeaderLease(name=self.name, holder=self.holder, expires_at=expires))
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                return False  # another worker inserted it first
+            return True
+        finally:
+            db.close()
+
+    def release(self):
+        """Give the lease up so another worker can take over right away."""
+        db = database.SessionLocal()
+        try:
+            db.query(LeaderLease).filter(
+                LeaderLease.name == self.name, LeaderLease.holder == self.holder
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        self.is_leader = False
+
+    # --- async loop ---
+    async def run(self, on_elected, on_deposed):
+        while True:
+            try:
+                acquired = await asyncio.to_thread(self.try_acquire)
+                if acquired:
+                    self._renewed_at = time.monotonic()
+            except Exception as e:
+                logger.warning("⚠️ Leader lease check failed: %s", e)
+                # Keep leading only while the last renewal is still valid
+                acquired = self.is_leader and time.monotonic() - self._renewed_at < self.ttl
+
+            if acquired and not self.is_leader:
+                self.is_leader = True
+                logger.info("👑 %s is now the '%s' leader", self.holder, self.name)
+                await self._call(on_elected)
+            elif not acquired and self.is_leader:
+                self.is_leader = False
+                logger.warning("⚠️ %s lost the '%s' lease", self.holder, self.name)
+                await self._call(on_deposed)
+
+            await asyncio.sleep(self.ttl / 3)
+
+    @staticmethod
+    async def _call(callback):
+        try:
+            await callback()
+        except Exception as e:
+            logger.warning("⚠️ Leader transition error: %s", e)
+
+
+telegram_leader = LeaderElection("telegram")
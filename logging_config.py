@@ -0,0 +1,181 @@
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+import tracing
+
+load_dotenv()
+
+# ============================================================
+# ⚙️ CONFIG
+# ============================================================
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Per-module overrides, e.g. "google_calendar=DEBUG,sqlalchemy.engine=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "googleapiclient.discovery_cache=ERROR,httpx=WARNING")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# The same warning/error (logger + message template) is emitted at most once per window
+LOG_REPEAT_WINDOW = float(os.getenv("LOG_REPEAT_WINDOW", "60"))
+
+_context: contextvars.ContextVar[dict] = contextvars.ContextVar("log_context", default={})
+_listener: logging.handlers.QueueListener | None = None
+
+
+@contextlib.contextmanager
+def log_context(**fields):
+    """Attach correlation fields (request_id, chat_id, update_id, ...) to every log line in this block."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+# ============================================================
+# 🧩 FILTERS (run on the caller's thread, before the record is queued)
+# ============================================================
+class CorrelationFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.context = dict(_context.get())
+        span = tracing.current()
+        if span is not None:
+            record.context.setdefault("trace_id", span.trace.trace_id)
+        return True
+
+
+class RepeatFilter(logging.Filter):
+    """Drop repeats of the same WARNING+ message within LOG_REPEAT_WINDOW; report how many were dropped."""
+
+    def __init__(self, window: float = LOG_REPEAT_WINDOW):
+        super().__init__()
+        self.window = window
+        self._seen: dict[tuple, list] = {}  # key -> [last emitted at, suppressed count]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING or self.window <= 0:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._seen.get(key)
+            if state and now - state[0] < self.window:
+                state[1] += 1
+                return False
+            if state and state[1]:
+                record.suppressed = state[1]
+            self._seen[key] = [now, 0]
+            if len(self._seen) > 10000:
+                self._seen.clear()
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks: if the writer thread falls behind, records are dropped and counted."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Render args and traceback on the caller's thread; formatting happens on the writer thread."""
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+            record.exc_info = None
+        return record
+
+
+# ============================================================
+# 🖨️ FORMATTERS (run on the listener thread)
+# ============================================================
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "context", {}))
+        if getattr(record, "suppressed", 0):
+            entry["suppressed_repeats"] = record.suppressed
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        context = getattr(record, "context", None)
+        if context:
+            line += " " + " ".join(f"{k}={v}" for k, v in context.items())
+        return line
+
+
+# ============================================================
+# 🚀 SETUP
+# ============================================================
+def _parse_levels(spec: str) -> dict[str, str]:
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """
+    Route all logging through a bounded queue to one background writer
+    thread (JSON lines on stdout by default). Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    handler.addFilter(CorrelationFilter())
+    handler.addFilter(RepeatFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(LOG_LEVEL)
+    for name, level in _parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,14 +1,34 @@
+import logging
 import os
 import asyncio
+import time
+import uuid
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from telegram import Update
 from telegram_bot.setup import setup_telegram_bot
+from telegram_bot import update_queue
+from telegram_bot.dedup import deduplicator
+from telegram_bot.handlers.connect_handler import oauth_redirect_url
 from gemini_chat import setup_gemini
-from google_calendar import get_calendar_service
+from google_calendar import get_calendar_service, complete_user_auth
+import calendar_async
+import metrics
+import profiler
+import resilience
+import tracing
+import logging_config
+import calendar_watch
+from calendar_write_queue import write_queue
+from leader_election import telegram_leader
+from telegram_bot.reminders import reminders
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
+logging_config.setup_logging()
 
 app = FastAPI(title="Smart Assistant API", version="1.0")
 
@@ -20,64 +40,361 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+HTTP_REQUESTS = metrics.registry.counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+HTTP_SECONDS = metrics.registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+)
+HTTP_IN_PROGRESS = metrics.registry.gauge("http_requests_in_progress", "HTTP requests being served")
+
+
+@app.middleware("http")
+async def record_http_metrics(request: Request, call_next):
+    HTTP_IN_PROGRESS.inc()
+    started = time.perf_counter()
+    status = 500
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:12]
+    try:
+        with logging_config.log_context(request_id=request_id):
+            response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        HTTP_IN_PROGRESS.dec()
+        # Route template (e.g. /oauth/callback), not the raw path, keeps label cardinality bounded
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_SECONDS.observe(time.perf_counter() - started, method=request.method, route=route)
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=status)
+
+
 telegram_app = None  # Will hold the Application instance
+calendar_watch_task = None  # Background events().watch renewal loop
+credential_refresh_task = None  # Background OAuth token refresh
+health_probe_task = None  # Gemini / Calendar checks running after startup
+leader_task = None  # Leader lease loop (polling / webhook / watch channels)
 
+# Opt-in, for a deliberate fresh deploy: discard updates Telegram queued while the bot was down.
+# Never applied when the webhook already points here (leader failover), so re-elections keep them.
+DROP_PENDING_UPDATES = os.getenv("TELEGRAM_DROP_PENDING_UPDATES", "").lower() == "true"
+
+startup_timings: dict[str, float] = {}  # step -> milliseconds
+health = {"gemini": None, "calendar": None}  # None until the probe has finished
 
-@app.on_event("startup")
-async def startup_event():
-    global telegram_app
-    print("🚀 Initializing Smart Assistant components...")
 
-    # Gemini init
-    setup_gemini()
-    print("✅ Gemini API initialized successfully!")
+# ============================================================
+# 🩺 STARTUP HELPERS
+# ============================================================
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
 
-    # Google Calendar check
+
+def _check_calendar() -> bool:
     try:
         get_calendar_service()
-        print("✅ Google Calendar connected successfully!")
+        logger.info("✅ Google Calendar connected successfully!")
+        return True
     except Exception as e:
-        print("⚠️ Google Calendar setup failed:", e)
+        logger.warning("⚠️ Google Calendar setup failed: %s", e)
+        return False
+
+
+async def _probe(name: str, awaitable):
+    started = time.perf_counter()
+    try:
+        health[name] = bool(await awaitable)
+    except Exception as e:
+        logger.warning("⚠️ %s health check failed: %s", name, e)
+        health[name] = False
+    startup_timings[f"{name}_probe"] = _elapsed_ms(started)
 
-    # Telegram setup (returns Application)
-    telegram_app = setup_telegram_bot(app)
-    print("✅ Telegram bot initialized successfully.")
 
-    # Choose webhook vs polling based on RENDER env
-    if os.getenv("RENDER", "").lower() == "true":
-        render_url = os.getenv("RENDER_EXTERNAL_URL")
-        if not render_url:
-            raise RuntimeError("Missing RENDER_EXTERNAL_URL")
+async def run_health_probes():
+    """
+    Gemini and Calendar checks, concurrently and in worker threads.
+    Started in the background so the app serves requests without waiting on them.
+    """
+    await asyncio.gather(
+        _probe("gemini", asyncio.to_thread(setup_gemini)),
+        _probe("calendar", calendar_async.run_calendar(_check_calendar)),
+    )
+    logger.info(
+        "⏱️ Health checks done: gemini %sms, calendar %sms",
+        startup_timings["gemini_probe"], startup_timings["calendar_probe"],
+    )
 
-        full_webhook_url = f"{render_url.rstrip('/')}/webhook"
 
+def _webhook_mode() -> bool:
+    return os.getenv("RENDER", "").lower() == "true"
+
+
+def _calendar_notify_url() -> str | None:
+    notify_url = os.getenv("CALENDAR_NOTIFY_URL")
+    if not notify_url and os.getenv("RENDER_EXTERNAL_URL"):
+        notify_url = f"{os.getenv('RENDER_EXTERNAL_URL').rstrip('/')}/calendar/notify"
+    return notify_url
+
+
+# ============================================================
+# 👑 LEADER DUTIES (one worker only)
+# ============================================================
+async def on_elected():
+    """This worker holds the lease: receive updates and own the watch channels."""
+    global calendar_watch_task
+    if _webhook_mode():
+        # setWebhook replaces any previous webhook; no delete/sleep round trip needed
+        full_webhook_url = f"{os.getenv('RENDER_EXTERNAL_URL').rstrip('/')}/webhook"
         try:
-            await telegram_app.initialize()
-            await telegram_app.start()
-            await telegram_app.bot.delete_webhook(drop_pending_updates=True)
-            await asyncio.sleep(2)  # small warmup
-            ok = await telegram_app.bot.set_webhook(full_webhook_url)
-            print("✅ Webhook set:", ok)
-            info = await telegram_app.bot.get_webhook_info()
-            print("ℹ️ Telegram webhook info:", info.to_dict())
+            step = time.perf_counter()
+            drop_pending = False
+            if DROP_PENDING_UPDATES:
+                info = await telegram_app.bot.get_webhook_info()
+                drop_pending = info.url != full_webhook_url
+            ok = await telegram_app.bot.set_webhook(
+                full_webhook_url,
+                secret_token=update_queue.WEBHOOK_SECRET,
+                drop_pending_updates=drop_pending,
+            )
+            if drop_pending:
+                logger.info("🧹 Pending Telegram updates dropped (TELEGRAM_DROP_PENDING_UPDATES)")
+            startup_timings["set_webhook"] = _elapsed_ms(step)
+            logger.info("✅ Webhook set: %s", ok)
+            if not update_queue.WEBHOOK_SECRET:
+                logger.warning("⚠️ TELEGRAM_WEBHOOK_SECRET not set — /webhook accepts unauthenticated posts")
         except Exception as e:
-            print("⚠️ Failed to set webhook:", e)
-
+            logger.warning("⚠️ Failed to set webhook: %s", e)
     else:
-        # Local polling already started in setup, but in case you prefer async method:
-        print("💻 Running in local/polling mode (polling started in setup).")
+        await telegram_app.updater.start_polling()
+        logger.info("🤖 Telegram bot polling started (local mode)")
+
+    reminders.start(telegram_app.bot)
+
+    # Calendar push notifications (needs a public HTTPS URL)
+    notify_url = _calendar_notify_url()
+    if notify_url:
+        calendar_watch_task = asyncio.create_task(calendar_watch.run_renewal_loop(notify_url))
+        logger.info("📡 Calendar push notifications enabled: %s", notify_url)
+
+
+async def on_deposed():
+    """Another worker took over: stop polling and renewing channels."""
+    global calendar_watch_task
+    if telegram_app and telegram_app.updater and telegram_app.updater.running:
+        await telegram_app.updater.stop()
+    reminders.stop()
+    if calendar_watch_task:
+        calendar_watch_task.cancel()
+        calendar_watch_task = None
+
+
+@app.on_event("startup")
+async def startup_event():
+    global telegram_app, health_probe_task, leader_task
+    started = time.perf_counter()
+    logger.info("🚀 Initializing Smart Assistant components...")
+
+    if _webhook_mode() and not os.getenv("RENDER_EXTERNAL_URL"):
+        raise RuntimeError("Missing RENDER_EXTERNAL_URL")
+
+    # Gemini + Google Calendar checks run alongside the Telegram setup below
+    health_probe_task = asyncio.create_task(run_health_probes())
+
+    # Telegram setup (returns Application); every worker processes updates
+    step = time.perf_counter()
+    telegram_app = setup_telegram_bot(app)
+    startup_timings["telegram_setup"] = _elapsed_ms(step)
+
+    try:
+        step = time.perf_counter()
+        await telegram_app.initialize()
+        await telegram_app.start()
+        startup_timings["telegram_start"] = _elapsed_ms(step)
+        logger.info("✅ Telegram bot initialized successfully.")
+    except Exception as e:
+        logger.warning("⚠️ Failed to start Telegram bot: %s", e)
+
+    # Polling / webhook registration / calendar channels: whichever worker holds the lease
+    logger.info("💻 Running in %s mode; waiting for the leader lease.", 'webhook' if _webhook_mode() else 'local/polling')
+    leader_task = asyncio.create_task(telegram_leader.run(on_elected, on_deposed))
+
+    # Refresh Google tokens ahead of expiry instead of on the request path
+    global credential_refresh_task
+    credential_refresh_task = asyncio.create_task(calendar_async.refresh_credentials_loop())
+
+    startup_timings["startup_total"] = _elapsed_ms(started)
+    logger.info("⏱️ Startup timings (ms): %s", startup_timings)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in (health_probe_task, leader_task, credential_refresh_task):
+        if task:
+            task.cancel()
+    await on_deposed()
+    await write_queue.drain()
+    if telegram_app and telegram_app.running:
+        await telegram_app.stop()  # final persistence flush
+        await telegram_app.shutdown()
+    if telegram_leader.is_leader:
+        try:
+            await asyncio.to_thread(telegram_leader.release)
+        except Exception as e:
+            logger.warning("⚠️ Failed to release leader lease: %s", e)
+    calendar_async.shutdown()
 
 
 @app.post("/webhook")
 async def telegram_webhook(request: Request):
+    """
+    Fast-ack webhook: validate, enqueue, return 200. Handlers run on the
+    application's update_queue workers, so Telegram never waits on Gemini
+    or Calendar latency (and never retries because of it).
+    """
+    if not update_queue.check_secret(request.headers.get("X-Telegram-Bot-Api-Secret-Token")):
+        return Response(status_code=403)
     if not telegram_app:
         return {"ok": False, "error": "Telegram not initialized"}
     data = await request.json()
-    update = Update.de_json(data, telegram_app.bot)
-    await telegram_app.process_update(update)
+    update_id = data.get("update_id")
+    with tracing.span("webhook", update_id=update_id):
+        if await deduplicator.is_duplicate(update_id):
+            # Telegram redelivery of an update we already accepted
+            return {"ok": True, "duplicate": True}
+
+        try:
+            update = Update.de_json(data, telegram_app.bot)
+            # The handler runs later on a worker task; keep this trace open until it finishes
+            tracing.handoff(update_id)
+            accepted = update_queue.enqueue(telegram_app, update)
+        except Exception:
+            # Un-see it, or Telegram's redelivery of this 500 would be dropped as a duplicate
+            tracing.cancel_handoff(update_id)
+            await deduplicator.forget(update_id)
+            raise
+        if not accepted:
+            # Too many updates in flight: let Telegram redeliver later instead of dropping it
+            tracing.cancel_handoff(update_id)
+            await deduplicator.forget(update_id)
+            return Response(status_code=503)
     return {"ok": True}
 
 
+def _register_stat_metrics():
+    """Expose the existing queue / outbound / de-dup counters through /metrics."""
+    def queue_stat(key):
+        return lambda: update_queue.stats.snapshot(telegram_app)[key] if telegram_app else None
+
+    def outbound_stat(key):
+        return lambda: telegram_app.bot.rate_limiter.snapshot()[key] if telegram_app else None
+
+    for name, key, kind, help in (
+        ("telegram_updates_in_flight", "in_flight", "gauge", "Webhook updates accepted and not yet handled"),
+        ("telegram_active_chats", "active_chats", "gauge", "Chats with an update in flight"),
+        ("telegram_updates_received_total", "received", "counter", "Webhook updates accepted"),
+        ("telegram_updates_rejected_total", "rejected", "counter", "Webhook updates rejected (in-flight limit)"),
+        ("telegram_update_lag_max_seconds", "lag_max_seconds", "gauge", "Worst queue wait before a handler started"),
+    ):
+        metrics.registry.callback(name, help, queue_stat(key), kind)
+    for name, key, kind, help in (
+        ("telegram_outbound_queued", "queued", "gauge", "Sends waiting for a rate-limit token"),
+        ("telegram_outbound_sent_total", "sent", "counter", "Bot API sends completed"),
+        ("telegram_outbound_throttled_total", "throttled", "counter", "Sends delayed by the rate limiter"),
+        ("telegram_retry_after_total", "retry_after_hits", "counter", "RetryAfter responses from Telegram"),
+    ):
+        metrics.registry.callback(name, help, outbound_stat(key), kind)
+    metrics.registry.callback(
+        "telegram_duplicate_updates_total", "Redelivered updates dropped", lambda: deduplicator.duplicates, "counter"
+    )
+    metrics.registry.callback(
+        "calendar_write_queue_pending", "Events with unwritten edits", write_queue.pending_count
+    )
+    metrics.registry.callback("reminders_in_memory", "Reminders loaded for the next window", reminders.pending_in_memory)
+    metrics.registry.callback("reminders_sent_total", "Meeting reminders delivered", lambda: reminders.sent, "counter")
+    metrics.registry.callback("leader", "1 if this worker holds the leader lease", lambda: int(telegram_leader.is_leader))
+    metrics.registry.callback(
+        "log_records_dropped_total", "Log records dropped because the log queue was full",
+        lambda: logging_config.DroppingQueueHandler.dropped, "counter",
+    )
+
+
+_register_stat_metrics()
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/debug/queue")
+async def debug_queue():
+    stats = update_queue.stats.snapshot(telegram_app)
+    limiter = telegram_app.bot.rate_limiter if telegram_app else None
+    stats["outbound"] = limiter.snapshot() if limiter else {}
+    stats["duplicates"] = deduplicator.duplicates
+    return stats
+
+
+@app.get("/debug/traces")
+async def debug_traces(min_ms: float = 0, limit: int = 50):
+    """Recent slow traces (>= TRACE_SLOW_MS), newest first."""
+    return {"slow_threshold_ms": tracing.TRACE_SLOW_MS, "traces": tracing.recent_traces(min_ms, limit)}
+
+
+@app.get("/debug/profile")
+async def debug_profile(seconds: float = 5, interval: float = 0.005):
+    """
+    Sample all thread stacks for `seconds` and return folded stacks
+    (flamegraph.pl / speedscope). Requires PROFILER_ENABLED=true.
+    """
+    if not profiler.PROFILER_ENABLED:
+        return Response(status_code=404)
+    interval = max(interval, profiler.MIN_INTERVAL)
+    try:
+        stacks, samples = await asyncio.to_thread(profiler.sample, seconds, interval)
+    except RuntimeError as e:
+        return PlainTextResponse(str(e), status_code=409)
+    return PlainTextResponse(
+        profiler.render_folded(stacks), headers={"X-Profile-Samples": str(samples)}
+    )
+
+
+@app.post("/calendar/notify")
+async def calendar_notify(request: Request):
+    """
+    Google Calendar push notification (events().watch channel).
+    Body is empty; everything is in the X-Goog-* headers.
+    """
+    headers = request.headers
+    calendar_id = await calendar_watch.validate_notification(
+        headers.get("X-Goog-Channel-ID"),
+        headers.get("X-Goog-Channel-Token"),
+        headers.get("X-Goog-Resource-ID"),
+    )
+    if not calendar_id:
+        return Response(status_code=403)
+
+    # "sync" is the handshake sent right after watch(); nothing changed yet
+    if headers.get("X-Goog-Resource-State") != "sync":
+        calendar_watch.schedule_sync(calendar_id)
+    return Response(status_code=200)
+
+
+@app.get("/oauth/callback", response_class=HTMLResponse)
+async def oauth_callback(code: str | None = None, state: str | None = None, error: str | None = None):
+    """Google redirects here after a user accepts the /connect consent screen."""
+    if error or not code or not state:
+        return HTMLResponse(f"<h3>❌ Google sign-in was not completed ({error or 'missing code'}).</h3>", status_code=400)
+    try:
+        user_id = await asyncio.to_thread(complete_user_auth, code, state, oauth_redirect_url())
+    except Exception as e:
+        logger.exception("OAuth callback error: %s", e)
+        user_id = None
+    if user_id is None:
+        return HTMLResponse("<h3>❌ This link is invalid or has expired. Send /connect again.</h3>", status_code=400)
+    return HTMLResponse("<h3>✅ Google Calendar connected! You can go back to Telegram.</h3>")
+
+
 @app.get("/debug/webhook")
 async def debug_webhook():
     if not telegram_app:
@@ -92,9 +409,12 @@ def root():
         "status": "✅ OK",
         "message": "Smart Assistant is running!",
         "telegram": bool(telegram_app),
-        "calendar": True,
-        "gemini": True,
-        "mode": "webhook" if os.getenv("RENDER", "").lower() == "true" else "polling",
+        "calendar": health["calendar"],
+        "gemini": health["gemini"],
+        "circuits": resilience.snapshot(),
+        "startup_ms": startup_timings,
+        "mode": "webhook" if _webhook_mode() else "polling",
+        "leader": telegram_leader.is_leader,
     }
 
 
@@ -0,0 +1,267 @@
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+
+import tracing
+
+# ============================================================
+# ⚙️ CONFIG
+# ============================================================
+# Seconds; covers fast DB queries up to slow Gemini/Calendar calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# ============================================================
+# 📏 METRIC TYPES
+# ============================================================
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()  # calendar/DB metrics are recorded from worker threads
+        self._values: dict[tuple, float] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, key, le), cumulative
+            yield f"{self.name}_sum", _format_labels(self.labelnames, key), total
+            yield f"{self.name}_count", _format_labels(self.labelnames, key), count
+
+
+class CallbackMetric(_Metric):
+    """Value read at scrape time from `fn()` (e.g. an existing stats counter)."""
+
+    def __init__(self, name: str, help: str, fn, kind: str = "gauge"):
+        super().__init__(name, help)
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self):
+        try:
+            value = self.fn()
+        except Exception:
+            return
+        if value is not None:
+            yield self.name, "", value
+
+
+# ============================================================
+# 🗂️ REGISTRY
+# ============================================================
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def callback(self, name: str, help: str, fn, kind: str = "gauge") -> CallbackMetric:
+        """Register (or replace) a metric whose value comes from `fn()` at scrape time."""
+        metric = CallbackMetric(name, help, fn, kind)
+        with self._lock:
+            self._metrics[name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ============================================================
+# ⏱️ INSTRUMENTATION HELPERS
+# ============================================================
+def timed(histogram: Histogram, errors: Counter | None = None, **labels):
+    """Decorator: record the call duration in `histogram` and exceptions in `errors`."""
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    if errors:
+                        errors.inc(**labels)
+                    raise
+                finally:
+                    histogram.observe(time.perf_counter() - started, **labels)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                if errors:
+                    errors.inc(**labels)
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - started, **labels)
+
+        return wrapper
+
+    return decorator
+
+
+DB_QUERY_SECONDS = registry.histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ("operation",)
+)
+DB_ERRORS = registry.counter("db_errors_total", "SQL statements that raised", ("operation",))
+
+
+def instrument_engine(engine):
+    """Time every statement run through a SQLAlchemy engine, labelled by SELECT/INSERT/..."""
+    from sqlalchemy import event
+
+    def _operation(statement: str) -> str:
+        return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        # Statements only get a span inside a request trace, not as traces of their own
+        span = tracing.start_span(f"db.{_operation(statement)}") if tracing.current() else None
+        conn.info.setdefault("query_started", []).append((time.perf_counter(), span))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started, span = conn.info["query_started"].pop()
+        DB_QUERY_SECONDS.observe(time.perf_counter() - started, operation=_operation(statement))
+        if span:
+            tracing.end_span(*span)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        stack = exception_context.connection.info.get("query_started") if exception_context.connection else None
+        if stack:
+            _, span = stack.pop()
+            if span:
+                tracing.end_span(*span, error=exception_context.original_exception)
+        DB_ERRORS.inc(operation=_operation(exception_context.statement or ""))
+
+    registry.callback(
+        "db_pool_checked_out", "Connections currently checked out of the pool",
+        lambda: engine.pool.checkedout() if hasattr(engine.pool, "checkedout") else None,
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import BigInteger, Boolean, Column, Integer, String, ForeignKey
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, Index, Integer, String, Text, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -34,5 +34,115 @@ class UserList(Base):
     # is_active=Column(Boolean,index=True,default=False)
 
 
+# ============================================================
+# 📅 LOCAL CALENDAR MIRROR (kept fresh via Calendar syncToken)
+# ============================================================
+class CalendarEvent(Base):
+    __tablename__ = "calendar_events"
 
+    id = Column(Integer, primary_key=True, index=True)
+    calendar_id = Column(String, nullable=False)
+    event_id = Column(String, index=True, nullable=False)
+    summary = Column(String)
+    status = Column(String)
+    start_time = Column(DateTime, index=True)   # naive UTC
+    end_time = Column(DateTime)                 # naive UTC
+    html_link = Column(String)
+    raw = Column(Text, nullable=False)          # full event JSON as returned by Google
+
+    __table_args__ = (
+        UniqueConstraint("calendar_id", "event_id", name="uq_calendar_events_calendar_event"),
+        Index("ix_calendar_events_calendar_start", "calendar_id", "start_time"),
+    )
+
+
+class CalendarSyncState(Base):
+    __tablename__ = "calendar_sync_state"
+
+    calendar_id = Column(String, primary_key=True)
+    sync_token = Column(Text)
+    last_synced_at = Column(DateTime)           # naive UTC
+
+
+class CalendarChannel(Base):
+    __tablename__ = "calendar_channels"
+
+    channel_id = Column(String, primary_key=True)
+    calendar_id = Column(String, index=True, nullable=False)
+    resource_id = Column(String)
+    token = Column(String, nullable=False)
+    expiration = Column(DateTime, index=True)   # naive UTC
+
+
+# ============================================================
+# 🔐 PER-USER GOOGLE CREDENTIALS (token JSON encrypted at rest)
+# ============================================================
+class UserCalendarCredential(Base):
+    __tablename__ = "user_calendar_credentials"
+
+    telegram_user_id = Column(BigInteger, primary_key=True)
+    token_encrypted = Column(Text, nullable=False)
+    updated_at = Column(DateTime)               # naive UTC
+
+
+# ============================================================
+# 💬 TELEGRAM MESSAGE → CALENDAR EVENT
+# ============================================================
+class EventMessageLink(Base):
+    __tablename__ = "event_message_links"
+
+    id = Column(Integer, primary_key=True, index=True)
+    chat_id = Column(BigInteger, nullable=False)
+    message_id = Column(BigInteger, nullable=False)
+    event_id = Column(String, nullable=False)
+    user_id = Column(BigInteger)
+    created_at = Column(DateTime)               # naive UTC
+
+    __table_args__ = (
+        Index("ix_event_message_links_chat_message", "chat_id", "message_id", unique=True),
+    )
+
+
+class ProcessedUpdate(Base):
+    __tablename__ = "processed_updates"
+
+    update_id = Column(BigInteger, primary_key=True)
+    received_at = Column(DateTime, index=True)  # naive UTC
+
+
+# ============================================================
+# 🤝 MULTI-WORKER COORDINATION
+# ============================================================
+class LeaderLease(Base):
+    __tablename__ = "leader_leases"
 
+    name = Column(String, primary_key=True)     # e.g. "telegram"
+    holder = Column(String, nullable=False)     # host:pid:nonce of the current leader
+    expires_at = Column(DateTime, nullable=False)  # naive UTC
+
+
+class BotState(Base):
+    __tablename__ = "telegram_bot_state"
+
+    kind = Column(String, primary_key=True)     # "user", "chat", "bot", "conversation:<name>"
+    key = Column(String, primary_key=True)
+    data = Column(Text, nullable=False)         # JSON
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime)               # naive UTC
+
+
+# ============================================================
+# ⏰ MEETING REMINDERS
+# ============================================================
+class MeetingReminder(Base):
+    __tablename__ = "meeting_reminders"
+
+    id = Column(Integer, primary_key=True, index=True)
+    fire_at = Column(DateTime, nullable=False, index=True)  # naive UTC
+    chat_id = Column(BigInteger, nullable=False)
+    user_id = Column(BigInteger)
+    event_id = Column(String, nullable=False, index=True)
+    message_id = Column(BigInteger)             # bot's "Meeting Scheduled" message, replied to
+    title = Column(String)
+    meeting_start = Column(DateTime, nullable=False)  # naive UTC
+    attempts = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,61 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# ============================================================
+# ⚙️ CONFIG
+# ============================================================
+# Off by default: stacks expose code paths, so enable only while investigating.
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "").lower() == "true"
+MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+# Sampling holds the GIL while it walks every stack; never sample more often than this.
+MIN_INTERVAL = float(os.getenv("PROFILER_MIN_INTERVAL", "0.001"))
+
+_running = threading.Lock()  # one profile at a time
+
+
+def _folded(frame, thread_name: str) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        stack.append(f"{module}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    stack.append(thread_name)
+    return ";".join(reversed(stack))
+
+
+# ============================================================
+# 🔥 SAMPLING PROFILER
+# ============================================================
+def sample(seconds: float, interval: float = 0.005) -> tuple[Counter, int]:
+    """
+    Sample every thread's stack each `interval` for `seconds` (blocking;
+    run it in a thread). Returns (folded stack -> hits, number of samples).
+    """
+    if not _running.acquire(blocking=False):
+        raise RuntimeError("A profile is already running")
+    try:
+        me = threading.get_ident()
+        names = {}
+        stacks = Counter()
+        samples = 0
+        interval = max(interval, MIN_INTERVAL)
+        deadline = time.monotonic() + min(seconds, MAX_SECONDS)
+        while time.monotonic() < deadline:
+            names.update((t.ident, t.name) for t in threading.enumerate())
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    stacks[_folded(frame, names.get(ident, str(ident)))] += 1
+            samples += 1
+            time.sleep(interval)
+        return stacks, samples
+    finally:
+        _running.release()
+
+
+def render_folded(stacks: Counter) -> str:
+    """Brendan Gregg's folded format ("a;b;c count"), readable by flamegraph.pl and speedscope."""
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
@@ -0,0 +1,323 @@
+import asyncio
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import google.auth.exceptions
+import httplib2
+import httpx
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# ⚙️ CONFIG
+# ============================================================
+# Consecutive failures that open a breaker, and how long it stays open
+# before one probe request is let through (half-open).
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+# Hedged duplicates in flight at once; hedging is skipped beyond this so an
+# overloaded dependency does not get twice the traffic.
+HEDGE_MAX_INFLIGHT = int(os.getenv("HEDGE_MAX_INFLIGHT", "8"))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = metrics.registry.gauge(
+    "circuit_breaker_state", "0 closed, 1 half-open, 2 open", ("dependency",)
+)
+BREAKER_REJECTIONS = metrics.registry.counter(
+    "circuit_breaker_rejections_total", "Calls failed fast by an open breaker", ("dependency",)
+)
+HEDGES = metrics.registry.counter(
+    "hedged_requests_total", "Duplicate requests sent after the hedge delay, by which copy answered",
+    ("dependency", "winner"),
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} is unavailable (circuit open, retry in {retry_in:.0f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class DeadlineExceeded(TimeoutError):
+    """The caller's time budget ran out before (or while) calling a dependency."""
+
+
+def _status(exc: BaseException) -> int | None:
+    """HTTP status of a googleapiclient HttpError / google.genai APIError, if any."""
+    for attr in ("status_code", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    return getattr(getattr(exc, "resp", None), "status", None)
+
+
+# Errors that mean we could not talk to the dependency at all
+_TRANSPORT_ERRORS = (
+    TimeoutError,  # includes DeadlineExceeded and socket timeouts
+    OSError,       # ConnectionError, DNS and SSL failures
+    httplib2.HttpLib2Error,
+    httpx.TransportError,
+    google.auth.exceptions.TransportError,
+)
+
+
+def is_dependency_failure(exc: BaseException, count_rate_limits: bool = True) -> bool:
+    """
+    True if `exc` says the dependency is unhealthy: a transport error, a
+    timeout or a 5xx (and a 429, if `count_rate_limits`). Other 4xx answers
+    mean it is up and just rejected this request; errors such as a revoked
+    grant (RefreshError) or a bug on our side say nothing about its health.
+    None of those count against the breaker.
+    """
+    status = _status(exc)
+    if status is None:
+        return isinstance(exc, _TRANSPORT_ERRORS)
+    return status >= 500 or (status == 429 and count_rate_limits)
+
+
+def is_unavailable(exc: BaseException) -> bool:
+    """True for the fast-fail errors handlers turn into a "try again later" reply."""
+    return isinstance(exc, (CircuitOpenError, TimeoutError))
+
+
+# ============================================================
+# 🔌 CIRCUIT BREAKER
+# ============================================================
+class CircuitBreaker:
+    """
+    Per-dependency breaker, shared by the event loop and worker threads.
+
+    - closed: calls go through; `failure_threshold` consecutive dependency
+      failures open it.
+    - open: calls fail immediately with CircuitOpenError for `reset_timeout`.
+    - half-open: up to `half_open_max` probe calls go through; a success
+      closes the breaker, a failure opens it again.
+    - `count_rate_limits=False` for dependencies whose 429s are per-user
+      quotas: one busy user must not open the breaker for everyone.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURES,
+        reset_timeout: float = BREAKER_RESET_SECONDS,
+        half_open_max: int = 1,
+        count_rate_limits: bool = True,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+        self.count_rate_limits = count_rate_limits
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        BREAKER_STATE.set(0, dependency=name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def _set_state(self, state: str):
+        if state != self._state:
+            logger.warning("🔌 %s circuit %s -> %s", self.name, self._state, state)
+            self._state = state
+            BREAKER_STATE.set(_STATE_VALUES[state], dependency=self.name)
+
+    def allow(self):
+        """Reserve a call, or raise CircuitOpenError. Every allowed call must be followed by record()."""
+        with self._lock:
+            if self._state == OPEN:
+                waited = time.monotonic() - self._opened_at
+                if waited < self.reset_timeout:
+                    BREAKER_REJECTIONS.inc(dependency=self.name)
+                    raise CircuitOpenError(self.name, self.reset_timeout - waited)
+                self._set_state(HALF_OPEN)
+                self._probes = 0
+            if self._state == HALF_OPEN:
+                if self._probes >= self.half_open_max:
+                    BREAKER_REJECTIONS.inc(dependency=self.name)
+                    raise CircuitOpenError(self.name, 1)
+                self._probes += 1
+
+    def record(self, exc: BaseException | None = None):
+        """Report the outcome of an allowed call (None = success)."""
+        failed = exc is not None and is_dependency_failure(exc, self.count_rate_limits)
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+            if not failed:
+                self._failures = 0
+                self._set_state(CLOSED)
+                return
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    @contextlib.contextmanager
+    def guard(self):
+        """`with breaker.guard(): call()` — allow() + record() around one call."""
+        self.allow()
+        try:
+            yield
+        except BaseException as e:
+            self.record(e)
+            raise
+        self.record()
+
+
+gemini_breaker = CircuitBreaker("gemini")  # one API key: its 429s hit every chat
+calendar_breaker = CircuitBreaker("calendar", count_rate_limits=False)  # quotas are per connected user
+
+
+# ============================================================
+# ⏳ DEADLINES
+# ============================================================
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("deadline", default=None)
+
+
+@contextlib.contextmanager
+def deadline(seconds: float | None):
+    """
+    Give everything in this block at most `seconds` (nested deadlines only
+    shrink it). Travels with the context into threads started through
+    contextvars.copy_context(), e.g. calendar_async.run_calendar.
+    """
+    if seconds is None:
+        yield
+        return
+    current = _deadline.get()
+    at = time.monotonic() + seconds
+    token = _deadline.set(at if current is None else min(at, current))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    """Seconds left in the current deadline (None if there is none)."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def check_deadline(what: str):
+    """Raise DeadlineExceeded instead of starting `what` after the caller has given up."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"deadline exceeded before {what}")
+
+
+# ============================================================
+# 🏁 HEDGED REQUESTS (idempotent reads only)
+# ============================================================
+_hedge_copy: contextvars.ContextVar[bool] = contextvars.ContextVar("hedge_copy", default=False)
+_hedge_slots = threading.BoundedSemaphore(HEDGE_MAX_INFLIGHT)
+_hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_MAX_INFLIGHT * 2, thread_name_prefix="hedge")
+
+
+def is_hedge_copy() -> bool:
+    """True inside the duplicate call of a hedge (it should skip work the original is already doing)."""
+    return _hedge_copy.get()
+
+
+def _hedge_context() -> contextvars.Context:
+    ctx = contextvars.copy_context()
+    ctx.run(_hedge_copy.set, True)
+    return ctx
+
+
+def _take_hedge_slot(breaker: CircuitBreaker) -> bool:
+    # A recovering dependency gets no extra traffic
+    return breaker.state == CLOSED and _hedge_slots.acquire(blocking=False)
+
+
+def hedged(breaker: CircuitBreaker, hedge_after: float, func, *args, **kwargs):
+    """
+    Blocking hedge: call `func` on the hedge pool; if it has not answered
+    within `hedge_after` seconds, send an identical second call and return
+    whichever succeeds first. The slower copy is left to finish in the
+    background. `func` must be safe to run twice.
+    """
+    first = _hedge_pool.submit(contextvars.copy_context().run, func, *args, **kwargs)
+    done, _ = wait([first], timeout=hedge_after)
+    if done or not _take_hedge_slot(breaker):
+        return first.result(timeout=remaining())
+
+    try:
+        second = _hedge_pool.submit(_hedge_context().run, func, *args, **kwargs)
+        calls = {first: "primary", second: "hedge"}
+        pending = set(calls)
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"{breaker.name} hedged call timed out")
+            for future in done:
+                if future.exception() is None:
+                    HEDGES.inc(dependency=breaker.name, winner=calls[future])
+                    return future.result()
+                error = future.exception()
+        raise error
+    finally:
+        _hedge_slots.release()
+
+
+async def hedged_async(breaker: CircuitBreaker, hedge_after: float, make_call):
+    """
+    Async hedge: `make_call()` returns a fresh awaitable for the same
+    idempotent read; a second one is started if the first is still
+    pending after `hedge_after` seconds. First success wins, the other is
+    cancelled.
+    """
+    tasks = {asyncio.ensure_future(make_call()): "primary"}
+    hedging = False
+    try:
+        done, _ = await asyncio.wait(set(tasks), timeout=hedge_after)
+        if done or not _take_hedge_slot(breaker):
+            return await next(iter(tasks))
+
+        hedging = True
+        token = _hedge_copy.set(True)  # the task (and any calendar thread it starts) copies this context
+        try:
+            tasks[asyncio.ensure_future(make_call())] = "hedge"
+        finally:
+            _hedge_copy.reset(token)
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    HEDGES.inc(dependency=breaker.name, winner=tasks[task])
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        if hedging:
+            _hedge_slots.release()
+        for task in tasks:
+            task.cancel()
+
+
+def snapshot() -> dict:
+    """Breaker states for the health endpoint."""
+    return {breaker.name: breaker.state for breaker in (gemini_breaker, calendar_breaker)}
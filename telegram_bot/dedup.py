@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.exc import IntegrityError
+
+import database
+from models import ProcessedUpdate
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# ⚙️ CONFIG
+# ============================================================
+DEDUP_WINDOW = int(os.getenv("UPDATE_DEDUP_WINDOW", "10000"))
+# Multi-worker deployments: also claim each update_id in the DB so only one worker processes it
+DEDUP_SHARED = os.getenv("UPDATE_DEDUP_SHARED", "").lower() == "true"
+DEDUP_RETENTION = timedelta(hours=int(os.getenv("UPDATE_DEDUP_RETENTION_HOURS", "24")))
+
+
+class UpdateDeduplicator:
+    """
+    Remembers the last DEDUP_WINDOW update_ids (ring buffer + set) so
+    Telegram's webhook redeliveries are acknowledged without being
+    processed again.
+    """
+
+    def __init__(self, window: int = DEDUP_WINDOW, shared: bool = DEDUP_SHARED):
+        self._ring: deque[int] = deque()
+        self._seen: set[int] = set()
+        self.window = window
+        self.shared = shared
+        self.duplicates = 0
+        self._claims = 0
+
+    def _remember(self, update_id: int):
+        self._ring.append(update_id)
+        self._seen.add(update_id)
+        if len(self._ring) > self.window:
+            self._seen.discard(self._ring.popleft())
+
+    def _unremember(self, update_id: int):
+        """Drop `update_id` from the set *and* the ring, so a stale ring entry cannot evict it early later."""
+        if update_id not in self._seen:
+            return
+        self._seen.discard(update_id)
+        if self._ring and self._ring[-1] == update_id:
+            self._ring.pop()  # the usual case: the update we just saw
+        else:
+            self._ring.remove(update_id)
+
+    # --- shared (DB) claim ---
+    def _claim_in_db(self, update_id: int) -> bool:
+        """Insert the update_id; False if another worker already claimed it."""
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        db = database.SessionLocal()
+        try:
+            db.add(ProcessedUpdate(update_id=update_id, received_at=now))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
+        self._claims += 1
+        if self._claims % 1000 == 0:
+            self._prune(now)
+        return True
+
+    @staticmethod
+    def _prune(now: datetime):
+        db = database.SessionLocal()
+        try:
+            db.query(ProcessedUpdate).filter(ProcessedUpdate.received_at < now - DEDUP_RETENTION).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _release_in_db(update_id: int):
+        db = database.SessionLocal()
+        try:
+            db.query(ProcessedUpdate).filter(ProcessedUpdate.update_id == update_id).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    # --- API used by the webhook ---
+    async def is_duplicate(self, update_id: int | None) -> bool:
+        """Record `update_id`; True if it was already seen (locally or, if shared, by any worker)."""
+        if update_id is None:
+            return False
+        if update_id in self._seen:
+            self.duplicates += 1
+            return True
+        self._remember(update_id)
+        if self.shared:
+            try:
+                claimed = await asyncio.to_thread(self._claim_in_db, update_id)
+            except Exception as e:
+                logger.warning("⚠️ Shared update de-dup unavailable: %s", e)
+                return False
+            if not claimed:
+                self.duplicates += 1
+                return True
+        return False
+
+    async def forget(self, update_id: int | None):
+        """Un-see an update we could not accept (e.g. too many in flight) so its redelivery is processed."""
+        if update_id is None:
+            return
+        self._unremember(update_id)
+        if self.shared:
+            try:
+                await asyncio.to_thread(self._release_in_db, update_id)
+            except Exception as e:
+                logger.warning("⚠️ Failed to release update claim: %s", e)
+
+
+deduplicator = UpdateDeduplicator()
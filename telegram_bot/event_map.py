@@ -0,0 +1,87 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+
+from cachetools import TTLCache
+
+import database
+from models import EventMessageLink
+
+# ============================================================
+# ⚙️ CONFIG
+# ============================================================
+EVENT_MAP_CACHE_SIZE = int(os.getenv("EVENT_MAP_CACHE_SIZE", "10000"))
+EVENT_MAP_TTL = int(os.getenv("EVENT_MAP_TTL", str(24 * 3600)))
+
+
+# ============================================================
+# 🗺️ MESSAGE → EVENT INDEX
+# ============================================================
+class EventMap:
+    """
+    (chat_id, message_id) → calendar event id for bot "Meeting Scheduled"
+    messages. Recent links are held in a bounded TTL/LRU cache; every link
+    is also written to `event_message_links`, so replies keep working after
+    restarts and across workers (read-through on cache miss).
+    """
+
+    def __init__(self, maxsize: int = EVENT_MAP_CACHE_SIZE, ttl: int = EVENT_MAP_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    # --- blocking DB helpers (run in a thread) ---
+    @staticmethod
+    def _save(chat_id: int, message_id: int, event_id: str, user_id: int | None):
+        db = database.SessionLocal()
+        try:
+            link = (
+                db.query(EventMessageLink)
+                .filter(EventMessageLink.chat_id == chat_id, EventMessageLink.message_id == message_id)
+                .first()
+            )
+            if not link:
+                link = EventMessageLink(chat_id=chat_id, message_id=message_id)
+                db.add(link)
+            link.event_id = event_id
+            link.user_id = user_id
+            link.created_at = datetime.now(timezone.utc).replace(tzinfo=None)
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _load(chat_id: int, message_id: int) -> tuple[str, int | None] | None:
+        db = database.SessionLocal()
+        try:
+            link = (
+                db.query(EventMessageLink)
+                .filter(EventMessageLink.chat_id == chat_id, EventMessageLink.message_id == message_id)
+                .first()
+            )
+            return (link.event_id, link.user_id) if link else None
+        finally:
+            db.close()
+
+    # --- async API used by handlers ---
+    async def put(self, chat_id: int, message_id: int, event_id: str, user_id: int | None = None):
+        self._cache[(chat_id, message_id)] = (event_id, user_id)
+        await asyncio.to_thread(self._save, chat_id, message_id, event_id, user_id)
+
+    async def get_link(self, chat_id: int, message_id: int) -> tuple[str, int | None] | None:
+        """(event id, id of the user whose calendar holds it) for a bot message, or None."""
+        link = self._cache.get((chat_id, message_id))
+        if link:
+            return link
+        link = await asyncio.to_thread(self._load, chat_id, message_id)
+        if link:
+            self._cache[(chat_id, message_id)] = link
+        return link
+
+    async def get(self, chat_id: int, message_id: int) -> str | None:
+        link = await self.get_link(chat_id, message_id)
+        return link[0] if link else None
+
+    def __len__(self):
+        return len(self._cache)
+
+
+event_map = EventMap()
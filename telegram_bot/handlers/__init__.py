@@ -1,3 +1,5 @@
 # Allow importing handler modules easily
 from .message_handler import start, echo
-from .schedule_handler import schedule_meeting
\ No newline at end of file
+from .schedule_handler import schedule_meeting
+from .connect_handler import connect_calendar
+from .meeting_actions import meeting_action
@@ -0,0 +1,38 @@
+import asyncio
+import logging
+import os
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from google_calendar import build_user_auth_url
+
+logger = logging.getLogger(__name__)
+
+
+def oauth_redirect_url() -> str | None:
+    """Public URL of the /oauth/callback route (OAUTH_REDIRECT_URL or derived from RENDER_EXTERNAL_URL)."""
+    url = os.getenv("OAUTH_REDIRECT_URL")
+    if not url and os.getenv("RENDER_EXTERNAL_URL"):
+        url = f"{os.getenv('RENDER_EXTERNAL_URL').rstrip('/')}/oauth/callback"
+    return url
+
+
+async def connect_calendar(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handles /connect — sends a Google consent link tied to this Telegram user."""
+    redirect_url = oauth_redirect_url()
+    if not redirect_url:
+        await update.message.reply_text("⚠️ Calendar linking isn't configured on this server.")
+        return
+
+    try:
+        url = await asyncio.to_thread(build_user_auth_url, update.effective_user.id, redirect_url)
+    except Exception as e:
+        logger.exception("build_user_auth_url error: %s", e)
+        await update.message.reply_text("⚠️ Couldn't start Google sign-in right now.")
+        return
+
+    await update.message.reply_text(
+        "🔗 Connect your Google Calendar (link valid for 15 minutes):\n"
+        f"{url}\n\n"
+        "Until then, meetings go to the shared calendar."
+    )
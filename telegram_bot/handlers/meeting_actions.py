@@ -0,0 +1,210 @@
+import logging
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.error import BadRequest
+from telegram.ext import ContextTypes
+
+import calendar_async
+import resilience
+from calendar_store import event_bounds
+from telegram_bot.event_map import event_map
+from telegram_bot.reminders import reminders
+
+logger = logging.getLogger(__name__)
+
+IST = ZoneInfo("Asia/Kolkata")
+
+CALENDAR_UNAVAILABLE = "📅 Google Calendar isn’t responding right now. Please try again in a minute."
+
+# ============================================================
+# 🔘 CALLBACK DATA
+# ============================================================
+# "m:<action>[:<arg>]" — the event is found through event_map from the
+# message the buttons are attached to, so the data never carries an id.
+PREFIX = "m"
+PATTERN = rf"^{PREFIX}:"
+MOVE_HOUR, MOVE_DAY, SLOTS, PICK, CANCEL, CONFIRM_CANCEL, BACK = "h", "t", "s", "p", "x", "X", "b"
+SLOT_FORMAT = "%y%m%d%H%M"  # 10 digits, e.g. m:p:2611031530
+
+
+def _data(action: str, arg: str = "") -> str:
+    return f"{PREFIX}:{action}:{arg}" if arg else f"{PREFIX}:{action}"
+
+
+def meeting_keyboard() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton("⏩ +1 hour", callback_data=_data(MOVE_HOUR)),
+            InlineKeyboardButton("📅 Next day, same time", callback_data=_data(MOVE_DAY)),
+        ],
+        [
+            InlineKeyboardButton("🕒 Pick a free slot", callback_data=_data(SLOTS)),
+            InlineKeyboardButton("❌ Cancel meeting", callback_data=_data(CANCEL)),
+        ],
+    ])
+
+
+def _slots_keyboard(slots: list[datetime]) -> InlineKeyboardMarkup:
+    rows = [
+        [InlineKeyboardButton(slot.strftime("%a %d %b, %H:%M"), callback_data=_data(PICK, slot.strftime(SLOT_FORMAT)))]
+        for slot in slots
+    ]
+    rows.append([InlineKeyboardButton("↩️ Back", callback_data=_data(BACK))])
+    return InlineKeyboardMarkup(rows)
+
+
+def _confirm_cancel_keyboard() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([[
+        InlineKeyboardButton("✅ Yes, cancel it", callback_data=_data(CONFIRM_CANCEL)),
+        InlineKeyboardButton("↩️ Keep it", callback_data=_data(BACK)),
+    ]])
+
+
+# ============================================================
+# 📝 MESSAGE TEXT
+# ============================================================
+def meeting_text(title: str, date: str, time: str, attendees: list[str], link: str, heading: str = "Meeting Scheduled!") -> str:
+    attendees_text = f"👥 Participants: {', '.join(attendees)}\n" if attendees else ""
+    return (
+        f"✅ *{heading}*\n\n"
+        f"🗓 *{title}*\n"
+        f"📅 {date} at {time}\n"
+        f"{attendees_text}"
+        f"🔗 [View in Calendar]({link})\n\n"
+        f"✨ *Tap a button below, or reply to this message to:*\n"
+        f"• Change title to _Daily Sync_\n"
+        f"• Reschedule meeting to _3pm on Friday_"
+    )
+
+
+def _event_text(event: dict, heading: str) -> str:
+    start, _ = event_bounds(event)
+    return meeting_text(
+        event.get("summary", "Untitled"),
+        start.strftime("%Y-%m-%d") if start else "?",
+        start.strftime("%H:%M") if start else "?",
+        [a["email"] for a in event.get("attendees", []) if a.get("email")],
+        event.get("htmlLink", "No link available"),
+        heading,
+    )
+
+
+# ============================================================
+# 🎛️ CALLBACK HANDLER
+# ============================================================
+async def _edit(query, text: str | None = None, reply_markup: InlineKeyboardMarkup | None = None):
+    try:
+        if text is None:
+            await query.edit_message_reply_markup(reply_markup=reply_markup)
+        else:
+            await query.edit_message_text(text, parse_mode="Markdown", reply_markup=reply_markup)
+    except BadRequest as e:
+        if "parse entities" in str(e).lower():  # e.g. a title with an unpaired * or _
+            await query.edit_message_text(text, reply_markup=reply_markup)
+        elif "not modified" not in str(e).lower():  # double tap on the same button
+            raise
+
+
+async def _refresh_card(query, text: str, reply_markup: InlineKeyboardMarkup | None = None):
+    """Re-render the card after a change that already reached the calendar; a failure here is cosmetic."""
+    try:
+        await _edit(query, text, reply_markup)
+    except Exception as e:
+        logger.warning("⚠️ Could not refresh meeting card: %s", e)
+
+
+async def _move(query, event_id: str, new_start: datetime, user_id: int):
+    """One PATCH (the current event comes from the local mirror), then refresh the message."""
+    if new_start <= datetime.now(IST):
+        await query.answer("⏰ That time has already passed.", show_alert=True)
+        return
+    updated = await calendar_async.update_event(
+        event_id, new_date=new_start.strftime("%Y-%m-%d"), new_time=new_start.strftime("%H:%M"), user_id=user_id
+    )
+    if not updated:
+        await query.answer("⚠️ Failed to update the meeting.", show_alert=True)
+        return
+    start, _ = event_bounds(updated)
+    try:
+        await reminders.reschedule(event_id, start)
+    except Exception as e:
+        logger.exception("reminder reschedule error: %s", e)
+    # The meeting has moved: confirm that before touching the message
+    await query.answer(f"✅ Moved to {start.strftime('%a %d %b, %H:%M')}")
+    await _refresh_card(query, _event_text(updated, "Meeting Rescheduled!"), meeting_keyboard())
+
+
+async def meeting_action(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Buttons under a "Meeting Scheduled" message: common edits without a Gemini call."""
+    query = update.callback_query
+    _, action, arg = (query.data.split(":", 2) + [""])[:3]
+
+    message = query.message
+    link = await event_map.get_link(message.chat.id, message.message_id) if message else None
+    if not link:
+        await query.answer("⚠️ I couldn't find this meeting anymore.", show_alert=True)
+        return
+    event_id, owner_id = link
+    if owner_id and query.from_user.id != owner_id:
+        await query.answer("🔒 Only the person who scheduled this meeting can change it.", show_alert=True)
+        return
+    user_id = owner_id or query.from_user.id
+
+    answered = False  # a callback query can be answered only once
+    try:
+        if action == BACK:
+            await query.answer()
+            answered = True
+            await _edit(query, reply_markup=meeting_keyboard())
+
+        elif action == CANCEL:
+            await query.answer()
+            answered = True
+            await _edit(query, reply_markup=_confirm_cancel_keyboard())
+
+        elif action == CONFIRM_CANCEL:
+            await calendar_async.delete_event(event_id, user_id=user_id)
+            try:
+                await reminders.cancel(event_id)
+            except Exception as e:
+                logger.exception("reminder cancel error: %s", e)
+            await query.answer("🗑️ Meeting cancelled")
+            await _refresh_card(query, "❌ *Meeting cancelled.* Attendees have been notified.")
+
+        elif action == SLOTS:
+            slots = await calendar_async.suggest_slots(event_id, user_id=user_id)
+            if not slots:
+                await query.answer("😕 No free slot nearby.", show_alert=True)
+                return
+            await query.answer()
+            answered = True
+            await _edit(query, reply_markup=_slots_keyboard(slots))
+
+        elif action in (MOVE_HOUR, MOVE_DAY, PICK):
+            if action == PICK:
+                new_start = datetime.strptime(arg, SLOT_FORMAT).replace(tzinfo=IST)
+            else:
+                event = await calendar_async.fetch_event(event_id, user_id=user_id)
+                start, _ = event_bounds(event) if event else (None, None)
+                if not start:
+                    await query.answer("⚠️ I couldn't find this meeting anymore.", show_alert=True)
+                    return
+                new_start = start + (timedelta(hours=1) if action == MOVE_HOUR else timedelta(days=1))
+            await _move(query, event_id, new_start, user_id)
+
+        else:
+            await query.answer()
+
+    except Exception as e:
+        if answered:
+            # Only the message edit failed (e.g. it was deleted); nothing left to tell the user through the query
+            logger.warning("⚠️ Meeting action %s: could not update the message: %s", action, e)
+            return
+        if resilience.is_unavailable(e):
+            logger.warning("⚠️ Calendar unavailable for meeting action %s: %s", action, e)
+            await query.answer(CALENDAR_UNAVAILABLE, show_alert=True)
+            return
+        logger.exception("Meeting action %s error: %s", action, e)
+        await query.answer("⚠️ Failed to update the meeting.", show_alert=True)
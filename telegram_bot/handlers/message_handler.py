@@ -1,11 +1,21 @@
+import logging
+import asyncio
 from telegram import Update
 from telegram.ext import ContextTypes
+import resilience
 from gemini_chat import interpret_command, parse_meeting_message
-from google_calendar import (
-    update_event_title,
-    update_event_time,
-    update_event_date,
-)
+from calendar_async import fetch_event
+from calendar_store import event_bounds
+from calendar_write_queue import write_queue
+from telegram_bot.event_map import event_map
+from telegram_bot.handlers.meeting_actions import CALENDAR_UNAVAILABLE
+from telegram_bot.handlers.schedule_handler import create_meeting
+from telegram_bot.reminders import reminders
+from telegram_bot.rate_limiter import PRIORITY_HIGH, send_priority
+from telegram_bot.utils import send_smart_message
+
+
+logger = logging.getLogger(__name__)
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -14,14 +24,63 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "I can help you manage meetings and chat about topics.\n\n"
         "Try these:\n"
         "• /schedule meeting tomorrow at 10am with test@gmail.com\n"
+        "• Tap the buttons under a meeting to move or cancel it\n"
         "• Reply to a meeting message and say 'Change title to Daily Sync'\n"
         "• Reply to a meeting message and say 'Reschedule to tomorrow at 3pm'\n"
+        "• /connect to use your own Google Calendar\n"
+    )
+
+
+def _queue_meeting_edit(update: Update, event_id: str, changes: dict, owner_id: int | None = None):
+    """
+    Hand the edit to the write-behind queue; quick follow-up edits to the
+    same meeting are merged and everyone who sent one gets a single
+    confirmation once the change has actually reached Google Calendar.
+    `owner_id` is the user whose calendar holds the event (default: sender).
+    """
+    async def confirm(updated, error):
+        with send_priority(PRIORITY_HIGH):
+            if error and resilience.is_unavailable(error):
+                await update.message.reply_text(CALENDAR_UNAVAILABLE)
+                return
+            if error or not updated:
+                await update.message.reply_text("⚠️ Failed to update the meeting.")
+                return
+            start, _ = event_bounds(updated)
+            when = f"\n📅 {start.strftime('%Y-%m-%d at %H:%M')}" if start else ""
+            if start:  # edits are merged, so any of them may have moved the meeting
+                try:
+                    await reminders.reschedule(updated["id"], start)
+                except Exception as e:
+                    logger.exception("reminder reschedule error: %s", e)
+            await update.message.reply_text(
+                f"✅ Meeting updated: *{updated.get('summary', 'Untitled')}*{when}",
+                parse_mode="Markdown",
+            )
+
+    write_queue.submit(
+        event_id, changes, on_done=confirm, user_id=owner_id or update.effective_user.id,
+        submitter=(update.effective_chat.id, update.effective_user.id),
     )
 
 
+async def _resolve_event_id(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str | None:
+    """Event for non-reply edits: the user's last scheduled meeting, else the next upcoming one."""
+    event_id = context.user_data.get("last_meeting", {}).get("event_id")
+    if event_id:
+        return event_id
+    try:
+        event = await fetch_event(None, user_id=update.effective_user.id)
+    except Exception as e:
+        logger.exception("fetch_event error: %s", e)
+        return None
+    return event["id"] if event else None
+
+
 async def echo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handles:
     - Replies to meeting messages (update title/date/time)
+    - Free-text meeting requests (booked like /schedule)
     - Normal chat interpreted via Gemini
     """
     user_message = update.message.text.strip()
@@ -31,13 +90,23 @@ async def echo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # =====================================================
     if update.message.reply_to_message:
         replied_id = update.message.reply_to_message.message_id
-        event_map = context.application.bot_data.get("event_map", {})
-        event_id = event_map.get(replied_id)
+        try:
+            link = await event_map.get_link(update.effective_chat.id, replied_id)
+        except Exception as e:
+            logger.exception("event_map lookup error: %s", e)
+            link = None
 
-        if not event_id:
+        if not link:
             await update.message.reply_text("⚠️ I couldn't find the meeting you're referring to.")
             return
 
+        # The event lives in the calendar of whoever scheduled it, not the replier's
+        event_id, owner_id = link
+        if owner_id and update.effective_user.id != owner_id:
+            await update.message.reply_text("🔒 Only the person who scheduled this meeting can change it.")
+            return
+        owner_id = owner_id or update.effective_user.id
+
         text_lower = user_message.lower()
 
         # --- Change Title ---
@@ -56,23 +125,20 @@ async def echo(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 await update.message.reply_text("⚠️ Please specify the new title.")
                 return
 
-            try:
-                updated = update_event_title(event_id, new_title)
-            except TypeError:
-                updated = update_event_title(new_title)
-            except Exception as e:
-                print("update_event_title error:", e)
-                updated = None
-
-            if updated:
-                await update.message.reply_text(f"✅ Updated meeting title to *{new_title}*!", parse_mode="Markdown")
-            else:
-                await update.message.reply_text("⚠️ Failed to update meeting title.")
+            _queue_meeting_edit(update, event_id, {"title": new_title}, owner_id)
             return
 
         # --- Reschedule / Change date/time ---
         if any(k in text_lower for k in ["reschedule", "change date", "change time", "move"]):
-            parsed = parse_meeting_message(user_message)
+            # Parse with Gemini while the target event is fetched into the mirror
+            parsed, _ = await asyncio.gather(
+                asyncio.to_thread(parse_meeting_message, user_message),
+                fetch_event(event_id, user_id=owner_id),
+                return_exceptions=True,
+            )
+            if isinstance(parsed, Exception):
+                logger.error("parse_meeting_message error: %s", parsed)
+                parsed = {}
             new_date = parsed.get("date")
             new_time = parsed.get("time")
 
@@ -82,34 +148,7 @@ async def echo(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 )
                 return
 
-            updated = None
-            try:
-                if new_date and new_time:
-                    updated = update_event_date(event_id, new_date, new_time)
-                elif new_date:
-                    updated = update_event_date(event_id, new_date)
-                elif new_time:
-                    updated = update_event_time(event_id, new_time)
-            except TypeError:
-                try:
-                    if new_date and new_time:
-                        updated = update_event_date(new_date, new_time)
-                    elif new_date:
-                        updated = update_event_date(new_date)
-                    elif new_time:
-                        updated = update_event_time(new_time)
-                except Exception as e:
-                    print("update date/time fallback error:", e)
-                    updated = None
-            except Exception as e:
-                print("update date/time error:", e)
-                updated = None
-
-            if updated:
-                pretty = f"{new_date or ''} {new_time or ''}".strip()
-                await update.message.reply_text(f"✅ Meeting rescheduled to *{pretty}*!", parse_mode="Markdown")
-            else:
-                await update.message.reply_text("⚠️ Failed to update meeting date/time.")
+            _queue_meeting_edit(update, event_id, {"new_date": new_date, "new_time": new_time}, owner_id)
             return
 
         # Unknown action in reply
@@ -121,11 +160,16 @@ async def echo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # =====================================================
     # CASE B: Normal message (not a reply)
     # =====================================================
-    ai_response = interpret_command(user_message)
+    ai_response = await asyncio.to_thread(interpret_command, user_message)
 
     if isinstance(ai_response, dict):
         action = ai_response.get("action")
 
+        # --- Schedule a new meeting (same flow as /schedule) ---
+        if action == "create_meeting":
+            await create_meeting(update, context, ai_response)
+            return
+
         # --- Update meeting title (non-reply) ---
         if action == "update_meeting_title":
             new_title = ai_response.get("new_title")
@@ -133,23 +177,12 @@ async def echo(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 await update.message.reply_text("⚠️ Please specify the new title.")
                 return
 
-            event_id = context.user_data.get("last_meeting", {}).get("event_id")
-            updated = None
-            try:
-                if event_id:
-                    updated = update_event_title(event_id, new_title)
-                else:
-                    updated = update_event_title(new_title)
-            except TypeError:
-                updated = update_event_title(new_title)
-            except Exception as e:
-                print("update_event_title error:", e)
-                updated = None
-
-            if updated:
-                await update.message.reply_text(f"✅ Meeting title changed to *{new_title}*!", parse_mode="Markdown")
-            else:
+            event_id = await _resolve_event_id(update, context)
+            if not event_id:
                 await update.message.reply_text("⚠️ Couldn't find a meeting to update.")
+                return
+
+            _queue_meeting_edit(update, event_id, {"title": new_title})
             return
 
         # --- Update meeting time (non-reply) ---
@@ -159,23 +192,12 @@ async def echo(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 await update.message.reply_text("⚠️ Please specify the new time.")
                 return
 
-            event_id = context.user_data.get("last_meeting", {}).get("event_id")
-            updated = None
-            try:
-                if event_id:
-                    updated = update_event_time(event_id, new_time)
-                else:
-                    updated = update_event_time(new_time)
-            except TypeError:
-                updated = update_event_time(new_time)
-            except Exception as e:
-                print("update_event_time error:", e)
-                updated = None
-
-            if updated:
-                await update.message.reply_text(f"✅ Meeting time updated to *{new_time}*!", parse_mode="Markdown")
-            else:
+            event_id = await _resolve_event_id(update, context)
+            if not event_id:
                 await update.message.reply_text("⚠️ Couldn't find a meeting to update.")
+                return
+
+            _queue_meeting_edit(update, event_id, {"new_time": new_time})
             return
 
         # --- Update meeting date (non-reply) ---
@@ -185,33 +207,22 @@ async def echo(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 await update.message.reply_text("⚠️ Please specify the new date (YYYY-MM-DD).")
                 return
 
-            event_id = context.user_data.get("last_meeting", {}).get("event_id")
-            updated = None
-            try:
-                if event_id:
-                    updated = update_event_date(event_id, new_date)
-                else:
-                    updated = update_event_date(new_date)
-            except TypeError:
-                updated = update_event_date(new_date)
-            except Exception as e:
-                print("update_event_date error:", e)
-                updated = None
-
-            if updated:
-                await update.message.reply_text(f"✅ Meeting moved to *{new_date}*!", parse_mode="Markdown")
-            else:
+            event_id = await _resolve_event_id(update, context)
+            if not event_id:
                 await update.message.reply_text("⚠️ Couldn't find a meeting to update.")
+                return
+
+            _queue_meeting_edit(update, event_id, {"new_date": new_date})
             return
 
-        # --- Generic Gemini text reply ---
+        # --- Generic Gemini text reply (may be long and Markdown-formatted) ---
         reply_text = ai_response.get("reply")
         if reply_text:
-            await update.message.reply_text(reply_text)
+            await send_smart_message(update, reply_text)
             return
 
     elif isinstance(ai_response, str):
-        await update.message.reply_text(ai_response)
+        await send_smart_message(update, ai_response)
         return
 
     # fallback
@@ -1,9 +1,26 @@
+import logging
+import asyncio
 from datetime import datetime
 from telegram import Update
 from telegram.ext import ContextTypes
 
+import resilience
 from gemini_chat import parse_meeting_message
-from google_calendar import create_event
+from calendar_async import create_event, check_availability
+from telegram_bot.event_map import event_map
+from telegram_bot.handlers.meeting_actions import CALENDAR_UNAVAILABLE, meeting_keyboard, meeting_text
+from telegram_bot.reminders import reminders
+from telegram_bot.rate_limiter import PRIORITY_HIGH, send_priority
+
+
+logger = logging.getLogger(__name__)
+
+
+def _busy_span(start: datetime, end: datetime, requested: datetime) -> str:
+    """'HH:MM–HH:MM', with the day spelled out for ends not on the requested day."""
+    def fmt(dt: datetime) -> str:
+        return dt.strftime("%H:%M") if dt.date() == requested.date() else dt.strftime("%a %d %b %H:%M")
+    return f"{fmt(start)}–{fmt(end)}"
 
 
 async def schedule_meeting(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -17,7 +34,16 @@ async def schedule_meeting(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    parsed = parse_meeting_message(user_input)
+    parsed = await asyncio.to_thread(parse_meeting_message, user_input)
+    await create_meeting(update, context, parsed)
+
+
+async def create_meeting(update: Update, context: ContextTypes.DEFAULT_TYPE, parsed: dict):
+    """
+    Book a parsed meeting (title/date/time/attendees/past) in the sender's
+    calendar: conflict check, event, meeting card, reply mapping and
+    reminder. Shared by /schedule and free-text requests.
+    """
     title = parsed.get("title") or "Untitled Meeting"
     date = parsed.get("date")
     time = parsed.get("time")
@@ -51,11 +77,37 @@ async def schedule_meeting(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("⏰ You can’t schedule meetings in the past! Please choose a future time.")
         return
 
+    # === Conflict check (free/busy, cached per calendar)
+    try:
+        conflicts, suggestions = await check_availability(date, time, user_id=update.effective_user.id)
+    except Exception as e:
+        logger.exception("Availability check error: %s", e)
+        conflicts, suggestions = [], []
+
+    if conflicts:
+        busy_text = "\n".join(f"• {_busy_span(b_start, b_end, start_time)}" for b_start, b_end in conflicts)
+        slots_text = "\n".join(
+            f"• {slot.strftime('%Y-%m-%d')} at {slot.strftime('%H:%M')}" for slot in suggestions
+        ) or "• (no free slot nearby)"
+        await update.message.reply_text(
+            f"⚠️ *{title}* on {date} at {time} overlaps with:\n{busy_text}\n\n"
+            f"🕒 Nearest free slots:\n{slots_text}",
+            parse_mode="Markdown",
+        )
+        context.user_data["pending_meeting"] = {
+            "title": title, "date": date, "time": time, "attendees": attendees
+        }
+        return
+
     # === Create Google Calendar event
     try:
-        created = create_event(title, date, time, attendees=attendees)
+        created = await create_event(title, date, time, attendees=attendees, user_id=update.effective_user.id)
     except Exception as e:
-        print("Create event error:", e)
+        if resilience.is_unavailable(e):
+            logger.warning("⚠️ Calendar unavailable, meeting not created: %s", e)
+            await update.message.reply_text(CALENDAR_UNAVAILABLE)
+            return
+        logger.exception("Create event error: %s", e)
         await update.message.reply_text("⚠️ Failed to create the calendar event.")
         return
 
@@ -66,27 +118,28 @@ async def schedule_meeting(update: Update, context: ContextTypes.DEFAULT_TYPE):
     event_link = created.get("htmlLink", "No link available")
     event_id = created.get("id")
 
-    attendees_text = f"👥 Participants: {', '.join(attendees)}\n" if attendees else ""
-
-    # === ✅ Enhanced interactive message
-    msg = await update.message.reply_text(
-        f"✅ *Meeting Scheduled!*\n\n"
-        f"🗓 *{title}*\n"
-        f"📅 {date} at {time}\n"
-        f"{attendees_text}"
-        f"🔗 [View in Calendar]({event_link})\n\n"
-        f"✨ *You can reply to this message and say:*\n"
-        f"• Change title to _Daily Sync_\n"
-        f"• Reschedule meeting to _3pm tomorrow_\n"
-        f"• Move meeting to _Friday_\n"
-        f"• Cancel this meeting\n"
-        f"• Add attendee _abc@gmail.com_",
-        parse_mode="Markdown"
-    )
-
-    # === Store mapping for future replies
-    event_map = context.application.bot_data.setdefault("event_map", {})
-    event_map[msg.message_id] = event_id
+    # === ✅ Meeting card with edit buttons (confirmation → high-priority send lane)
+    with send_priority(PRIORITY_HIGH):
+        msg = await update.message.reply_text(
+            meeting_text(title, date, time, attendees, event_link),
+            parse_mode="Markdown",
+            reply_markup=meeting_keyboard(),
+        )
+
+    # === Store mapping for future replies (cached + persisted)
+    try:
+        await event_map.put(msg.chat_id, msg.message_id, event_id, user_id=update.effective_user.id)
+    except Exception as e:
+        logger.exception("event_map save error: %s", e)
+
+    # === Reminder before the meeting (persisted; sent by the leader worker)
+    try:
+        await reminders.schedule(
+            msg.chat_id, event_id, title, start_time,
+            user_id=update.effective_user.id, message_id=msg.message_id,
+        )
+    except Exception as e:
+        logger.exception("reminder schedule error: %s", e)
 
     # Store last meeting per-user (optional)
     context.user_data["last_meeting"] = {
@@ -98,4 +151,4 @@ async def schedule_meeting(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "attendees": attendees,
     }
 
-    print(f"[DEBUG] Stored event mapping: message_id={msg.message_id} -> event_id={event_id}")
+    logger.debug("Stored event mapping: message_id=%s -> event_id=%s", msg.message_id, event_id)
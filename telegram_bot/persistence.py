@@ -0,0 +1,201 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from cachetools import LRUCache
+from sqlalchemy.exc import IntegrityError
+from telegram.ext import BasePersistence, PersistenceInput
+
+import database
+from models import BotState
+
+# ============================================================
+# ⚙️ CONFIG
+# ============================================================
+# How often PTB flushes changed user_data/chat_data/bot_data to the DB.
+PERSISTENCE_UPDATE_INTERVAL = float(os.getenv("PERSISTENCE_UPDATE_INTERVAL", "1"))
+# bot_data is global and rarely written; re-read it at most this often.
+BOT_DATA_REFRESH = float(os.getenv("PERSISTENCE_BOT_DATA_REFRESH", "10"))
+
+_BOT_KEY = ("bot", "bot")
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# ============================================================
+# 💾 SQL PERSISTENCE
+# ============================================================
+class SQLPersistence(BasePersistence):
+    """
+    user_data / chat_data / bot_data (and ConversationHandler states) in the
+    `telegram_bot_state` table, shared by every worker.
+
+    - Nothing is loaded up front; refresh_*_data (run by PTB before each
+      update) pulls a row only if another worker wrote a newer version
+      than the one this worker last saw.
+    - Writes are skipped when the JSON did not change, so touching a user
+      does not cost a DB write every flush.
+    - Local changes not yet flushed are written before a refresh, never
+      discarded by it.
+    - Values must be JSON-serialisable. Concurrent writes: last one wins.
+    """
+
+    def __init__(self, update_interval: float = PERSISTENCE_UPDATE_INTERVAL):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=True, chat_data=True, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self._versions = LRUCache(maxsize=50000)  # (kind, key) -> version last read/written here
+        self._written = LRUCache(maxsize=50000)   # (kind, key) -> JSON last read/written here
+        self._bot_checked = 0.0
+
+    # --- blocking DB helpers (run in a thread) ---
+    @staticmethod
+    def _load_row(kind: str, key: str):
+        db = database.SessionLocal()
+        try:
+            row = db.get(BotState, (kind, key))
+            return (row.version, row.data) if row else None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _load_kind(kind: str) -> list[tuple[str, str]]:
+        db = database.SessionLocal()
+        try:
+            return [(r.key, r.data) for r in db.query(BotState).filter(BotState.kind == kind)]
+        finally:
+            db.close()
+
+    @staticmethod
+    def _save_row(kind: str, key: str, data: str) -> int:
+        """Upsert and return the new version."""
+        db = database.SessionLocal()
+        try:
+            for _ in range(2):
+                row = db.get(BotState, (kind, key))
+                if row:
+                    row.version += 1
+                else:
+                    row = BotState(kind=kind, key=key, version=1)
+                    db.add(row)
+                row.data = data
+                row.updated_at = _utcnow()
+                try:
+                    db.commit()
+                    return row.version
+                except IntegrityError:
+                    db.rollback()  # another worker inserted the row first; update it instead
+            raise RuntimeError(f"Could not save {kind}:{key}")
+        finally:
+            db.close()
+
+    @staticmethod
+    def _delete_row(kind: str, key: str):
+        db = database.SessionLocal()
+        try:
+            db.query(BotState).filter(BotState.kind == kind, BotState.key == key).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    # --- shared read/write paths ---
+    async def _refresh(self, kind: str, key: str, target: dict):
+        """
+        Replace `target` in place if the DB holds a newer version. Changes
+        made here but not flushed yet are written first instead of being
+        overwritten (the flush runs only every update_interval).
+        """
+        written = self._written.get((kind, key))
+        if written is not None and json.dumps(target, default=str, sort_keys=True) != written:
+            await self._write(kind, key, target)
+            return
+        row = await asyncio.to_thread(self._load_row, kind, key)
+        if row is None:
+            return
+        version, data = row
+        if self._versions.get((kind, key)) == version:
+            return  # nobody else wrote since; local data is current (or newer, unflushed)
+        target.clear()
+        target.update(json.loads(data))
+        self._versions[(kind, key)] = version
+        self._written[(kind, key)] = data
+
+    async def _write(self, kind: str, key: str, value):
+        data = json.dumps(value, default=str, sort_keys=True)
+        if self._written.get((kind, key)) == data:
+            return
+        version = await asyncio.to_thread(self._save_row, kind, key, data)
+        self._versions[(kind, key)] = version
+        self._written[(kind, key)] = data
+
+    async def _drop(self, kind: str, key: str):
+        await asyncio.to_thread(self._delete_row, kind, key)
+        self._versions.pop((kind, key), None)
+        self._written.pop((kind, key), None)
+
+    # --- initial load (lazy: refresh_* fills entries on first use) ---
+    async def get_user_data(self) -> dict:
+        return {}
+
+    async def get_chat_data(self) -> dict:
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        bot_data: dict = {}
+        await self._refresh(*_BOT_KEY, bot_data)
+        self._bot_checked = time.monotonic()
+        return bot_data
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        rows = await asyncio.to_thread(self._load_kind, f"conversation:{name}")
+        return {tuple(json.loads(key)): json.loads(data) for key, data in rows}
+
+    # --- refresh before each update ---
+    async def refresh_user_data(self, user_id: int, user_data: dict):
+        await self._refresh("user", str(user_id), user_data)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict):
+        await self._refresh("chat", str(chat_id), chat_data)
+
+    async def refresh_bot_data(self, bot_data: dict):
+        if time.monotonic() - self._bot_checked < BOT_DATA_REFRESH:
+            return
+        self._bot_checked = time.monotonic()
+        await self._refresh(*_BOT_KEY, bot_data)
+
+    # --- periodic flush (every update_interval) ---
+    async def update_user_data(self, user_id: int, data: dict):
+        await self._write("user", str(user_id), data)
+
+    async def update_chat_data(self, chat_id: int, data: dict):
+        await self._write("chat", str(chat_id), data)
+
+    async def update_bot_data(self, data: dict):
+        await self._write(*_BOT_KEY, data)
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def update_conversation(self, name: str, key: tuple, new_state: object | None):
+        kind, row_key = f"conversation:{name}", json.dumps(list(key))
+        if new_state is None:
+            await self._drop(kind, row_key)
+        else:
+            await self._write(kind, row_key, new_state)
+
+    async def drop_user_data(self, user_id: int):
+        await self._drop("user", str(user_id))
+
+    async def drop_chat_data(self, chat_id: int):
+        await self._drop("chat", str(chat_id))
+
+    async def flush(self):
+        pass  # every write goes straight to the DB
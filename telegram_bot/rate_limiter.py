@@ -0,0 +1,197 @@
+import asyncio
+import contextlib
+import contextvars
+import itertools
+import logging
+import os
+import time
+from bisect import insort
+from cachetools import LRUCache
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# ⚙️ CONFIG (Telegram limits: ~30 msg/s overall, ~1 msg/s per chat, 20 msg/min per group)
+# ============================================================
+GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+CHAT_BURST = float(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+GROUP_RATE = float(os.getenv("TELEGRAM_GROUP_RATE", str(20 / 60)))
+MAX_RETRIES = int(os.getenv("TELEGRAM_SEND_MAX_RETRIES", "3"))
+
+# Lower value = sent first
+PRIORITY_HIGH = 0     # confirmations, errors
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2      # long AI answers, attachments
+
+_priority = contextvars.ContextVar("send_priority", default=PRIORITY_NORMAL)
+
+
+@contextlib.contextmanager
+def send_priority(priority: int):
+    """Sends made inside this block (e.g. update.message.reply_text) use `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+# ============================================================
+# 🪣 TOKEN BUCKET
+# ============================================================
+class _TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available (0 = available now)."""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+# ============================================================
+# 🚦 RATE LIMITER
+# ============================================================
+class FloodControlRateLimiter(BaseRateLimiter):
+    """
+    Outbound scheduler for every Bot API call that targets a chat.
+
+    - Global and per-chat token buckets (groups get the slower group rate).
+    - Waiting sends are released in priority order (PRIORITY_HIGH first),
+      FIFO within a priority; a throttled chat never blocks other chats.
+    - RetryAfter pauses the affected chat for `retry_after` and retries
+      the send automatically (up to TELEGRAM_SEND_MAX_RETRIES).
+
+    Priority comes from `rate_limit_args={"priority": ...}` or the
+    surrounding `send_priority(...)` block.
+    """
+
+    def __init__(self):
+        self._global = _TokenBucket(GLOBAL_RATE, GLOBAL_RATE)
+        self._chats = LRUCache(maxsize=10000)  # chat_id -> _TokenBucket; idle buckets are full anyway
+        self._waiters: list = []  # sorted (priority, seq, chat_id, future)
+        self._seq = itertools.count()
+        self._wakeup: asyncio.Event | None = None
+        self._dispatcher: asyncio.Task | None = None
+
+        self.sent = 0
+        self.throttled = 0
+        self.throttle_seconds = 0.0
+        self.retry_after_hits = 0
+
+    async def initialize(self):
+        self._wakeup = asyncio.Event()
+
+    async def shutdown(self):
+        if self._dispatcher:
+            self._dispatcher.cancel()
+        for *_, future in self._waiters:
+            if not future.done():
+                future.cancel()
+        self._waiters.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "queued": len(self._waiters),
+            "sent": self.sent,
+            "throttled": self.throttled,
+            "throttle_seconds_total": round(self.throttle_seconds, 3),
+            "retry_after_hits": self.retry_after_hits,
+        }
+
+    def _chat_bucket(self, chat_id) -> _TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if not bucket:
+            is_group = isinstance(chat_id, int) and chat_id < 0
+            bucket = self._chats[chat_id] = (
+                _TokenBucket(GROUP_RATE, 1) if is_group else _TokenBucket(CHAT_RATE, CHAT_BURST)
+            )
+        return bucket
+
+    # --- dispatching ---
+    async def _dispatch(self):
+        """Release waiters whose buckets have tokens; sleep until the next one could go."""
+        while self._waiters:
+            now = time.monotonic()
+            next_wait = None
+            i = 0
+            while i < len(self._waiters):
+                _, _, chat_id, future = self._waiters[i]
+                if future.done():
+                    self._waiters.pop(i)
+                    continue
+                wait = max(self._global.wait_time(now), self._chat_bucket(chat_id).wait_time(now))
+                if wait == 0:
+                    self._global.take()
+                    self._chat_bucket(chat_id).take()
+                    self._waiters.pop(i)
+                    future.set_result(None)
+                    continue
+                next_wait = wait if next_wait is None else min(next_wait, wait)
+                if self._global.wait_time(now) > 0:
+                    break  # nothing else can go either
+                i += 1
+
+            if next_wait is None:
+                continue
+            self._wakeup.clear()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=next_wait)
+        self._dispatcher = None
+
+    async def _acquire(self, chat_id, priority: int):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        future = asyncio.get_running_loop().create_future()
+        insort(self._waiters, (priority, next(self._seq), chat_id, future), key=lambda w: w[:2])
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        else:
+            self._wakeup.set()
+
+        started = time.monotonic()
+        await future
+        waited = time.monotonic() - started
+        if waited > 0.001:
+            self.throttled += 1
+            self.throttle_seconds += waited
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get("chat_id")
+        if chat_id is None:
+            # getMe, setWebhook, answerCallbackQuery, ... are not flood-limited per chat
+            return await callback(*args, **kwargs)
+
+        priority = (rate_limit_args or {}).get("priority", _priority.get())
+        with tracing.span(f"telegram.{endpoint}", chat_id=chat_id, priority=priority):
+            return await self._send(callback, args, kwargs, chat_id, priority)
+
+    async def _send(self, callback, args, kwargs, chat_id, priority: int):
+        for attempt in range(MAX_RETRIES + 1):
+            await self._acquire(chat_id, priority)
+            try:
+                result = await callback(*args, **kwargs)
+                self.sent += 1
+                return result
+            except RetryAfter as e:
+                self.retry_after_hits += 1
+                if attempt == MAX_RETRIES:
+                    raise
+                delay = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else float(e.retry_after)
+                logger.info("⏳ Telegram flood control for chat %s: retrying in %.1fs", chat_id, delay)
+                self._chat_bucket(chat_id).paused_until = time.monotonic() + delay
@@ -0,0 +1,343 @@
+import asyncio
+import heapq
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from telegram import ReplyParameters
+from telegram.error import BadRequest, Forbidden
+from telegram.helpers import escape_markdown
+
+import calendar_store
+import database
+from models import MeetingReminder
+from telegram_bot.rate_limiter import PRIORITY_HIGH
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# ⚙️ CONFIG
+# ============================================================
+REMINDER_MINUTES_BEFORE = int(os.getenv("REMINDER_MINUTES_BEFORE", "15"))
+# Only reminders due within this window are held in memory
+REMINDER_WINDOW = timedelta(seconds=int(os.getenv("REMINDER_WINDOW_SECONDS", "600")))
+# How often the DB is checked for reminders added by other workers / newly inside the window
+REMINDER_RELOAD_SECONDS = float(os.getenv("REMINDER_RELOAD_SECONDS", "60"))
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+REMINDER_MAX_ATTEMPTS = 3
+REMINDER_RETRY = timedelta(seconds=60)
+
+IST = ZoneInfo("Asia/Kolkata")
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _to_utc_naive(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=IST)
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# ============================================================
+# 💾 STORE (blocking; run in a thread)
+# ============================================================
+def _replace_for_event(rows: list[dict], event_id: str, chat_id: int | None = None):
+    """Delete the event's pending reminders (optionally for one chat) and insert `rows`."""
+    db = database.SessionLocal()
+    try:
+        query = db.query(MeetingReminder).filter(MeetingReminder.event_id == event_id)
+        if chat_id is not None:
+            query = query.filter(MeetingReminder.chat_id == chat_id)
+        query.delete(synchronize_session=False)
+        db.add_all([MeetingReminder(**row) for row in rows])
+        db.commit()
+    finally:
+        db.close()
+
+
+def _reschedule_event(event_id: str, meeting_start: datetime, fire_at: datetime):
+    db = database.SessionLocal()
+    try:
+        db.query(MeetingReminder).filter(MeetingReminder.event_id == event_id).update(
+            {"meeting_start": meeting_start, "fire_at": fire_at, "attempts": 0}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _delete_ids(ids: list[int]):
+    if not ids:
+        return
+    db = database.SessionLocal()
+    try:
+        db.query(MeetingReminder).filter(MeetingReminder.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _delete_event(event_id: str):
+    db = database.SessionLocal()
+    try:
+        db.query(MeetingReminder).filter(MeetingReminder.event_id == event_id).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _apply_calendar_changes(events: list[dict]) -> bool:
+    """
+    Follow meetings changed in Google Calendar: drop reminders of cancelled
+    (or now past) events, move the rest to the new start and title.
+    Returns True if any reminder row changed.
+    """
+    by_id = {event["id"]: event for event in events if event.get("id")}
+    if not by_id:
+        return False
+    now = _utcnow()
+    changed = False
+    db = database.SessionLocal()
+    try:
+        for row in db.query(MeetingReminder).filter(MeetingReminder.event_id.in_(list(by_id))):
+            event = by_id[row.event_id]
+            start, _ = calendar_store.event_bounds(event)
+            if event.get("status") == "cancelled" or start is None or _to_utc_naive(start) <= now:
+                db.delete(row)
+                changed = True
+                continue
+            meeting_start = _to_utc_naive(start)
+            if row.meeting_start != meeting_start:
+                row.meeting_start = meeting_start
+                row.fire_at = max(meeting_start - timedelta(minutes=REMINDER_MINUTES_BEFORE), now)
+                row.attempts = 0
+                changed = True
+            if event.get("summary") and row.title != event["summary"]:
+                row.title = event["summary"]
+                changed = True
+        if changed:
+            db.commit()
+        return changed
+    finally:
+        db.close()
+
+
+def _load_due_before(horizon: datetime, limit: int) -> list[MeetingReminder]:
+    """Pending reminders firing before `horizon`, earliest first (uses the fire_at index)."""
+    db = database.SessionLocal()
+    try:
+        rows = (
+            db.query(MeetingReminder)
+            .filter(MeetingReminder.fire_at <= horizon)
+            .order_by(MeetingReminder.fire_at)
+            .limit(limit)
+            .all()
+        )
+        db.expunge_all()
+        return rows
+    finally:
+        db.close()
+
+
+def _retry_later(ids: list[int], fire_at: datetime):
+    db = database.SessionLocal()
+    try:
+        db.query(MeetingReminder).filter(MeetingReminder.id.in_(ids)).update(
+            {"fire_at": fire_at, "attempts": MeetingReminder.attempts + 1}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+# ============================================================
+# ⏰ SCHEDULER
+# ============================================================
+class ReminderScheduler:
+    """
+    Meeting reminders that survive restarts without one timer per meeting.
+
+    - Every reminder is a row in `meeting_reminders` (indexed by fire_at).
+    - Only reminders due within REMINDER_WINDOW are loaded into a min-heap,
+      rebuilt from the index every REMINDER_RELOAD_SECONDS (or right away
+      when this worker adds/moves/cancels one inside the window); the rest
+      cost nothing until they come within the window.
+    - Everything due is sent as one batch (through the bot's rate limiter),
+      then deleted with a single statement.
+    - Meetings moved, renamed or cancelled in Google Calendar are picked up
+      from calendar_store's incremental syncs.
+    - Runs on the leader worker only; other workers just write rows.
+    """
+
+    def __init__(self, window: timedelta = REMINDER_WINDOW, reload_seconds: float = REMINDER_RELOAD_SECONDS):
+        self.window = window
+        self.reload_seconds = reload_seconds
+        self._heap: list[tuple[datetime, int]] = []   # (fire_at, reminder id) due within the window
+        self._payloads: dict[int, dict] = {}          # reminder id -> what to send
+        self._horizon = datetime.min                  # everything due before this is loaded
+        self._reload_now = False
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._bot = None
+        self.sent = 0
+        self.failed = 0
+
+    # --- API used by handlers (any worker) ---
+    async def schedule(self, chat_id: int, event_id: str, title: str, start: datetime,
+                       user_id: int | None = None, message_id: int | None = None):
+        """(Re)create the reminder for `event_id` in `chat_id`; `start` is the meeting start (IST if naive)."""
+        meeting_start = _to_utc_naive(start)
+        fire_at = meeting_start - timedelta(minutes=REMINDER_MINUTES_BEFORE)
+        if meeting_start <= _utcnow():
+            return
+        row = {
+            "fire_at": max(fire_at, _utcnow()), "chat_id": chat_id, "user_id": user_id, "event_id": event_id,
+            "message_id": message_id, "title": title, "meeting_start": meeting_start,
+        }
+        await asyncio.to_thread(_replace_for_event, [row], event_id, chat_id)
+        self._changed(row["fire_at"])
+
+    async def reschedule(self, event_id: str, start: datetime):
+        """Move the event's reminders after its start time changed."""
+        meeting_start = _to_utc_naive(start)
+        fire_at = max(meeting_start - timedelta(minutes=REMINDER_MINUTES_BEFORE), _utcnow())
+        await asyncio.to_thread(_reschedule_event, event_id, meeting_start, fire_at)
+        if any(item["event_id"] == event_id for item in self._payloads.values()):
+            self._changed(datetime.min)  # was loaded: drop the old fire time
+        else:
+            self._changed(fire_at)
+
+    async def cancel(self, event_id: str):
+        await asyncio.to_thread(_delete_event, event_id)
+        if any(item["event_id"] == event_id for item in self._payloads.values()):
+            self._changed(datetime.min)
+
+    def calendar_synced(self, events: list[dict]):
+        """calendar_store sync listener: runs on a calendar worker thread, not the event loop."""
+        if _apply_calendar_changes(events) and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._changed, datetime.min)
+
+    def pending_in_memory(self) -> int:
+        return len(self._heap)
+
+    # --- in-memory window ---
+    def _changed(self, fire_at: datetime):
+        """A reminder inside the loaded window changed: rebuild the heap now."""
+        if self._task is not None and fire_at <= self._horizon:
+            self._reload_now = True
+            self._wakeup.set()
+
+    async def _reload(self):
+        limit = REMINDER_BATCH_SIZE * 10
+        horizon = _utcnow() + self.window
+        rows = await asyncio.to_thread(_load_due_before, horizon, limit)
+        self._payloads = {
+            row.id: {
+                "chat_id": row.chat_id, "event_id": row.event_id, "message_id": row.message_id,
+                "title": row.title, "meeting_start": row.meeting_start, "attempts": row.attempts,
+            }
+            for row in rows
+        }
+        self._heap = [(row.fire_at, row.id) for row in rows]  # already sorted = valid heap
+        # If the window was cut off by the limit, it only extends to the last loaded row
+        self._horizon = rows[-1].fire_at if len(rows) == limit else horizon
+
+    def _pop_due(self, now: datetime) -> list[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < REMINDER_BATCH_SIZE:
+            due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    # --- delivery ---
+    async def _send(self, reminder_id: int) -> bool | None:
+        """True = delivered, None = give up (chat gone / meeting started), False = retry."""
+        item = self._payloads.pop(reminder_id, None)
+        if not item:
+            return None
+        if item["meeting_start"] <= _utcnow():
+            return None  # too late to be useful (e.g. bot was down)
+        start_ist = item["meeting_start"].replace(tzinfo=timezone.utc).astimezone(IST)
+        minutes = max(1, round((item["meeting_start"] - _utcnow()).total_seconds() / 60))
+        try:
+            await self._bot.send_message(
+                item["chat_id"],
+                f"⏰ Reminder: *{escape_markdown(item['title'] or 'Meeting')}* starts in {minutes} min "
+                f"({start_ist.strftime('%H:%M')})",
+                parse_mode="Markdown",
+                reply_parameters=ReplyParameters(item["message_id"], allow_sending_without_reply=True)
+                if item["message_id"] else None,
+                rate_limit_args={"priority": PRIORITY_HIGH},
+            )
+            return True
+        except (Forbidden, BadRequest) as e:
+            logger.warning("⚠️ Reminder %s undeliverable: %s", reminder_id, e)
+            return None
+        except Exception as e:
+            logger.warning("⚠️ Reminder %s send failed: %s", reminder_id, e)
+            if item["attempts"] + 1 >= REMINDER_MAX_ATTEMPTS:
+                return None
+            return False
+
+    async def _deliver(self, ids: list[int]):
+        results = await asyncio.gather(*(self._send(i) for i in ids))
+        done = [i for i, ok in zip(ids, results) if ok is not False]
+        retry = [i for i, ok in zip(ids, results) if ok is False]
+        self.sent += sum(1 for ok in results if ok)
+        self.failed += len(results) - sum(1 for ok in results if ok)
+        await asyncio.to_thread(_delete_ids, done)
+        if retry:
+            await asyncio.to_thread(_retry_later, retry, _utcnow() + REMINDER_RETRY)
+        logger.info("⏰ Sent %s reminders (%s to retry)", len(done), len(retry))
+
+    async def _run(self):
+        next_reload = 0.0
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                if self._reload_now or loop.time() >= next_reload:
+                    self._reload_now = False
+                    await self._reload()
+                    next_reload = loop.time() + self.reload_seconds
+
+                due = self._pop_due(_utcnow())
+                if due:
+                    await self._deliver(due)
+                    continue
+
+                wait = next_reload - loop.time()
+                if self._heap:
+                    wait = min(wait, (self._heap[0][0] - _utcnow()).total_seconds())
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(wait, 0.05))
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Reminder scheduler error: %s", e)
+                await asyncio.sleep(5)
+
+    # --- lifecycle (leader only) ---
+    def start(self, bot):
+        if self._task is None:
+            self._bot = bot
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._loop = None
+        self._heap.clear()
+        self._payloads.clear()
+        self._horizon = datetime.min
+
+
+reminders = ReminderScheduler()
+calendar_store.add_sync_listener(reminders.calendar_synced)
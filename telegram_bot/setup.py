@@ -1,50 +1,89 @@
 import os
-import threading
 from dotenv import load_dotenv
 from telegram.ext import (
     ApplicationBuilder,
+    CallbackQueryHandler,
     CommandHandler,
     MessageHandler,
+    TypeHandler,
     filters,
 )
+from telegram import Update
+
+import metrics
+import tracing
 
 # Import handlers
 from telegram_bot.handlers.message_handler import start, echo
 from telegram_bot.handlers.schedule_handler import schedule_meeting
+from telegram_bot.handlers.connect_handler import connect_calendar
+from telegram_bot.handlers.meeting_actions import PATTERN as MEETING_ACTION_PATTERN, meeting_action
+from telegram_bot import update_queue
+from telegram_bot.update_processor import ChatOrderedUpdateProcessor
+from telegram_bot.rate_limiter import FloodControlRateLimiter
+from telegram_bot.persistence import SQLPersistence
 
 load_dotenv()
 
+HANDLER_SECONDS = metrics.registry.histogram(
+    "telegram_handler_duration_seconds", "Time spent in a Telegram handler", ("handler",)
+)
+HANDLER_ERRORS = metrics.registry.counter(
+    "telegram_handler_errors_total", "Telegram handlers that raised", ("handler",)
+)
+
+
+def _tracked(name: str, callback):
+    timed = metrics.timed(HANDLER_SECONDS, HANDLER_ERRORS, handler=name)(callback)
+    return tracing.traced(f"handler.{name}")(timed)
 
-def setup_telegram_bot(app=None):
+
+def setup_telegram_bot(app=None, request=None):
     """
     Initializes Telegram Application.
-    - Returns application instance (for webhook use in main.py).
-    - If not in RENDER env, also starts polling in a background thread.
+    - Returns application instance; main.py starts it on the server's event loop.
+    - Polling (local mode) or webhook registration (RENDER) is done only by
+      the leader worker, see main.py / leader_election.py.
+    - `request` replaces the HTTP transport to the Bot API (the load-test
+      harness in bench/ passes a local stand-in).
     """
     token = os.getenv("TELEGRAM_TOKEN")
     if not token:
         raise ValueError("❌ Missing TELEGRAM_TOKEN in environment variables!")
 
-    application = ApplicationBuilder().token(token).build()
+    builder = ApplicationBuilder()
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
 
-    # === Register command handlers ===
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("schedule", schedule_meeting))
+    application = (
+        builder
+        .token(token)
+        .update_queue(update_queue.make_update_queue())
+        # Parallel across chats, ordered within a chat
+        .concurrent_updates(
+            ChatOrderedUpdateProcessor(update_queue.UPDATE_WORKERS, update_queue.UPDATE_QUEUE_SIZE)
+        )
+        # Per-chat/global token buckets + automatic RetryAfter handling
+        .rate_limiter(FloodControlRateLimiter())
+        # user_data / chat_data / bot_data shared by all workers
+        .persistence(SQLPersistence())
+        .build()
+    )
 
-    # === Natural chat / reply handler ===
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, echo))
+    # === Queue-lag bookkeeping (runs before every other handler) ===
+    application.add_handler(TypeHandler(Update, update_queue.stats.record_start), group=-1)
 
-    # Shared storage for event mapping
-    application.bot_data.setdefault("event_map", {})
+    # === Register command handlers ===
+    application.add_handler(CommandHandler("start", _tracked("start", start)))
+    application.add_handler(CommandHandler("schedule", _tracked("schedule_meeting", schedule_meeting)))
+    application.add_handler(CommandHandler("connect", _tracked("connect_calendar", connect_calendar)))
 
-    # === Local polling mode (for dev) ===
-    if not os.getenv("RENDER", "").lower() == "true":
-        def run_bot():
-            # Disable signal handling since it's in background thread
-            application.run_polling(stop_signals=None)
+    # === Meeting card buttons (+1h / tomorrow / free slot / cancel) ===
+    application.add_handler(
+        CallbackQueryHandler(_tracked("meeting_action", meeting_action), pattern=MEETING_ACTION_PATTERN)
+    )
 
-        thread = threading.Thread(target=run_bot, daemon=True)
-        thread.start()
-        print("🤖 Telegram bot polling started (local mode)")
+    # === Natural chat / reply handler ===
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, _tracked("echo", echo)))
 
     return application
@@ -0,0 +1,82 @@
+import asyncio
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+import logging_config
+import tracing
+from telegram_bot import update_queue
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Runs updates from different chats in parallel (up to `max_active`),
+    but strictly one at a time, in arrival order, within the same chat —
+    so `pending_meeting` / `last_meeting` in user_data never race.
+
+    PTB starts a task per update before any semaphore is taken, so the
+    number of updates in flight is bounded at the webhook instead
+    (update_queue.enqueue); each update's slot there is released here once
+    its handlers finish. The concurrency limit is taken after the per-chat
+    lock; a chat with a backlog waits on its own lock without holding a
+    worker slot other chats could use.
+    """
+
+    def __init__(self, max_active: int, max_pending: int):
+        super().__init__(max_concurrent_updates=max(max_pending, max_active, 2))
+        self.max_active = max_active
+        self._active: asyncio.Semaphore | None = None
+        self._chat_locks: dict[int, asyncio.Lock] = {}
+        self._chat_refs: dict[int, int] = {}
+
+    @staticmethod
+    def _chat_key(update: object) -> int | None:
+        if not isinstance(update, Update):
+            return None
+        if update.effective_chat:
+            return update.effective_chat.id
+        if update.effective_user:
+            return update.effective_user.id
+        return None
+
+    async def do_process_update(self, update, coroutine):
+        # Continue the webhook's trace (if any); the span includes time waiting for the chat lock
+        update_id = getattr(update, "update_id", None)
+        chat_id = self._chat_key(update)
+        try:
+            with tracing.resume(update_id), tracing.span("update", update_id=update_id), \
+                    logging_config.log_context(update_id=update_id, chat_id=chat_id):
+                await self._process_in_order(update, coroutine)
+        finally:
+            update_queue.stats.mark_finished(update_id)
+
+    async def _process_in_order(self, update, coroutine):
+        if self._active is None:
+            self._active = asyncio.Semaphore(self.max_active)
+
+        key = self._chat_key(update)
+        if key is None:
+            async with self._active:
+                await coroutine
+            return
+
+        lock = self._chat_locks.setdefault(key, asyncio.Lock())
+        self._chat_refs[key] = self._chat_refs.get(key, 0) + 1
+        try:
+            async with lock:
+                async with self._active:
+                    await coroutine
+        finally:
+            self._chat_refs[key] -= 1
+            if not self._chat_refs[key]:
+                # Last update for this chat: drop its lock so idle chats cost nothing
+                del self._chat_refs[key]
+                del self._chat_locks[key]
+
+    def active_chats(self) -> int:
+        return len(self._chat_locks)
+
+    async def initialize(self):
+        self._active = asyncio.Semaphore(self.max_active)
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,104 @@
+import asyncio
+import hmac
+import os
+import time
+from telegram import Update
+from telegram.ext import ContextTypes
+
+# ============================================================
+# ⚙️ CONFIG
+# ============================================================
+# Webhook updates accepted but not yet handled (waiting + running); beyond this /webhook answers 503
+UPDATE_QUEUE_SIZE = int(os.getenv("UPDATE_QUEUE_SIZE", "1000"))
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "16"))
+WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+
+
+def make_update_queue() -> asyncio.Queue:
+    """
+    Queue handed to ApplicationBuilder().update_queue(). With concurrent
+    updates PTB takes each update off it at once and starts a task, so a
+    maxsize here would bound nothing: the limit is enforced in enqueue(),
+    counting updates until their handlers finish.
+    """
+    return asyncio.Queue()
+
+
+def check_secret(header_value: str | None) -> bool:
+    """Validate X-Telegram-Bot-Api-Secret-Token (always true if no secret is configured)."""
+    if not WEBHOOK_SECRET:
+        return True
+    return bool(header_value) and hmac.compare_digest(header_value, WEBHOOK_SECRET)
+
+
+# ============================================================
+# 📊 QUEUE STATS
+# ============================================================
+class UpdateQueueStats:
+    """Counters for the webhook → update_queue → handler path."""
+
+    def __init__(self):
+        self._enqueued_at: dict[int, float] = {}
+        self._in_flight: set[int] = set()  # accepted by the webhook, handler not finished yet
+        self.received = 0
+        self.rejected = 0
+        self.started = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.last_lag = 0.0
+
+    def mark_enqueued(self, update_id: int):
+        self.received += 1
+        self._enqueued_at[update_id] = time.monotonic()
+        self._in_flight.add(update_id)
+
+    def mark_finished(self, update_id: int | None):
+        """Called by the update processor once an update's handlers are done (no-op for polled updates)."""
+        self._in_flight.discard(update_id)
+        self._enqueued_at.pop(update_id, None)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    async def record_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """TypeHandler (group -1): runs first for every update and records its queue lag."""
+        enqueued = self._enqueued_at.pop(update.update_id, None)
+        if enqueued is None:
+            return  # polling mode or not enqueued through the webhook
+        lag = time.monotonic() - enqueued
+        self.started += 1
+        self.lag_total += lag
+        self.last_lag = lag
+        self.lag_max = max(self.lag_max, lag)
+
+    def snapshot(self, application) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "in_flight_limit": UPDATE_QUEUE_SIZE,
+            "workers": UPDATE_WORKERS,
+            "active_chats": getattr(application.update_processor, "active_chats", lambda: 0)() if application else 0,
+            "received": self.received,
+            "rejected": self.rejected,
+            "started": self.started,
+            "lag_last_seconds": round(self.last_lag, 4),
+            "lag_avg_seconds": round(self.lag_total / self.started, 4) if self.started else 0.0,
+            "lag_max_seconds": round(self.lag_max, 4),
+        }
+
+
+stats = UpdateQueueStats()
+
+
+def enqueue(application, update: Update) -> bool:
+    """
+    Hand an update to the application without waiting; False if
+    UPDATE_QUEUE_SIZE updates are already in flight. The slot is freed by
+    stats.mark_finished() when the handlers are done, not when PTB dequeues it.
+    """
+    if stats.in_flight >= UPDATE_QUEUE_SIZE:
+        stats.rejected += 1
+        return False
+    stats.mark_enqueued(update.update_id)
+    application.update_queue.put_nowait(update)
+    return True
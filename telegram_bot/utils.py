@@ -1,29 +1,248 @@
+import re
 from io import BytesIO
 from telegram import Update
+from telegram.error import BadRequest
+from telegram_bot.rate_limiter import PRIORITY_LOW, send_priority
 
 MAX_LENGTH = 4000
+MAX_PARTS = 10  # beyond this many messages, attach the full text as a file instead
 
+_SENTENCE_END = re.compile(r"[.!?…][\"')\]]*\s")
+_INLINE_MARKERS = ("*", "_", "`")
+
+
+# ============================================================
+# ✂️ SPLIT HELPERS
+# ============================================================
+def _balanced_cuts(window: str) -> list[bool]:
+    """
+    balanced[i] is True if window[:i] leaves no inline entity (*bold*,
+    _italic_, `code`, [link](url)) open. One pass over the window.
+    Plain parentheses are not entities: only the "(url)" right after a
+    link's "]" is tracked, so a stray "(" or ":(" does not block cuts.
+    """
+    balanced = [True] * (len(window) + 1)
+    open_marks = {m: False for m in _INLINE_MARKERS}
+    link_text = 0   # open "[" not yet closed
+    in_url = False  # inside the "(url)" of a link
+    for i, ch in enumerate(window):
+        in_code = open_marks["`"]
+        if in_url:
+            in_url = ch != ")"
+        elif ch in open_marks and (i == 0 or window[i - 1] != "\\"):
+            if ch == "`" or not in_code:
+                open_marks[ch] = not open_marks[ch]
+        elif ch == "[" and not in_code:
+            link_text += 1
+        elif ch == "]" and link_text and not in_code:
+            link_text -= 1
+            in_url = window[i + 1:i + 2] == "("
+        balanced[i + 1] = not link_text and not in_url and not any(open_marks.values())
+    return balanced
+
+
+def _best_cut(text: str, start: int, limit: int) -> int:
+    """
+    Absolute index to cut `text` at, so that text[start:cut] <= limit.
+    Prefers paragraph > line > sentence > word boundaries, and never
+    cuts inside an inline entity unless there is no other option.
+    """
+    window = text[start:start + limit]
+    balanced = _balanced_cuts(window)
+    floor = limit // 4  # don't emit tiny chunks just to hit a "nicer" boundary
+
+    candidates = (
+        [m.end() for m in re.finditer(r"\n\s*\n", window)],
+        [m.end() for m in re.finditer(r"\n", window)],
+        [m.end() for m in _SENTENCE_END.finditer(window)],
+        [m.end() for m in re.finditer(r"\s+", window)],
+    )
+    for cuts in candidates:
+        for cut in reversed(cuts):
+            if cut < floor:
+                break
+            if balanced[cut]:
+                return start + cut
+    # No entity-safe boundary: fall back to the last whitespace, then a hard cut
+    for cut in reversed(candidates[3]):
+        if cut >= floor:
+            return start + cut
+    return start + limit
+
+
+def _split_text(text: str, limit: int) -> list[str]:
+    pieces = []
+    start = 0
+    while len(text) - start > limit:
+        cut = _best_cut(text, start, limit)
+        pieces.append(text[start:cut])
+        start = cut
+    pieces.append(text[start:])
+    return pieces
+
+
+def _split_code(text: str, fence: str, limit: int) -> list[str]:
+    """Split a fenced block by lines; every piece is closed and the next reopens the fence."""
+    closing = "```"
+    budget = limit - len(fence) - len(closing) - 3  # reopened fence + closing fence + their three newlines
+    body = text.split("\n", 1)[1] if "\n" in text else ""
+    if body.rstrip().endswith(closing):
+        body = body.rstrip()[: -len(closing)]
+
+    pieces, current, current_len = [], [], 0
+    for line in body.splitlines(keepends=True):
+        while len(line) > budget:  # a single huge line: hard-split it
+            if current:
+                pieces.append(current)
+                current, current_len = [], 0
+            pieces.append([line[:budget] + "\n"])
+            line = line[budget:]
+        if current_len + len(line) > budget:
+            pieces.append(current)
+            current, current_len = [], 0
+        current.append(line)
+        current_len += len(line)
+    if current:
+        pieces.append(current)
+
+    return [f"{fence}\n{''.join(p).rstrip(chr(10))}\n{closing}\n" for p in pieces]
+
+
+# ============================================================
+# 🧩 STREAMING CHUNKER
+# ============================================================
+class MarkdownChunker:
+    """
+    Incremental, linear-time splitter for Telegram messages.
+
+    feed() text as it arrives (whole or streamed) and send whatever chunks
+    it returns right away; close() returns the rest. Chunks stay within
+    `limit`, break at paragraph/sentence/word boundaries and never split
+    inline Markdown entities; code fences that must be split are closed and
+    reopened so every chunk renders on its own.
+    """
+
+    def __init__(self, limit: int = MAX_LENGTH):
+        self.limit = limit
+        self._partial: list[str] = []   # pieces of the current unfinished line
+        self._block: list[str] = []     # lines of the current paragraph / code block
+        self._fence: str | None = None  # opening ``` line while inside a code block
+        self._out: list[str] = []       # blocks making up the chunk being built
+        self._out_len = 0
+
+    def feed(self, text: str) -> list[str]:
+        ready = []
+        for segment in text.splitlines(keepends=True):
+            if segment.endswith("\n"):
+                self._partial.append(segment)
+                line = "".join(self._partial)
+                self._partial = []
+                ready.extend(self._line(line))
+            else:
+                self._partial.append(segment)
+        return ready
+
+    def close(self) -> list[str]:
+        ready = []
+        if self._partial:
+            ready.extend(self._line("".join(self._partial)))
+            self._partial = []
+        if self._fence:
+            self._block.append("```\n")  # unterminated fence: close it
+        ready.extend(self._end_block())
+        if self._out_len:
+            ready.append(self._flush())
+        return [c for c in ready if c.strip()]
+
+    def _line(self, line: str) -> list[str]:
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            if self._fence is None:
+                ready = self._end_block()
+                self._fence = stripped
+                self._block.append(line)
+                return ready
+            self._block.append(line)
+            ready = self._end_block()
+            return ready
+        self._block.append(line)
+        if self._fence is None and not stripped:
+            return self._end_block()  # blank line ends a paragraph
+        return []
+
+    def _end_block(self) -> list[str]:
+        if not self._block:
+            return []
+        text = "".join(self._block)
+        fence = self._fence
+        self._block = []
+        self._fence = None
+        return self._add(text, fence)
+
+    def _add(self, text: str, fence: str | None) -> list[str]:
+        if self._out_len + len(text) <= self.limit:
+            self._out.append(text)
+            self._out_len += len(text)
+            return []
+
+        ready = [self._flush()] if self._out_len else []
+        if len(text) <= self.limit:
+            pieces = [text]
+        elif fence:
+            pieces = _split_code(text, fence, self.limit)
+        else:
+            pieces = _split_text(text, self.limit)
+        ready.extend(pieces[:-1])
+        self._out = [pieces[-1]]
+        self._out_len = len(pieces[-1])
+        return ready
+
+    def _flush(self) -> str:
+        chunk = "".join(self._out)
+        self._out = []
+        self._out_len = 0
+        return chunk
+
+
+def iter_chunks(text: str, limit: int = MAX_LENGTH):
+    """Yield Telegram-sized chunks of `text` as soon as each one is complete."""
+    chunker = MarkdownChunker(limit)
+    for line in text.splitlines(keepends=True):
+        for chunk in chunker.feed(line):
+            if chunk.strip():
+                yield chunk
+    yield from chunker.close()
+
+
+# ============================================================
+# 📤 SENDING
+# ============================================================
 async def send_smart_message(update: Update, text: str):
     """
     Sends long messages safely without Telegram 400 errors.
     Splits messages by paragraph or sends as a file if too long.
+    Sent in the low-priority lane so confirmations aren't stuck behind it.
     """
-    if len(text) <= MAX_LENGTH:
+    with send_priority(PRIORITY_LOW):
+        await _send_smart_message(update, text)
+
+
+async def _reply_markdown(update: Update, text: str):
+    """Send one chunk rendered as Markdown; if Telegram can't parse it, send it as plain text."""
+    try:
+        await update.message.reply_text(text, parse_mode="Markdown")
+    except BadRequest as e:
+        if "parse entities" not in str(e).lower():
+            raise
         await update.message.reply_text(text)
-        return
 
-    parts = []
-    current = ""
-    for line in text.splitlines(keepends=True):
-        if len(current) + len(line) > MAX_LENGTH:
-            parts.append(current)
-            current = line
-        else:
-            current += line
-    if current:
-        parts.append(current)
 
-    if len(parts) > 3:
+async def _send_smart_message(update: Update, text: str):
+    if len(text) <= MAX_LENGTH:
+        await _reply_markdown(update, text)
+        return
+
+    if len(text) > MAX_LENGTH * MAX_PARTS:
         preview = text[:1000] + "\n\n(Full response attached 👇)"
         await update.message.reply_text(preview)
         bio = BytesIO()
@@ -32,5 +251,5 @@ async def send_smart_message(update: Update, text: str):
         await update.message.reply_document(document=bio, filename="gemini_output.txt")
         return
 
-    for part in parts:
-        await update.message.reply_text(part.strip())
+    for part in iter_chunks(text):
+        await _reply_markdown(update, part.strip())
@@ -0,0 +1,243 @@
+import contextlib
+import contextvars
+import functools
+import inspect
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from cachetools import LRUCache
+
+# ============================================================
+# ⚙️ CONFIG
+# ============================================================
+# Only traces at least this long are kept (0 = keep every trace)
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "1000"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+MAX_SPANS_PER_TRACE = int(os.getenv("TRACE_MAX_SPANS", "500"))
+
+_current: contextvars.ContextVar["Span | None"] = contextvars.ContextVar("current_span", default=None)
+_recent: deque = deque(maxlen=TRACE_BUFFER_SIZE)   # finished slow traces, newest last
+
+
+class _Handoffs(LRUCache):
+    """key (e.g. update_id) -> handed-off Span; evicted handoffs close their trace."""
+
+    def popitem(self):
+        key, parent = super().popitem()
+        parent.trace._closed()
+        return key, parent
+
+
+_handoffs = _Handoffs(maxsize=10000)
+
+
+# ============================================================
+# 🧵 TRACE / SPAN
+# ============================================================
+class Trace:
+    """All spans of one request; finished when its last open span (or handoff) closes."""
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.started_at = time.time()
+        self.spans: list[Span] = []
+        self.dropped = 0
+        self._open = 0
+        self.finished = False
+        self._lock = threading.Lock()  # spans also close on calendar/DB worker threads
+
+    def _opened(self, span: "Span | None" = None):
+        with self._lock:
+            self._open += 1
+            if span is not None:
+                if len(self.spans) < MAX_SPANS_PER_TRACE:
+                    self.spans.append(span)
+                else:
+                    self.dropped += 1
+
+    def _closed(self):
+        with self._lock:
+            self._open -= 1
+            done = self._open == 0 and not self.finished
+            if done:
+                self.finished = True
+        if done:
+            _finish(self)
+
+    def to_dict(self) -> dict:
+        start = min(s.start for s in self.spans)
+        end = max(s.end or s.start for s in self.spans)
+        depth = {}
+        spans = []
+        for s in sorted(self.spans, key=lambda s: s.start):
+            depth[s.span_id] = depth.get(s.parent_id, -1) + 1
+            spans.append({
+                "name": s.name,
+                "span_id": s.span_id,
+                "parent_id": s.parent_id,
+                "depth": depth[s.span_id],
+                "offset_ms": round((s.start - start) * 1000, 2),
+                "duration_ms": round(((s.end or s.start) - s.start) * 1000, 2),
+                "error": s.error,
+                **({"attrs": s.attrs} if s.attrs else {}),
+            })
+        return {
+            "trace_id": self.trace_id,
+            "root": spans[0]["name"],
+            "started_at": self.started_at,
+            "duration_ms": round((end - start) * 1000, 2),
+            "spans": spans,
+            "dropped_spans": self.dropped,
+        }
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start", "end", "attrs", "error")
+
+    def __init__(self, name: str, parent: "Span | None", attrs: dict):
+        self.trace = parent.trace if parent else Trace()
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.perf_counter()
+        self.end = None
+        self.attrs = attrs
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+def _finish(trace: Trace):
+    """Called once per trace, when its last open span or handoff closes."""
+    if not trace.spans:
+        return
+    duration_ms = (max(s.end or s.start for s in trace.spans) - min(s.start for s in trace.spans)) * 1000
+    if duration_ms >= TRACE_SLOW_MS:
+        _recent.append(trace)
+
+
+# ============================================================
+# 🔧 API
+# ============================================================
+def current() -> Span | None:
+    return _current.get()
+
+
+def start_span(name: str, **attrs):
+    """Open a span as a child of the current one (or a new trace). Returns (span, token)."""
+    parent = _current.get()
+    if parent is not None and parent.trace.finished:
+        parent = None  # the request is over (e.g. late background work); start a trace of its own
+    span = Span(name, parent, attrs)
+    span.trace._opened(span)
+    return span, _current.set(span)
+
+
+def end_span(span: Span, token, error: BaseException | None = None):
+    span.end = time.perf_counter()
+    if error is not None:
+        span.error = f"{type(error).__name__}: {error}"
+    try:
+        _current.reset(token)
+    except ValueError:
+        pass  # token from another context (ended from a different task/thread)
+    span.trace._closed()
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs):
+    """`with span("calendar.insert"):` — times the block as a child of the current span."""
+    s, token = start_span(name, **attrs)
+    try:
+        yield s
+    except BaseException as e:
+        end_span(s, token, e)
+        raise
+    end_span(s, token)
+
+
+def traced(name: str | None = None):
+    """Decorator form of span() for sync and async functions."""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def detached() -> contextvars.Context:
+    """
+    A copy of the current context with no active span, for background tasks
+    (`asyncio.create_task(coro, context=tracing.detached())`) that outlive
+    the request that started them: their spans form their own trace instead
+    of reopening the request's.
+    """
+    ctx = contextvars.copy_context()
+    ctx.run(_current.set, None)
+    return ctx
+
+
+def handoff(key):
+    """
+    Keep the current trace open for work that continues elsewhere (e.g. the
+    webhook enqueues an update a worker task picks up later); resume(key)
+    continues it there, cancel_handoff(key) closes it if that never happens.
+    Call it *before* handing the work over, so resume() cannot run first.
+    """
+    parent = _current.get()
+    if parent is not None:
+        parent.trace._opened()
+        cancel_handoff(key)  # a previous handoff under the same key is not coming back
+        _handoffs[key] = parent
+
+
+def cancel_handoff(key):
+    """Close a handoff that will not be resumed (e.g. the work was rejected)."""
+    parent = _handoffs.pop(key, None)
+    if parent is not None:
+        parent.trace._closed()
+
+
+@contextlib.contextmanager
+def resume(key):
+    """Make the span handed off under `key` current for this block (no-op if none)."""
+    parent = _handoffs.pop(key, None)
+    if parent is None:
+        yield None
+        return
+    token = _current.set(parent)
+    try:
+        yield parent
+    finally:
+        _current.reset(token)
+        parent.trace._closed()
+
+
+def recent_traces(min_ms: float = 0, limit: int = 50) -> list[dict]:
+    """Newest first."""
+    out = []
+    for trace in reversed(list(_recent)):
+        data = trace.to_dict()
+        if data["duration_ms"] >= min_ms:
+            out.append(data)
+            if len(out) >= limit:
+                break
+    return out